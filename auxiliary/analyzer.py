@@ -0,0 +1,167 @@
+"""Analysis of text into the terms of the index.
+
+The same analyzer must split the lines of the corpus when they are indexed
+and the queries when they are searched, or the terms of a query would not
+match the terms of the index. Each index keeps the configuration of the
+analyzer that built it (see index_file), and the search handlers analyze
+queries with it.
+
+An analyzer finds the words of a text in a single pass of a precompiled
+regex. Its options are:
+    fold_case: lowercase the terms, so searches ignore case.
+    elisions: keep the apostrophes of elided words, so "o'er", "ne'er" and
+        "'tis" are terms of their own instead of being split into "o" and
+        "er", "ne" and "er" or just "tis".
+
+Run it on a corpus to measure its speed:
+
+    python -m auxiliary.analyzer static/data
+"""
+
+import argparse
+import os
+import re
+import time
+
+# Words are runs of ASCII letters. Digits, underscores and any other
+# character separate them.
+_WORD_REGEX = re.compile(r'[A-Za-z]+')
+# Words may also have apostrophes between their letters, or before them.
+_ELIDED_WORD_REGEX = re.compile(r"'?[A-Za-z]+(?:'[A-Za-z]+)*")
+
+# Words that begin with an elision. Any other apostrophe before a word is an
+# opening quote.
+_LEADING_ELISIONS = frozenset([
+    "'a", "'em", "'gainst", "'scape", "'tis", "'twas", "'tween", "'twere",
+    "'twill", "'twixt", "'twould"])
+
+DEFAULT_CONFIG = {'fold_case': True, 'elisions': False}
+
+_analyzers = {}
+
+
+class Analyzer(object):
+    """Splits text into terms.
+
+    Analyzers hold no state besides their options, so a single one can be
+    shared by all threads and sent to other processes.
+    """
+
+    def __init__(self, fold_case=True, elisions=False):
+        self.fold_case = fold_case
+        self.elisions = elisions
+
+    @classmethod
+    def from_config(cls, config):
+        """Create an analyzer from a configuration returned by get_config."""
+        options = dict(DEFAULT_CONFIG)
+        options.update(config or {})
+        return cls(**options)
+
+    def get_config(self):
+        """Get the options of the analyzer, as a dict that can be serialized
+        as JSON."""
+        return {'fold_case': self.fold_case, 'elisions': self.elisions}
+
+    def analyze(self, text):
+        """Split a text into its terms, in order.
+
+        Example: "O'er the hill, 'tis said" is analyzed into ['o', 'er', 'the',
+        'hill', 'tis', 'said'] by default, and into ["o'er", 'the', 'hill',
+        "'tis", 'said'] with elisions.
+        """
+        if self.fold_case:
+            text = text.lower()
+        if not self.elisions:
+            return _WORD_REGEX.findall(text)
+        terms = _ELIDED_WORD_REGEX.findall(text)
+        for number, term in enumerate(terms):
+            if term[0] == "'" and term.lower() not in _LEADING_ELISIONS:
+                terms[number] = term[1:]
+        return terms
+
+    def analyze_spans(self, text):
+        """Split a text into its terms, along with the span of each one.
+
+        Returns:
+            A list of tuples (term, start, end), in order, being text[start:end]
+            the term as it is written in the text. Terms keep the length of
+            their span, since folding the case of ASCII letters does not change
+            it.
+        """
+        if self.fold_case:
+            folded = text.lower()
+        else:
+            folded = text
+        if not self.elisions:
+            return [(match.group(), match.start(), match.end())
+                for match in _WORD_REGEX.finditer(folded)]
+        spans = []
+        for match in _ELIDED_WORD_REGEX.finditer(folded):
+            term, start = match.group(), match.start()
+            if term[0] == "'" and term.lower() not in _LEADING_ELISIONS:
+                term, start = term[1:], start + 1
+            spans.append((term, start, match.end()))
+        return spans
+
+    def get_term(self, text):
+        """Get the term of a single word query.
+
+        Returns:
+            The first term of the text, or an empty string if it has none.
+        """
+        terms = self.analyze(text)
+        return terms[0] if terms else ''
+
+
+def get_analyzer(config=None):
+    """Get a shared analyzer with a configuration.
+
+    Args:
+        config: a dict returned by Analyzer.get_config, or None for the
+            default analyzer.
+    """
+    options = dict(DEFAULT_CONFIG)
+    options.update(config or {})
+    key = tuple(sorted(options.items()))
+    if key not in _analyzers:
+        _analyzers[key] = Analyzer(**options)
+    return _analyzers[key]
+
+
+def benchmark(path, analyzer):
+    """Analyze every line of the files of a directory.
+
+    Returns:
+        A tuple (size, terms, seconds) with the number of bytes analyzed, the
+        number of terms found and the time it took.
+    """
+    texts = []
+    for filename in sorted(os.listdir(path)):
+        with open(os.path.join(path, filename), 'rb') as text_file:
+            texts.append(text_file.read())
+    size = sum(len(text) for text in texts)
+    terms = 0
+    start = time.time()
+    for text in texts:
+        for line in text.split('\n'):
+            terms += len(analyzer.analyze(line))
+    return size, terms, time.time() - start
+
+
+def main():
+    """Measure the speed of the analyzer on the works of a directory."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('input', help='directory of text files')
+    parser.add_argument('--elisions', action='store_true',
+        help='keep the apostrophes of elided words')
+    args = parser.parse_args()
+
+    analyzer = Analyzer(elisions=args.elisions)
+    size, terms, seconds = benchmark(args.input, analyzer)
+    print 'Analyzed %.1f MB into %d terms in %.2f seconds: %.1f MB/s.' % (
+        size / 1e6, terms, seconds, size / 1e6 / seconds)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+'''Autocomplete module.
+
+Completes the prefix typed in the search box with the most frequent indexed
+words that start with it, from the completion trie of the index (see
+completion_trie). The trie is loaded once per instance from the file written
+by index_builder or, if it is not deployed, built in memory from the words and
+counts of the spelling dictionary (see spelling_corrector), which the
+datastore keeps, once per dictionary.
+'''
+import threading
+
+from auxiliary import completion_trie
+from auxiliary import spelling_corrector
+from resources.constants import Constants
+
+_lock = threading.Lock()
+# The trie built from the spelling dictionary, as a tuple (dictionary, trie),
+# so it is built again when the dictionary changes.
+_dictionary_trie = (None, None)
+
+def get_trie():
+    '''Gets the completion trie of the index.
+
+    Returns:
+        A completion_trie.CompletionTrie, or None if there is none.
+    '''
+    global _dictionary_trie
+    trie = completion_trie.get_trie_file(Constants.COMPLETION_FILE)
+    if trie:
+        return trie
+    dictionary = spelling_corrector.get_dictionary()
+    if not dictionary:
+        return None
+    if _dictionary_trie[0] is not dictionary:
+        with _lock:
+            if _dictionary_trie[0] is not dictionary:
+                _dictionary_trie = (dictionary,
+                    completion_trie.CompletionTrie.build(
+                    zip(dictionary.words, dictionary.counts)))
+    return _dictionary_trie[1]
+
+def get_completions(prefix, limit=Constants.COMPLETIONS):
+    '''Gets the most frequent words that start with a prefix.
+
+    Args:
+        prefix: the prefix, a term of the index.
+        limit: the largest number of completions.
+
+    Returns:
+        A list of words, the most frequent first, empty if there is no trie.
+    '''
+    trie = get_trie()
+    if not trie or not prefix:
+        return []
+    return [word for word, _ in trie.complete(prefix, limit)]
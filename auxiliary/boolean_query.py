@@ -0,0 +1,276 @@
+"""Boolean queries over the lines of the index file.
+
+A query is made of words and the operators AND, OR and NOT, which must be
+written in uppercase, and parentheses. Words next to each other are joined by
+AND, and NOT binds tighter than AND, which binds tighter than OR, so
+"love AND death NOT sword" finds the lines with love and death but without
+sword.
+
+A query is first parsed into a plan, a tree of tuples:
+    ('term', word)
+    ('and', children)
+    ('or', children)
+    ('not', child)
+Plans are then executed over the sorted lists of line ids of their terms.
+The terms of an AND are evaluated from the one in the fewest lines, and each
+intersection gallops over the longer list, so the cost of a query is close to
+the size of the postings of its rarest term.
+
+Queries must have a word that is not negated in each of the lines they match,
+so "NOT sword" or "love OR NOT sword" are rejected: they would match most of
+the lines of the corpus.
+"""
+
+import bisect
+import heapq
+import re
+
+from auxiliary import analyzer as analyzers
+
+_OPERATORS = ('AND', 'OR', 'NOT')
+_TOKEN_REGEX = re.compile(r'[()]|[^\s()]+')
+
+
+def _tokenize(query, analyzer):
+    """Split a query into operators, parentheses and terms."""
+    tokens = []
+    for token in _TOKEN_REGEX.findall(query):
+        if token in _OPERATORS or token in '()':
+            tokens.append(token)
+        else:
+            tokens += [('term', term) for term in analyzer.analyze(token)]
+    return tokens
+
+
+def _join(operator, children):
+    """Build an AND or OR node, flattening nested nodes of the operator."""
+    flattened = []
+    for child in children:
+        if child[0] == operator:
+            flattened += child[1]
+        else:
+            flattened.append(child)
+    if len(flattened) == 1:
+        return flattened[0]
+    return (operator, tuple(flattened))
+
+
+class _Parser(object):
+    """Recursive descent parser of queries."""
+
+    def __init__(self, tokens):
+        self._tokens = tokens
+        self._next = 0
+
+    def _peek(self):
+        """Get the next token without consuming it, or None at the end."""
+        if self._next < len(self._tokens):
+            return self._tokens[self._next]
+        return None
+
+    def _consume(self):
+        """Consume the next token and return it."""
+        token = self._peek()
+        if token is None:
+            raise ValueError('Unexpected end of query')
+        self._next += 1
+        return token
+
+    def parse(self):
+        """Parse all the tokens into a plan."""
+        plan = self._parse_or()
+        if self._peek() is not None:
+            raise ValueError('Unexpected %s in query' % (self._peek(),))
+        return plan
+
+    def _parse_or(self):
+        children = [self._parse_and()]
+        while self._peek() == 'OR':
+            self._consume()
+            children.append(self._parse_and())
+        return _join('or', children)
+
+    def _parse_and(self):
+        children = [self._parse_not()]
+        while self._peek() not in (None, 'OR', ')'):
+            if self._peek() == 'AND':
+                self._consume()
+            children.append(self._parse_not())
+        return _join('and', children)
+
+    def _parse_not(self):
+        token = self._consume()
+        if token == 'NOT':
+            return ('not', self._parse_not())
+        if token == '(':
+            plan = self._parse_or()
+            if self._consume() != ')':
+                raise ValueError('Missing ) in query')
+            return plan
+        if token in _OPERATORS or token == ')':
+            raise ValueError('Unexpected %s in query' % token)
+        return token
+
+
+def parse_query(query, analyzer=None):
+    """Parse a query into a plan.
+
+    Args:
+        query: the text of the query, like "love AND death NOT sword".
+        analyzer: the analyzer.Analyzer of the index, which splits the words
+            of the query into terms, or None for the default one.
+
+    Returns:
+        The plan of the query.
+
+    Raises:
+        ValueError: if the query is empty or malformed, or if it matches lines
+            without any of its words that are not negated.
+    """
+    plan = _Parser(_tokenize(query,
+        analyzer or analyzers.get_analyzer())).parse()
+    if not _is_positive(plan):
+        raise ValueError('The query needs a word that is not negated')
+    return plan
+
+
+def _is_positive(plan):
+    """Tell if every line a plan matches has one of its words that are not
+    negated."""
+    if plan[0] == 'term':
+        return True
+    if plan[0] == 'not':
+        return False
+    if plan[0] == 'and':
+        return any(_is_positive(child) for child in plan[1])
+    return all(_is_positive(child) for child in plan[1])
+
+
+def get_terms(plan):
+    """Get the words of a plan that are not negated, in order."""
+    if plan[0] == 'term':
+        return [plan[1]]
+    if plan[0] == 'not':
+        return []
+    return [term for child in plan[1] for term in get_terms(child)]
+
+
+def _gallop(line_ids, line_id, start):
+    """Find the first position from start of a line id not less than line_id.
+
+    The list is searched by doubling steps from start and then by a binary
+    search of the last step, so looking for increasing line ids costs the
+    logarithm of the distance between their positions.
+    """
+    step = 1
+    end = start
+    while end < len(line_ids) and line_ids[end] < line_id:
+        start = end + 1
+        end += step
+        step *= 2
+    return bisect.bisect_left(line_ids, line_id, start,
+        min(end, len(line_ids)))
+
+
+def intersect(first, second):
+    """Intersect two sorted lists of line ids.
+
+    Each line id of the shorter list is galloped for in the longer one.
+    """
+    if len(first) > len(second):
+        first, second = second, first
+    result = []
+    position = 0
+    for line_id in first:
+        position = _gallop(second, line_id, position)
+        if position == len(second):
+            break
+        if second[position] == line_id:
+            result.append(line_id)
+    return result
+
+
+def subtract(first, second):
+    """Get the line ids of a sorted list that are not in another."""
+    result = []
+    position = 0
+    for line_id in first:
+        position = _gallop(second, line_id, position)
+        if position == len(second) or second[position] != line_id:
+            result.append(line_id)
+    return result
+
+
+def unite(lists):
+    """Merge sorted lists of line ids, without repetitions."""
+    result = []
+    for line_id in heapq.merge(*lists):
+        if not result or result[-1] != line_id:
+            result.append(line_id)
+    return result
+
+
+class _Executor(object):
+    """Executes plans over the postings of an index file."""
+
+    def __init__(self, index):
+        self._index = index
+        self._line_count = index.get_line_count()
+
+    def estimate(self, plan):
+        """Estimate the number of lines a plan matches, without decoding
+        postings."""
+        kind = plan[0]
+        if kind == 'term':
+            return self._index.get_document_frequency(plan[1])
+        if kind == 'not':
+            return self._line_count - self.estimate(plan[1])
+        estimates = [self.estimate(child) for child in plan[1]
+            if kind == 'or' or child[0] != 'not']
+        if kind == 'or':
+            return min(sum(estimates), self._line_count)
+        return min(estimates) if estimates else self._line_count
+
+    def execute(self, plan):
+        """Get the sorted line ids a plan matches."""
+        kind = plan[0]
+        if kind == 'term':
+            return self._index.get_line_ids(plan[1])
+        if kind == 'or':
+            return unite([self.execute(child) for child in plan[1]])
+        if kind == 'not':
+            return self._execute_and((plan,))
+        return self._execute_and(plan[1])
+
+    def _execute_and(self, children):
+        """Intersect the children of an AND, from the rarest one."""
+        included = sorted((child for child in children if child[0] != 'not'),
+            key=self.estimate)
+        excluded = sorted((child[1] for child in children
+            if child[0] == 'not'), key=self.estimate)
+        if included:
+            line_ids = self.execute(included[0])
+        else:
+            line_ids = range(self._line_count)
+        for child in included[1:]:
+            if not line_ids:
+                return []
+            line_ids = intersect(line_ids, self.execute(child))
+        for child in excluded:
+            if not line_ids:
+                return []
+            line_ids = subtract(line_ids, self.execute(child))
+        return line_ids
+
+
+def execute_plan(plan, index):
+    """Execute a plan over an index file.
+
+    Args:
+        plan: a plan returned by parse_query.
+        index: an index_file.IndexFile.
+
+    Returns:
+        The sorted ids of the lines that match the plan.
+    """
+    return _Executor(index).execute(plan)
@@ -0,0 +1,197 @@
+"""Completion trie of the words of the corpus.
+
+Completes the prefix typed in the search box with the most frequent words
+that start with it. Every node of the trie keeps its best completions, so a
+keystroke only walks the letters of the prefix, whatever the number of words
+under it.
+
+The trie is built once, when the corpus is indexed, and serialized by
+index_builder to TRIE_FILENAME next to the index file, as a single compressed
+string. Its nodes are kept in breadth-first order in flat arrays, so the
+children of every node are contiguous and sorted by their letter, and
+instances load it in a few milliseconds, once.
+"""
+
+import array
+import bisect
+import heapq
+import marshal
+import os
+import threading
+import zlib
+
+# Completions kept by each node, the most that can be asked for.
+DEFAULT_TOP = 10
+
+TRIE_FILENAME = 'shakespeare.complete'
+
+_FORMAT = 'completion trie 1'
+
+_lock = threading.Lock()
+_trie_files = {}
+
+
+def _get_array(data):
+    """Get an array of unsigned integers from its serialized string."""
+    numbers = array.array('I')
+    numbers.fromstring(data)
+    return numbers
+
+
+class CompletionTrie(object):
+    """Finds the most frequent words that start with a prefix.
+
+    Attributes:
+        top: the number of completions kept by each node.
+        words: the sorted words of the corpus.
+        counts: the number of occurrences of each word, in the same order.
+    """
+
+    def __init__(self, words, counts, letters, children, starts, word_ids,
+                 top):
+        """Create a trie from its arrays. Use build or deserialize.
+
+        Args:
+            words: the sorted words.
+            counts: the count of each word.
+            letters: the letter of each node, being that of the root a
+                space.
+            children: for each node, the number of its first child, plus a
+                last entry with the number of nodes.
+            starts: for each node, the index in word_ids of its first
+                completion, plus a last entry with the length of word_ids.
+            word_ids: the numbers of the completions of each node, the most
+                frequent first, one node after the other.
+            top: the number of completions kept by each node.
+        """
+        self.top = top
+        self.words = words
+        self.counts = counts
+        self._letters = letters
+        self._children = children
+        self._starts = starts
+        self._word_ids = word_ids
+
+    @classmethod
+    def build(cls, word_counts, top=DEFAULT_TOP):
+        """Build the trie of some words.
+
+        Args:
+            word_counts: iterable of tuples (word, count).
+            top: the number of completions kept by each node.
+        """
+        words = []
+        counts = array.array('I')
+        for word, count in sorted(word_counts):
+            words.append(word)
+            counts.append(count)
+        letters = [' ']
+        children = array.array('I')
+        starts = array.array('I')
+        word_ids = array.array('I')
+        # Each node covers the range of words that start with its prefix,
+        # whose length is the depth of the node.
+        nodes = [(0, len(words), 0)]
+        for first, last, depth in nodes:
+            children.append(len(nodes))
+            starts.append(len(word_ids))
+            word_ids.extend(heapq.nsmallest(top, xrange(first, last),
+                key=lambda word_id: -counts[word_id]))
+            if first < last and len(words[first]) == depth:
+                first += 1
+            while first < last:
+                letter = words[first][depth]
+                end = first + 1
+                while end < last and words[end][depth] == letter:
+                    end += 1
+                letters.append(letter)
+                nodes.append((first, end, depth + 1))
+                first = end
+        children.append(len(nodes))
+        starts.append(len(word_ids))
+        return cls(words, counts, ''.join(letters), children, starts,
+            word_ids, top)
+
+    @classmethod
+    def deserialize(cls, data):
+        """Load a trie serialized by serialize.
+
+        Raises:
+            ValueError: if the data is not a serialized trie.
+        """
+        try:
+            values = marshal.loads(zlib.decompress(data))
+        except (zlib.error, EOFError, TypeError, ValueError):
+            raise ValueError('Not a serialized trie')
+        if not isinstance(values, tuple) or len(values) != 8 or \
+            values[0] != _FORMAT:
+            raise ValueError('Not a serialized trie')
+        _, top, words, counts, letters, children, starts, word_ids = values
+        return cls(words.split('\n') if words else [], _get_array(counts),
+            letters, _get_array(children), _get_array(starts),
+            _get_array(word_ids), top)
+
+    def serialize(self):
+        """Serialize the trie as a compressed string."""
+        return zlib.compress(marshal.dumps((_FORMAT, self.top,
+            '\n'.join(self.words), self.counts.tostring(), self._letters,
+            self._children.tostring(), self._starts.tostring(),
+            self._word_ids.tostring())), 9)
+
+    def _find_node(self, prefix):
+        """Get the number of the node of a prefix, or None if no word starts
+        with it."""
+        node = 0
+        for letter in prefix:
+            first = self._children[node]
+            last = self._children[node + 1]
+            node = bisect.bisect_left(self._letters, letter, first, last)
+            if node == last or self._letters[node] != letter:
+                return None
+        return node
+
+    def complete(self, prefix, limit=None):
+        """Get the most frequent words that start with a prefix.
+
+        Args:
+            prefix: the prefix (lowercase).
+            limit: the largest number of completions, up to the number kept by
+                each node, or None for that number.
+
+        Returns:
+            A list of tuples (word, count), the most frequent first.
+        """
+        if limit is None or limit > self.top:
+            limit = self.top
+        node = self._find_node(prefix)
+        if node is None:
+            return []
+        first = self._starts[node]
+        last = min(self._starts[node + 1], first + limit)
+        return [(self.words[word_id], self.counts[word_id])
+            for word_id in self._word_ids[first:last]]
+
+
+def get_trie_file(path):
+    """Get the trie serialized in a file, loaded once per instance.
+
+    The returned CompletionTrie is shared by all threads.
+
+    Returns:
+        A CompletionTrie, or None if there is no trie in path.
+    """
+    if path not in _trie_files:
+        with _lock:
+            if path not in _trie_files:
+                trie = None
+                if os.path.exists(path):
+                    with open(path, 'rb') as trie_file:
+                        trie = CompletionTrie.deserialize(trie_file.read())
+                _trie_files[path] = trie
+    return _trie_files[path]
+
+
+def write_trie_file(trie, path):
+    """Write a trie to a file, to be read by get_trie_file."""
+    with open(path, 'wb') as trie_file:
+        trie_file.write(trie.serialize())
@@ -4,152 +4,74 @@
 #pylint: disable=R0904
 
 import logging
-import re
 import zipfile
 import json
-import bisect
-import pickle
 
 from google.appengine.ext import blobstore
+from google.appengine.ext import ndb
 from mapreduce import base_handler
 from mapreduce import context
+from mapreduce import mapper_pipeline
 from mapreduce import mapreduce_pipeline
+from mapreduce import operation as op
 from mapreduce.lib import pipeline
 
+from auxiliary import analyzer
+from auxiliary import index_builder
+from auxiliary import result_cache
+from auxiliary import spelling_corrector
+from auxiliary.play_parser import parse_play
+from auxiliary.preprocessing import get_character
+from auxiliary.preprocessing import get_characters_lines
+from auxiliary.preprocessing import get_line_ordinal
+from auxiliary.preprocessing import titlecase
 from models.character import Character
 from models.line import Line
 from models.word import Word
+from models.word_summary import WordSummary
 from models.work import Work
 
 
 _SEP = '+'
 
+# Lines are small, so the index job batches many more of them per put_multi
+# than the default of the mutation pool.
+_LINES_PER_BATCH = 500
 
-def run(blobkey):
+
+def run(blobkey, single_pass=True):
     """Run mapreduce pipelines to build the word index.
     
     Run the mapreduce jobs to preprocess the works and then build an index
     that relates a word alog with it respective work and character to a mention
     (line) in one of the files of the blob_key.
 
+    If the zip file is an index built by index_builder, it is just loaded in
+    the datastore.
+
     Args:
         blobkey: A blobkey to a zip file containing one or more text files.
+        single_pass: If True, the index is built by a single job that reads
+            each file once (see index_file_map). Otherwise a preprocessing job
+            runs before a job that reads the files line by line.
+
+    Lines are split into words by the default analyzer, which is the one
+    queries are analyzed with when there is no index file (see
+    results_page._get_analyzer).
     """
     filename_to_ind = build_name_to_ind(blobkey)
-    pipeline =  CreateIndexPipeline(blobkey, filename_to_ind)
+    if index_builder.is_index_file(filename_to_ind.keys()):
+        pipeline = LoadIndexPipeline(blobkey)
+    elif single_pass:
+        pipeline = SinglePassIndexPipeline(blobkey, filename_to_ind)
+    else:
+        pipeline = CreateIndexPipeline(blobkey, filename_to_ind)
     pipeline.start()
     logging.info('Starting preprocessing pipeline.')
     logging.info ('Pipeline information available at %s/status?root=%s',
                   pipeline.base_path, pipeline.pipeline_id) 
 
 
-def get_character(char_map, sorted_offsets, offset):
-    """Get character relative to a line.
-
-    Args:
-        char_map: dict that relates a byte offset to the name of a character
-        sorted_offsets: sorted list of the keys in the char_map dict.
-        offset: initial byte offset of a line in the text file.
-
-    Returns:
-        character: a string with the name of the character or 'EPILOG' if
-        the line is part of the epilog.
-
-    Example:
-        Consider that char_map = {30: 'ANA', 7: 'BEATRIZ', 45: 'MARCO'}. This
-        means that the respective text file has character speaks starting at the
-        byte offsets 30, 7 and 45, and that these speaks are from Ana, Beatriz
-        and Marco, respectively.
-
-        If the character for the offset 32 is requested, this function will
-        return 'ANA', because this is the closest smaller offset.
-
-    TODO(izabela): fix behavior for lines that indicate stage behavior of
-        characters. Right now the previous character who pronounced anything
-        is returned.
-    """
-
-    #Find closest smaller offset via binary search
-    aux = bisect.bisect(sorted_offsets, offset) - 1
-    if aux >= 0:
-        closest_offset = sorted_offsets[aux]
-        return char_map[str(closest_offset)]
-    return 'EPILOG'
-
-
-def titlecase(title):
-    """Capitalize first letter of each word.
-
-    Args:
-        title: A string to be capitalized as title.
-
-    Returns:
-        The title with only the first letter of each word capitalized.
-    
-    Example: 'LOVE'S LABOUR'S LOST' returns 'Love's Labour's Lost'.
-    """
-    return re.sub(r"[A-Za-z]+('[A-Za-z]+)?", lambda mo:
-        mo.group(0)[0].upper() + mo.group(0)[1:].lower(), title)
-
-
-def find_title(text):
-    """Get first non-empty line of a text."""
-    title_reg = re.compile(r'\t([A-Z0-9]+.*[A-Z])\s*\n')
-    title = re.search(title_reg, text).group(1)
-    return title
-
-
-def get_speaks_offsets(body, epilog_len):
-    """Find offset in which each character starts to speak.
-
-    Args:
-        body: A string composed of a sequence of character speaks that are in
-            the form <CHARACTER>\t<SPEAK>  
-        epilog_len: The length in bytes of the epilog. Basically, anything that
-            happens to be before the character speaks and therefore should be
-            stripped out before calling this function. The length is necessary
-            to the calculation of the offset to be correct, regarding the start
-            of the text file.
-    
-    Returns:
-        offset_to_char: a map of the type {offset: character}. 
-    """
-    char_reg = re.compile(r'(^|\n)([A-Z].*)\t')
-    offset_to_char = {}
-    for match in char_reg.finditer(body):
-        offset = match.start(2) + epilog_len
-        character = match.group(2)
-        if not re.match('SCENE|ACT', character):
-            offset_to_char[offset] = character
-    return offset_to_char
-
-
-def get_epilog_len(text, title):
-    """Get the length of the epilog.
-
-    This function expects text to contain a section enclosed between two
-    appearances of <title>, which we call epilog. This section does not follow
-    the same part of the rest and stripping it makes the parsing of the file
-    easier.
-
-    Args:
-        text: string containing a work
-        title: a string containing the title the same way it is written in
-            text.
-
-    Returns:
-        epilog_len, if text is a play and therefore contains an epilog, or None,
-            otherwise.
-    """
-    epilog_reg = re.compile(r'.*?\t' + title + '.*?\t' + title + r'\s*\n',
-        flags=re.DOTALL)
-    result = re.match(epilog_reg, text)
-    if result == None:
-        return None
-    epilog_len = result.span()[1]
-    return epilog_len
-
-
 def pre_map(data):
     """Mapper function to preprocessing task.
 
@@ -168,23 +90,17 @@ def pre_map(data):
             If (2, HAMLET++100++BERNARNDO) is yielded it means that the
             second file of the zipfile is entitled 'HAMLET' and at the 100th
             byte there is a speak pronounced by BERNARNDO.
+
+        Stage directions are yielded the same way, with the character
+        play_parser.STAGE_DIRECTIONS, followed by the character whose speak
+        they interrupt, at the offset in which it resumes.
     """
     zipinfo, text_fn = data
     filename = zipinfo.filename
     ind = get_index(filename)
-    text = text_fn()
-    title = find_title(text)
-    epilog_len = get_epilog_len(text, title)
-    if epilog_len == None:
-        yield str(ind), title + _SEP + '0' + _SEP + ''
-    else:
-        body = text[epilog_len:]
-        offset_to_char = get_speaks_offsets(body, epilog_len)
-        if len(offset_to_char) == 0:
-            yield str(ind), title + _SEP + '0' + _SEP + ''
-        for key in offset_to_char:
-            yield str(ind), title + _SEP + str(key) + _SEP + \
-                offset_to_char[key]
+    play = parse_play(text_fn())
+    for key, character in play.offset_to_char.iteritems():
+        yield str(ind), play.title + _SEP + str(key) + _SEP + character
 
 
 def pre_reduce(index, values):
@@ -231,9 +147,7 @@ def get_index(filename):
         filename: A string containing the name of a file in the zipfile
             being processed.
     """
-    ctx = context.get()
-    filename_to_ind = \
-        ctx.mapreduce_spec.mapper.params[u'metadata'][u'filename_to_ind']
+    filename_to_ind = context.get().get_broadcast('filename_to_ind')
     if filename in filename_to_ind:
         return filename_to_ind[filename]
     logging.error('Could not find filename in index')
@@ -259,8 +173,9 @@ class CreateIndexPipeline(base_handler.PipelineBase):
                 'input_reader': {
                     'blob_key': blobkey
                 },
-                'metadata': {
-                    'filename_to_ind': filename_to_ind,
+                'broadcast': {
+                    'filename_to_ind': context.broadcast_spec(
+                        value=filename_to_ind)
                 }
             },
             reducer_params={
@@ -274,49 +189,127 @@ class CreateIndexPipeline(base_handler.PipelineBase):
             'mapreduce.input_readers.BlobstoreZipLineInputReader',
             'mapreduce.output_writers.BlobstoreOutputWriter',
             mapper_params = (yield MapperParams(blobkey, metadata)),
+            reducer_params={
+                'corpus': blobkey
+            },
             shards=42)
 
 
     def finalized(self):
+        spelling_corrector.build_dictionary()
+        result_cache.bump_generation()
         logging.info('***********  Index built succesfully  ***********')
 
 
+class SinglePassIndexPipeline(base_handler.PipelineBase):
+    """A pipeline to build the index with a single mapreduce job.
+
+    The mapper receives whole files, so it finds the title and the speaks
+    offsets and emits the words of each line in the same pass, without a
+    preprocessing job or a second read of the input.
+
+    Args:
+        blobkey: blobkey to process as string. Should be a zip archive with
+            one or more text files and nothing else.
+    """
+    def run(self, blobkey, filename_to_ind):
+        """Run the pipeline of the mapreduce job."""
+        yield mapreduce_pipeline.MapreducePipeline(
+            'index',
+            'auxiliary.database_creation.index_file_map',
+            'auxiliary.database_creation.index_reduce',
+            'mapreduce.input_readers.BlobstoreZipInputReader',
+            'mapreduce.output_writers.BlobstoreOutputWriter',
+            mapper_params={
+                'input_reader': {
+                    'blob_key': blobkey
+                },
+                'max_entity_count': _LINES_PER_BATCH,
+                'broadcast': {
+                    'filename_to_ind': context.broadcast_spec(
+                        value=filename_to_ind)
+                }
+            },
+            reducer_params={
+                'corpus': blobkey
+            },
+            shards=42)
+
+    def finalized(self):
+        spelling_corrector.build_dictionary()
+        result_cache.bump_generation()
+        logging.info('***********  Index built succesfully  ***********')
+
+
+class LoadIndexPipeline(base_handler.PipelineBase):
+    """A pipeline to load an index built offline by index_builder.
+
+    Every record of the index already holds a line or a whole word, so a
+    mapper alone puts them in the datastore.
+
+    Args:
+        blobkey: blobkey of the zip file written by index_builder.
+    """
+    def run(self, blobkey):
+        """Run the pipeline of the mapper job."""
+        yield mapper_pipeline.MapperPipeline(
+            'load index',
+            'auxiliary.database_creation.load_map',
+            'mapreduce.input_readers.BlobstoreZipLineInputReader',
+            params={
+                'input_reader': {
+                    'blob_keys': blobkey
+                },
+                'max_entity_count': _LINES_PER_BATCH
+            },
+            shards=16)
+
+    def finalized(self):
+        spelling_corrector.build_dictionary()
+        result_cache.bump_generation()
+        logging.info('***********  Index loaded succesfully  ***********')
+
+
 class MapperParams(base_handler.PipelineBase):
     """A wrapper to mapper_params.
 
-    This wrapper is needed to be able to pass the dict metadata as a
-    mapper_param to the mapreduce pipeline.
+    This wrapper is needed to be able to pass the output files of the
+    preprocessing job as a broadcast input of the index job, which is only
+    known once the first job is done.
     """    
     def run(self, blobkey, metadata):
-        return {'input_reader': {'blob_keys': blobkey}, 'metadata': metadata}
+        return {
+            'input_reader': {'blob_keys': blobkey},
+            'max_entity_count': _LINES_PER_BATCH,
+            'broadcast': {
+                'metadata': context.broadcast_spec(files=metadata,
+                    loader='auxiliary.database_creation.load_metadata')
+            }
+        }
 
 
-def get_words(line):
-    """Split a line into list of words."""
-    line = re.sub(r'\W+', ' ', line)
-    line = re.sub(r'[_0-9]+', ' ', line)
-    return line.split()
+def load_metadata(data):
+    """Decode the output of the preprocessing job.
 
+    Used as the loader of the 'metadata' broadcast input of the index job, so
+    it runs once per instance instead of once per line.
 
-def select_metadata(all_metadata, file_index):
-    """"Select metadata of respective file index among all metadata.
-    
     Args:
-        all_metadata: A list of strings in the format <index>_SEP<serial_dict>,
-        in which <serial_dict> is a serialized dictionary containing all the
-        metadata associated to <index>.
-    
-    Returns:  The respective dict desirialized.
+        data: The concatenated output files of the preprocessing job, lines of
+            the form <index>_SEP<serial_dict>, in which <serial_dict> is a
+            serialized dictionary containing all the metadata associated to
+            <index>.
+
+    Returns:
+        A dict that maps each file index (int) to its deserialized metadata.
     """
-    metadata = None
-    for data in all_metadata:
-        index, serial_dict = data.split(_SEP)
-        if index == str(file_index):
-            metadata = json.loads(serial_dict)
-            break
-    if metadata == None:
-        logging.error('File index not found in metadata dictionary.')
-    return metadata
+    all_metadata = {}
+    for data_line in data.splitlines():
+        if not data_line:
+            continue
+        index, serial_dict = data_line.split(_SEP, 1)
+        all_metadata[int(index)] = json.loads(serial_dict)
+    return all_metadata
 
 
 def index_map(data):
@@ -328,65 +321,148 @@ def index_map(data):
         ZipLineInputReader, available among the input readers of mapreduce.
 
     Yields:
-        A tuple in the format <word>_SEP<title>_SEP<character>,
-        <serial_line_key>.
-        line_key needs to be serialized because it is an object and reduce
-        expects strings as input.
+        An operation that puts the line in the datastore through the mutation
+        pool of the context, which batches the puts, and tuples in the format
+        <word>, <title>_SEP<character>_SEP<line_ordinal>.
+        Shuffling on the word alone makes a single reducer call see every
+        mention of a word.
+        The key name of the line is deterministic (see Line.get_key_name), so
+        retried slices overwrite the lines they already wrote.
     """
     info, line = data
     if line.strip() == '':
         return
-    _, file_index, offset = info
-    ctx = context.get()
-    params = ctx.mapreduce_spec.mapper.params
-    metadata_blob = params['metadata']
-    blob_reader = blobstore.BlobReader(metadata_blob[0].split('/')[-1])
-    all_meta = blob_reader.read().split('\n')[:-1] # the last one is empty
-    metadata = select_metadata(all_meta, file_index)
+    blob_key, file_index, offset = info
+    metadata = context.get().get_broadcast('metadata').get(file_index)
+    if metadata == None:
+        logging.error('File index not found in metadata dictionary.')
+        return
     char_map = metadata['pos_to_char']
     sorted_offsets = metadata['sorted_offsets']
     character = get_character(char_map, sorted_offsets, offset)
     title = metadata['title']
-    line_db = Line(line=line)
-    line_key = line_db.put()
-    for word in get_words(line.lower()):
-        yield (word + _SEP + title + _SEP + character, pickle.dumps(line_key))
+    for output in _index_line(blob_key, file_index, offset, line, title,
+        character):
+        yield output
+
+
+def index_file_map(data):
+    """Index map function of the single pass index job.
+
+    Args:
+        data: a tuple (zipinfo, text_fn), as it is returned from the
+            BlobstoreZipInputReader.
+
+    Yields:
+        The same as index_map, for every line of the file. The character of
+        each line is found by merging the lines with the sorted speaks
+        offsets, as both are visited in order.
+    """
+    zipinfo, text_fn = data
+    file_index = get_index(zipinfo.filename)
+    blob_key = context.get().mapreduce_spec.mapper.params[
+        'input_reader']['blob_key']
+    text = text_fn()
+    play = parse_play(text)
+    for offset, line, character in get_characters_lines(text,
+        play.offset_to_char):
+        for output in _index_line(blob_key, file_index, offset, line,
+            play.title, character):
+            yield output
+
+
+def _index_line(blob_key, file_index, offset, line, title, character):
+    """Yields the outputs of the index mappers for a single line."""
+    line_key_name = Line.get_key_name(blob_key, file_index, offset)
+    yield op.db.Put(Line(id=line_key_name, line=line))
+    ordinal = str(get_line_ordinal(file_index, offset))
+    for word in analyzer.get_analyzer().analyze(line):
+        yield (word, title + _SEP + character + _SEP + ordinal)
+
+
+def load_map(data):
+    """Map function of the job that loads an index built by index_builder.
+
+    Args:
+        data: a tuple (lineinfo, record), as returned by the
+            BlobstoreZipLineInputReader, in which record is a JSON line
+            written by index_builder.
+
+    Yields:
+        Operations that put the entities of the record in the datastore.
+        Lines are keyed by the blob key of the index, the same way index_map
+        keys the lines of the works it reads.
+    """
+    info, record_line = data
+    blob_key = info[0]
+    record = json.loads(record_line)
+    if 'line' in record:
+        file_index, offset, line = record['line']
+        line_key_name = Line.get_key_name(blob_key, file_index, offset)
+        yield op.db.Put(Line(id=line_key_name, line=line))
+        return
+    word = Word(id=record['word'], name=record['word'], count=record['count'])
+    yield op.db.Put(word)
+    yield op.db.Put(WordSummary.create(record['word'], dict(
+        (title, (work_count, dict((name, char_count)
+        for name, char_count, _ in chars)))
+        for title, work_count, chars in record['works'])))
+    for title, work_count, chars in record['works']:
+        work = Work(parent=word.key, id=title, title=title, count=work_count)
+        yield op.db.Put(work)
+        for name, char_count, ordinals in chars:
+            char = Character(parent=work.key, id=name, name=name,
+                count=char_count)
+            for chunk in char.set_postings(blob_key, ordinals):
+                yield op.db.Put(chunk)
+            yield op.db.Put(char)
 
 
 def index_reduce(key, values):
     """Index reduce function.
     Args:
-        key: a string in the format <word>_SEP<work>_SEP<character>
-        values: the lines in which <word> appears in <work> in a speak of
-            <character>
-
-    The word is either added to the database or updated with its new occurence,
-    adding info about the work in which it was found, which character pronounced
-    it (if applicable), a count of occurrences and a reference to the line in
-    which it was found.
+        key: a word.
+        values: strings in the format <work>_SEP<character>_SEP<line_ordinal>,
+            one for each occurrence of <word> in a line of <work> in a speak of
+            <character>.
+
+    The word, the works in which it was found and the characters that
+    pronounced it (if applicable) are built in memory, with a count of
+    occurrences and references to the lines in which it was found, and written
+    with a single batched put, along with a WordSummary of their counts.
+    Since no other reducer call touches the same entities, nothing is read
+    back from the datastore and counts do not race.
     """
-    keys = key.split(_SEP)
-    word_value, work_value, char_value = keys
-    word = Word.get_by_id(word_value)
-    work_titlecase = titlecase(work_value)
-    if not word:
-        word = Word(id=word_value, name=word_value, count=len(values))
-        work = Work(parent=word.key, id=work_titlecase,
-                        title=work_titlecase, count=len(values))
-    else:
-        word.count += len(values)
-        work = Work.get_by_id(work_titlecase, parent=word.key)
-        if work:
-            work.count += len(values)
-        else:
+    word = Word(id=key, name=key, count=len(values))
+    works = {}
+    chars = {}
+    char_lines = {}
+    for value in values:
+        work_value, char_value, ordinal = value.split(_SEP, 2)
+        work_titlecase = titlecase(work_value)
+        work = works.get(work_titlecase)
+        if not work:
             work = Work(parent=word.key, id=work_titlecase,
-                title=work_titlecase, count=len(values))
-    character_titlecase = titlecase(char_value)
-    char = Character(parent=work.key, id=character_titlecase,
-        name=character_titlecase, count= len(values))
-    for line in set(values):
-        char.mentions.append(pickle.loads(line))
-    word.put()
-    work.put()
-    char.put()
-
+                title=work_titlecase, count=0)
+            works[work_titlecase] = work
+        work.count += 1
+        character_titlecase = titlecase(char_value)
+        char_id = (work_titlecase, character_titlecase)
+        char = chars.get(char_id)
+        if not char:
+            char = Character(parent=work.key, id=character_titlecase,
+                name=character_titlecase, count=0)
+            chars[char_id] = char
+            char_lines[char_id] = set()
+        char.count += 1
+        char_lines[char_id].add(int(ordinal))
+    corpus = context.get().mapreduce_spec.mapper.params['corpus']
+    chunks = []
+    for char_id, char in chars.iteritems():
+        chunks += char.set_postings(corpus, sorted(char_lines[char_id]))
+    summary_works = dict((title, (work.count, {}))
+        for title, work in works.iteritems())
+    for (title, name), char in chars.iteritems():
+        summary_works[title][1][name] = char.count
+    summary = WordSummary.create(key, summary_works)
+    ndb.put_multi([word, summary] + works.values() + chars.values() + chunks)
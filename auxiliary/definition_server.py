@@ -0,0 +1,131 @@
+"""Local stand-in of the definition service.
+
+Answers the define method of the definition service (see definition_service)
+like the real one, as JSON, from a small dictionary or from a JSON file that
+maps words to their lists of definitions, so the app can be run and load
+tested without network access. It can also wait before answering and fail a
+share of the calls, to see how the definition store behaves when the service
+is slow or down:
+
+    python -m auxiliary.definition_server --port 8081 --latency 0.2 \\
+        --failure-rate 0.1
+
+and start the development server with
+--env_var DEFINITION_SERVICE_URL=http://localhost:8081/definition. It does
+not need App Engine.
+"""
+
+import argparse
+import BaseHTTPServer
+import json
+import random
+import SocketServer
+import threading
+import time
+
+# Path of the define method, relative to the URL of the service.
+DEFINE_PATH = '/definition.define'
+
+DEFAULT_DEFINITIONS = {
+    'friend': [
+        'a person you know well and regard with affection and trust',
+        'an associate who provides cooperation or assistance'],
+    'love': ['a strong positive emotion of regard and affection'],
+    'death': ['the event of dying or departure from life'],
+    'king': ['a male sovereign; ruler of a kingdom'],
+}
+
+
+class DefinitionHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """Answers the calls to the define method."""
+
+    def do_POST(self):
+        """Answer a call with the definitions of its term."""
+        server = self.server
+        if self.path.split('?')[0] != DEFINE_PATH:
+            self.send_error(404)
+            return
+        try:
+            length = int(self.headers.getheader('Content-Length') or 0)
+            term = json.loads(self.rfile.read(length)).get('term')
+        except ValueError:
+            self.send_error(400)
+            return
+        server.count_call()
+        if server.latency:
+            time.sleep(server.latency)
+        if random.random() < server.failure_rate:
+            self.send_error(503)
+            return
+        body = json.dumps({'definition': server.definitions.get(
+            (term or '').lower(), [])})
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        """Do not log every call, which would slow down load tests."""
+        pass
+
+
+class DefinitionServer(SocketServer.ThreadingMixIn,
+                       BaseHTTPServer.HTTPServer):
+    """HTTP server of the stand-in, answering each call in its own thread.
+
+    Attributes:
+        definitions: dict that maps words (lowercase) to their definitions.
+        latency: seconds waited before answering each call.
+        failure_rate: share of the calls answered with an error.
+        calls: number of calls received.
+    """
+    daemon_threads = True
+
+    def __init__(self, address, definitions=None, latency=0,
+                 failure_rate=0):
+        BaseHTTPServer.HTTPServer.__init__(self, address, DefinitionHandler)
+        self.definitions = (DEFAULT_DEFINITIONS if definitions is None
+            else definitions)
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def count_call(self):
+        """Count a call."""
+        with self._lock:
+            self.calls += 1
+
+
+def main():
+    """Run the stand-in with the options of the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--port', type=int, default=8081,
+        help='port to listen on')
+    parser.add_argument('--definitions',
+        help='JSON file that maps words to lists of definitions')
+    parser.add_argument('--latency', type=float, default=0,
+        help='seconds to wait before answering each call')
+    parser.add_argument('--failure-rate', type=float, default=0,
+        help='share of the calls answered with an error, from 0 to 1')
+    args = parser.parse_args()
+
+    definitions = None
+    if args.definitions:
+        with open(args.definitions) as definitions_file:
+            definitions = dict((word.lower(), word_definitions)
+                for word, word_definitions in
+                json.load(definitions_file).iteritems())
+    server = DefinitionServer(('', args.port), definitions, args.latency,
+        args.failure_rate)
+    print 'Serving definitions at http://localhost:%d%s' % (args.port,
+        DEFINE_PATH)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
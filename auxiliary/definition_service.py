@@ -9,6 +9,8 @@ from protorpc import messages
 from protorpc import remote
 from protorpc.transport import HttpTransport
 
+from resources.constants import Constants
+
 class DefinitionRequest(messages.Message):
     """Request object used to communicate with the DefinitionService.
 
@@ -41,8 +43,8 @@ class DefinitionService(remote.Service):
 
         Assigns the service attribute to link to the service url.
         """
-        service_url = 'http://definition-server.appspot.com/definition'
-        self.service = self.Stub(HttpTransport(service_url))
+        self.service = self.Stub(HttpTransport(
+            Constants.DEFINITION_SERVICE_URL))
 
     @remote.method(DefinitionRequest, DefinitionResponse)
     def define(self, request):
@@ -0,0 +1,240 @@
+"""Cached definitions of words.
+
+Definitions come from the remote definition service (see definition_service),
+which takes a round trip to another app for every word, so they are looked up
+in three places, from the fastest one:
+    1. An LRUCache of the instance.
+    2. The Definition entities of the datastore, which ndb also keeps in
+        memcache, so they are shared by every instance.
+    3. The definition service, called asynchronously through urlfetch with a
+        deadline of Constants.DEFINITION_DEADLINE seconds, and retried up to
+        Constants.DEFINITION_RETRIES times.
+Definitions returned by the service, even empty ones, are put in the datastore
+and are never asked for again. Failed calls are not cached, so the word is
+asked for again on the next lookup. Failures of the datastore are only logged:
+the word is then asked for to the service, and its definitions are returned
+even if they could not be put.
+
+Lookups of the same word running at the same time in an instance share a
+single call, even from different requests: the first one starts it and the
+others wait for it. Pages look up all their words at once with
+get_many_definitions, so their calls overlap instead of taking a round trip
+each.
+
+The service is the one at Constants.DEFINITION_SERVICE_URL, which can be
+pointed to the stand-in of definition_server to test the app offline.
+"""
+
+import logging
+import threading
+import time
+
+from google.appengine.api import datastore_errors
+from google.appengine.api import urlfetch
+from google.appengine.ext import ndb
+from protorpc import messages
+from protorpc import protojson
+
+from auxiliary.definition_service import DefinitionRequest
+from auxiliary.definition_service import DefinitionResponse
+from auxiliary.lru_cache import LRUCache
+from models.definition import Definition
+from resources.constants import Constants
+
+# Definitions of the most looked up words kept by each instance.
+_LOCAL_CAPACITY = 2048
+
+_local = LRUCache(_LOCAL_CAPACITY)
+
+# Longest word looked up, in bytes. Longer ones are not words of any
+# dictionary, and would not fit in the key name of a Definition, which takes
+# up to 500 bytes.
+MAX_TERM_BYTES = 100
+
+# Seconds between the checks of a thread waiting for the call of another one.
+_POLL_INTERVAL = 0.02
+
+# Calls in progress in the instance, by word.
+_lock = threading.Lock()
+_calls = {}
+
+
+class _Call(object):
+    """A lookup of the definitions of a word in progress.
+
+    ndb futures can only be waited for by the thread that created them, so
+    other threads wait for the event instead, polling it with ndb.sleep to
+    let their own lookups run meanwhile.
+
+    Attributes:
+        thread: the thread that made the call.
+        future: the future of the call, see _fetch_async.
+        event: set when the call is done.
+        definitions: the result of the call, once it is done.
+    """
+
+    def __init__(self):
+        self.thread = threading.current_thread()
+        self.future = None
+        self.event = threading.Event()
+        self.definitions = None
+
+    def finish(self, term):
+        """Publish the result of the call and forget it."""
+        if self.future.get_exception() is None:
+            self.definitions = self.future.get_result()
+        with _lock:
+            if _calls.get(term) is self:
+                del _calls[term]
+        self.event.set()
+
+    @ndb.tasklet
+    def wait_async(self):
+        """Wait for the call from any thread.
+
+        Returns:
+            A future of the definitions, or of None if the call failed or
+            took longer than every attempt may take.
+        """
+        if self.thread is threading.current_thread():
+            definitions = yield self.future
+            raise ndb.Return(definitions)
+        timeout = time.time() + Constants.DEFINITION_DEADLINE * (
+            Constants.DEFINITION_RETRIES + 1)
+        while not self.event.is_set() and time.time() < timeout:
+            yield ndb.sleep(_POLL_INTERVAL)
+        raise ndb.Return(self.definitions)
+
+
+def normalize(term):
+    """Get the word a term is looked up by."""
+    return term.strip().lower()
+
+
+@ndb.tasklet
+def _define_remote_async(term):
+    """Ask the definition service for the definitions of a word.
+
+    Returns:
+        A future of the list of definitions, or of None if the service did not
+        answer within the deadline after every retry.
+    """
+    payload = protojson.encode_message(DefinitionRequest(term=term))
+    context = ndb.get_context()
+    for attempt in range(Constants.DEFINITION_RETRIES + 1):
+        try:
+            response = yield context.urlfetch(
+                Constants.DEFINITION_SERVICE_URL + '.define',
+                payload=payload, method=urlfetch.POST,
+                headers={'Content-Type': 'application/json'},
+                deadline=Constants.DEFINITION_DEADLINE)
+        except urlfetch.Error as error:
+            logging.warning('Definition of %r failed (attempt %d): %s', term,
+                attempt + 1, error)
+            continue
+        if response.status_code != 200:
+            logging.warning('Definition of %r failed (attempt %d): HTTP %d',
+                term, attempt + 1, response.status_code)
+            continue
+        try:
+            message = protojson.decode_message(DefinitionResponse,
+                response.content)
+        except (ValueError, messages.Error) as error:
+            logging.warning('Invalid definition of %r: %s', term, error)
+            continue
+        raise ndb.Return(list(message.definition))
+    raise ndb.Return(None)
+
+
+@ndb.tasklet
+def _fetch_async(term):
+    """Look up the definitions of a word in the datastore and then in the
+    definition service, putting the latter in the datastore.
+
+    Returns:
+        A future of the list of definitions, or of None if the service is not
+        available. It never fails, so every thread waiting for the call gets
+        the same result.
+    """
+    try:
+        entity = yield Definition.get_by_id_async(term)
+    except datastore_errors.Error as error:
+        logging.warning('Definition of %r not read: %s', term, error)
+        entity = None
+    if entity:
+        raise ndb.Return(entity.definitions)
+    definitions = yield _define_remote_async(term)
+    if definitions is not None:
+        try:
+            yield Definition(id=term, definitions=definitions).put_async()
+        except datastore_errors.Error as error:
+            logging.warning('Definition of %r not stored: %s', term, error)
+    raise ndb.Return(definitions)
+
+
+@ndb.tasklet
+def get_definitions_async(term):
+    """Get the definitions of a word.
+
+    Args:
+        term: the word, in any case.
+
+    Returns:
+        A future of the list of definitions, empty if the dictionary does not
+        have the word or it is longer than MAX_TERM_BYTES, or of None if the
+        definition service is not available.
+    """
+    term = normalize(term)
+    if not term or len(term.encode('utf-8') if isinstance(term, unicode)
+                       else term) > MAX_TERM_BYTES:
+        raise ndb.Return([])
+    definitions = _local.get(term)
+    if definitions is not None:
+        raise ndb.Return(definitions)
+    with _lock:
+        call = _calls.get(term)
+        started = call is None
+        if started:
+            call = _calls[term] = _Call()
+    if started:
+        call.future = _fetch_async(term)
+        call.future.add_callback(call.finish, term)
+    definitions = yield call.wait_async()
+    if definitions is not None:
+        _local.put(term, definitions)
+    raise ndb.Return(definitions)
+
+
+def get_definitions(term):
+    """Get the definitions of a word, like get_definitions_async."""
+    return get_definitions_async(term).get_result()
+
+
+def get_many_definitions(terms):
+    """Get the definitions of many words at once.
+
+    Every lookup is started before any is waited for, so the datastore gets
+    are batched by ndb and the calls to the definition service run at the
+    same time.
+
+    Args:
+        terms: the words, in any case. Repeated and empty ones are skipped.
+
+    Returns:
+        A dict that maps each word, as returned by normalize, to its
+        definitions, like get_definitions_async.
+    """
+    futures = {}
+    for term in terms:
+        term = normalize(term)
+        if term and term not in futures:
+            futures[term] = get_definitions_async(term)
+    ndb.Future.wait_all(futures.values())
+    return dict((term, future.get_result())
+        for term, future in futures.iteritems())
+
+
+def get_stats():
+    """Get the counters of the LRUCache of the instance (see
+    LRUCache.get_stats)."""
+    return _local.get_stats()
@@ -18,10 +18,48 @@ def apply_tag_to_pattern(pattern, tag, text):
     matches = set(re.findall(pattern, text))
     for match in matches:
         formatted_text = re.sub(
-            '\\b' + match + '\\b', '<%s>%s</%s>' % (tag, match, tag),
-            formatted_text)
+            '\\b' + re.escape(match) + '\\b',
+            '<%s>%s</%s>' % (tag, match, tag), formatted_text)
     return formatted_text
 
+def apply_tag_to_spans(tag, text, spans):
+    '''Applies a tag to known spans of a text, without searching them.
+
+    The text is sliced at the bounds of the spans in a single pass, so the
+    cost only depends on the length of the text.
+
+    Args:
+        tag: Tag to be applied. Ex: b for bolding.
+        text: The text in which this processing is going to be executed.
+        spans: Sorted list of non overlapping tuples (start, end) of the
+            slices of the text to be tagged.
+
+    Returns:
+        The text with the tag applied to the spans.'''
+    opening = '<%s>' % tag
+    closing = '</%s>' % tag
+    pieces = []
+    previous = 0
+    for start, end in spans:
+        pieces += [text[previous:start], opening, text[start:end], closing]
+        previous = end
+    pieces.append(text[previous:])
+    return ''.join(pieces)
+
+def apply_tag_to_page(tag, lines, spans):
+    '''Applies a tag to the known spans of every line of a page of results.
+
+    Args:
+        tag: Tag to be applied. Ex: b for bolding.
+        lines: List of texts.
+        spans: List with the sorted spans of each text, as expected by
+            apply_tag_to_spans.
+
+    Returns:
+        The list of texts with the tag applied to their spans.'''
+    return [apply_tag_to_spans(tag, text, text_spans)
+        for text, text_spans in zip(lines, spans)]
+
 def get_any_case_word_regex(word):
     '''Given a word, this method will create a regex capable of matching it
     disregarding its case.
@@ -0,0 +1,285 @@
+"""Offline builder of the word index.
+
+Builds the same index as the mapreduce jobs of database_creation on a local
+machine, spreading the works over all of its cores, without App Engine:
+
+    python -m auxiliary.index_builder static/data --output index
+
+The input is either a directory of text files or a zip file like the ones
+uploaded in the admin page. Besides the index file read by the search handlers
+(see index_file), its spelling dictionary (see symspell) and its completion
+trie (see completion_trie), the index is written as a zip file too, holding
+JSON lines files named index-<part>.jsonl. Uploading it in the admin page and
+indexing it loads the records in the datastore (see
+database_creation.LoadIndexPipeline) instead of running the index jobs.
+
+Each line of the parts is a record in one of the forms:
+    {"line": [<file_index>, <offset>, <line>]}
+    {"word": <word>, "count": <count>, "works": [[<title>, <count>,
+        [[<character>, <count>, [<line_ordinal>, ...]], ...]], ...]}
+Line ordinals are defined by preprocessing.get_line_ordinal.
+"""
+
+import argparse
+import functools
+import json
+import multiprocessing
+import os
+import time
+import zipfile
+
+from auxiliary import analyzer as analyzers
+from auxiliary import completion_trie
+from auxiliary import index_file
+from auxiliary import symspell
+from auxiliary.play_parser import parse_play
+from auxiliary.preprocessing import get_characters_lines
+from auxiliary.preprocessing import get_line_ordinal
+from auxiliary.preprocessing import titlecase
+
+INDEX_FILENAME = 'shakespeare_index.zip'
+
+_PART_PREFIX = 'index-'
+_PART_SUFFIX = '.jsonl'
+_PARTS = 16
+
+
+class CorpusIndex(object):
+    """The index of a corpus of works, kept in memory.
+
+    Attributes:
+        titles: dict that maps a file index to the title of the work in it
+            (titlecase).
+        lines: list of the non-empty lines of the corpus, as tuples
+            (file_index, offset, line, character), sorted by file index and
+            offset. Character is the name of who says the line (titlecase).
+        words: dict that maps a word to a dict of the works it appears in,
+            which in turn map the name of each character (titlecase) that
+            says the word to a list [count, mentions]. Mentions is the sorted
+            list of the ordinals of the lines in which it is said.
+        scenes: dict that maps a file index to the scenes of its work, as
+            the scenes of a play_parser.Play.
+        analyzer: the analyzer.Analyzer that split the lines into words.
+    """
+
+    def __init__(self, analyzer=None):
+        self.analyzer = analyzer or analyzers.get_analyzer()
+        self.titles = {}
+        self.lines = []
+        self.words = {}
+        self.scenes = {}
+
+    def add_work(self, file_index, title, lines, postings, scenes=()):
+        """Merge the result of index_work into the index."""
+        self.titles[file_index] = title
+        self.scenes[file_index] = list(scenes)
+        self.lines.extend((file_index, offset, line, character)
+            for offset, line, character in lines)
+        for word, chars in postings.iteritems():
+            works = self.words.setdefault(word, {})
+            if title not in works:
+                works[title] = chars
+                continue
+            # Another file has a work with the same title.
+            for char, (count, ordinals) in chars.iteritems():
+                mention = works[title].setdefault(char, [0, []])
+                mention[0] += count
+                mention[1].extend(ordinals)
+
+    def get_word_count(self, word):
+        """Number of occurrences of a word in the whole corpus."""
+        return sum(count for chars in self.words[word].itervalues()
+            for count, _ in chars.itervalues())
+
+
+def is_index_file(filenames):
+    """Tell if the files inside a zip file are the parts of an index."""
+    return len(filenames) > 0 and all(name.startswith(_PART_PREFIX) and
+        name.endswith(_PART_SUFFIX) for name in filenames)
+
+
+def read_works(path):
+    """Read the works of a directory or zip file.
+
+    Args:
+        path: path of a directory of text files or of a zip file.
+
+    Returns:
+        A list of tuples (file_index, text). The file indexes follow the order
+        of the files inside the zip file, or the sorted file names of the
+        directory.
+    """
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as zip_file:
+            return [(index, zip_file.read(info.filename)) for (index, info) in
+                enumerate(zip_file.infolist())]
+    works = []
+    for index, filename in enumerate(sorted(os.listdir(path))):
+        with open(os.path.join(path, filename), 'rb') as work_file:
+            works.append((index, work_file.read()))
+    return works
+
+
+def index_work(work, analyzer=None):
+    """Index a single work.
+
+    Args:
+        work: a tuple (file_index, text), as returned by read_works.
+        analyzer: the analyzer.Analyzer that splits the lines into words, or
+            None for the default one.
+
+    Returns:
+        A tuple (file_index, title, lines, postings, scenes). Lines is a list
+        of the (offset, line, character) of the non-empty lines of the work,
+        postings maps each word to a dict {character: [count, sorted line
+        ordinals]} and scenes are the scenes of the play_parser.Play of the
+        work.
+    """
+    file_index, text = work
+    analyzer = analyzer or analyzers.get_analyzer()
+    play = parse_play(text)
+    lines = []
+    postings = {}
+    for offset, line, character in get_characters_lines(text,
+        play.offset_to_char):
+        character = titlecase(character)
+        lines.append((offset, line, character))
+        ordinal = get_line_ordinal(file_index, offset)
+        for word in analyzer.analyze(line):
+            chars = postings.setdefault(word, {})
+            mention = chars.get(character)
+            if mention is None:
+                mention = chars[character] = [0, []]
+            mention[0] += 1
+            if not mention[1] or mention[1][-1] != ordinal:
+                mention[1].append(ordinal)
+    return file_index, titlecase(play.title), lines, postings, play.scenes
+
+
+def build_index(works, processes=None, analyzer=None):
+    """Index all works, in parallel.
+
+    Args:
+        works: a list of tuples (file_index, text), as returned by read_works.
+        processes: number of worker processes. Defaults to the number of
+            cores.
+        analyzer: the analyzer.Analyzer that splits the lines into words, or
+            None for the default one.
+
+    Returns:
+        A CorpusIndex.
+    """
+    analyzer = analyzer or analyzers.get_analyzer()
+    pool = multiprocessing.Pool(processes)
+    try:
+        results = pool.map(functools.partial(index_work, analyzer=analyzer),
+            works)
+    finally:
+        pool.close()
+        pool.join()
+    index = CorpusIndex(analyzer)
+    for result in results:
+        index.add_work(*result)
+    return index
+
+
+def get_records(index):
+    """Yield the records of an index, serialized as JSON lines."""
+    for file_index, offset, line, _ in index.lines:
+        yield json.dumps({'line': [file_index, offset, line]})
+    for word in sorted(index.words):
+        works = index.words[word]
+        work_records = []
+        for title in sorted(works):
+            chars = works[title]
+            char_records = [[char, count, mentions] for char, (count, mentions)
+                in sorted(chars.iteritems())]
+            work_records.append([title,
+                sum(count for count, _ in chars.itervalues()), char_records])
+        yield json.dumps({'word': word, 'count': index.get_word_count(word),
+            'works': work_records})
+
+
+def build_dictionary(index):
+    """Build the spelling dictionary of the words of an index.
+
+    Returns:
+        A symspell.SymSpell.
+    """
+    return symspell.SymSpell.build((word, index.get_word_count(word))
+        for word in index.words)
+
+
+def build_completion_trie(index):
+    """Build the completion trie of the words of an index.
+
+    Returns:
+        A completion_trie.CompletionTrie.
+    """
+    return completion_trie.CompletionTrie.build(
+        (word, index.get_word_count(word)) for word in index.words)
+
+
+def write_index(index, output_dir, parts=_PARTS):
+    """Write an index as a zip file that can be loaded in the datastore.
+
+    Args:
+        index: a CorpusIndex.
+        output_dir: directory in which the zip file is written.
+        parts: number of files in the zip file. Each file is read by its own
+            shard of the load job.
+
+    Returns:
+        The path of the zip file.
+    """
+    path = os.path.join(output_dir, INDEX_FILENAME)
+    contents = [[] for _ in range(parts)]
+    for number, record in enumerate(get_records(index)):
+        contents[number % parts].append(record + '\n')
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+        for part, records in enumerate(contents):
+            zip_file.writestr('%s%05d%s' % (_PART_PREFIX, part, _PART_SUFFIX),
+                ''.join(records))
+    return path
+
+
+def main():
+    """Build the index of the works given in the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('input',
+        help='directory of text files or zip file with the works')
+    parser.add_argument('--output', default='index',
+        help='directory in which the index is written')
+    parser.add_argument('--processes', type=int, default=None,
+        help='number of worker processes (default: number of cores)')
+    parser.add_argument('--elisions', action='store_true',
+        help='keep the apostrophes of elided words, like o\'er or \'tis')
+    args = parser.parse_args()
+
+    start = time.time()
+    index = build_index(read_works(args.input), args.processes,
+        analyzers.Analyzer(elisions=args.elisions))
+    print 'Indexed %d lines and %d words of %d works in %.2f seconds.' % (
+        len(index.lines), len(index.words), len(index.titles),
+        time.time() - start)
+    if not os.path.isdir(args.output):
+        os.makedirs(args.output)
+    written = time.time()
+    paths = [write_index(index, args.output),
+        os.path.join(args.output, index_file.INDEX_FILENAME),
+        os.path.join(args.output, symspell.DICTIONARY_FILENAME),
+        os.path.join(args.output, completion_trie.TRIE_FILENAME)]
+    pool = multiprocessing.Pool(args.processes)
+    try:
+        index_file.write_index_file(index, paths[1], pool.map)
+    finally:
+        pool.close()
+        pool.join()
+    symspell.write_dictionary_file(build_dictionary(index), paths[2])
+    completion_trie.write_trie_file(build_completion_trie(index), paths[3])
+    print 'Wrote %s in %.2f seconds.' % (', '.join(paths),
+        time.time() - written)
+
+
+if __name__ == '__main__':
+    main()
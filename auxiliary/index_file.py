@@ -0,0 +1,1068 @@
+"""Read-only binary index of the corpus.
+
+The corpus only changes when a new one is uploaded, so index_builder also
+writes the whole index to a single immutable file. Instances map it in memory
+once and answer searches from it, without datastore RPCs.
+
+The file starts with a header and a table of sections, each one a contiguous
+range of the file:
+    text: the non-empty lines of the corpus, one after the other.
+    lines: for each line, in corpus order, the offset of its text, the id of
+        its character, its number of words and its number in its segment,
+        plus a last entry with the size of the text.
+    segments: for each run of lines of the same act and scene of a work, the
+        offset and length of the name of the act and of the scene in names
+        and the id of its first line, plus a last entry with the number of
+        lines. Lines outside scenes, like those of the poems, have empty act
+        and scene names. Lines are numbered from 1 in their segment, except
+        the stage directions, which have number 0, so each line is cited as
+        (act, scene, number).
+    works: for each work, the offset and length of its title in names and the
+        id of its first line, plus a last entry with the number of lines. The
+        lines of a work are contiguous.
+    chars: for each character, the offset and length of its name in names and
+        the id of its work.
+    names: titles of the works, names of the characters and of the acts and
+        scenes.
+    terms: the term dictionary, sorted by term. For each term, the offset and
+        length of the term in term_text and of its postings in postings, its
+        number of occurrences and the number of lines it appears in.
+    term_text: the terms.
+    stats: the number of lines and the number of words of the corpus.
+    postings: for each term, the id differences between the lines it appears
+        in, each followed by the number of occurrences in the line, by the
+        differences between the positions of the occurrences and by the
+        differences between their offsets, encoded by
+        postings.encode_varints. The position of a word is the number of words
+        before it in the line, so phrases are matched without reading the
+        text of the lines, and its offset is the index of its first character
+        in the text of the line, so it is highlighted without searching for
+        it.
+    analyzer: the configuration of the analyzer that split the lines into
+        words, as JSON. Queries must be analyzed with it too.
+    trigrams: the sorted strings of 3 characters of the lowercase text of the
+        lines. For each one, the string, the offset and length of its postings
+        in trigram_postings and the number of lines it appears in. Regexes are
+        matched only against the lines with their trigrams (see
+        regex_search).
+    trigram_postings: for each trigram, the id differences between the lines
+        it appears in, encoded by postings.encode_varints.
+All integers are little-endian, unsigned and 32 bits long.
+"""
+
+import bisect
+import json
+import os
+import struct
+import threading
+
+try:
+    import mmap
+except ImportError:
+    mmap = None
+
+from auxiliary import analyzer as analyzers
+from auxiliary import postings as postings_codec
+from auxiliary.play_parser import STAGE_DIRECTIONS
+from auxiliary.preprocessing import titlecase
+
+INDEX_FILENAME = 'shakespeare.idx'
+
+_MAGIC = 'SHKSPIDX'
+_VERSION = 7
+
+_HEADER = struct.Struct('<8sII')
+_SECTION = struct.Struct('<16sII')
+_LINE = struct.Struct('<IIII')
+_NAME = struct.Struct('<III')
+_SEGMENT = struct.Struct('<IIIII')
+_TERM = struct.Struct('<IIIIII')
+_STATS = struct.Struct('<II')
+_TRIGRAM = struct.Struct('<3sIII')
+
+# Name of the character of the stage directions in the index.
+_DIRECTIONS = titlecase(STAGE_DIRECTIONS)
+
+_lock = threading.Lock()
+_index_files = {}
+
+
+def _pack(record, rows):
+    """Pack a list of tuples with a struct."""
+    return ''.join(record.pack(*row) for row in rows)
+
+
+def _add_name(names, name):
+    """Append a name to the list of names and return its offset and length."""
+    offset = names[1]
+    names[0].append(name)
+    names[1] += len(name)
+    return offset, len(name)
+
+
+def get_trigrams(text):
+    """Get the set of strings of 3 characters of a text, in lowercase."""
+    text = text.lower()
+    return set([text[start:start + 3] for start in range(len(text) - 2)])
+
+
+def _iter_line_scenes(index):
+    """Find the act and scene of each line of an index.
+
+    Yields:
+        A tuple (act, scene) for each line, in order, with empty names for
+        lines outside scenes.
+    """
+    file_index = None
+    for line_file, offset, _, _ in index.lines:
+        if line_file != file_index:
+            file_index = line_file
+            scenes = index.scenes.get(file_index, [])
+            next_scene = 0
+        while next_scene < len(scenes) and scenes[next_scene][1] <= offset:
+            next_scene += 1
+        if next_scene < len(scenes) and scenes[next_scene][0] <= offset:
+            _, _, act, scene = scenes[next_scene]
+            yield act or '', scene
+        else:
+            yield '', ''
+
+
+def _encode_work(work):
+    """Encode the postings of the lines of a work.
+
+    It is run by the workers of write_index_file, so it takes and returns
+    plain values only.
+
+    Args:
+        work: a tuple (lines, analyzer), being lines the texts of the lines of
+            the work and analyzer the analyzer.Analyzer of the index.
+
+    Returns:
+        A tuple (word_counts, terms, trigrams). Word_counts is the list of the
+        numbers of words of the lines. Terms maps each term to a tuple
+        (first, last, count, line_count, data), being first and last the ids
+        of its first and last lines, counted from the first line of the work,
+        count its number of occurrences, line_count its number of lines and
+        data its postings, encoded like those of the index file but without
+        the id of the first line. Trigrams maps each trigram to a tuple
+        (first, last, line_count, data) likewise.
+    """
+    lines, analyzer = work
+    word_counts = []
+    term_entries = {}
+    trigram_line_ids = {}
+    for line_id, line in enumerate(lines):
+        words = analyzer.analyze_spans(line)
+        word_counts.append(len(words))
+        occurrences = {}
+        for position, (word, offset, _) in enumerate(words):
+            try:
+                occurrences[word].append((position, offset))
+            except KeyError:
+                occurrences[word] = [(position, offset)]
+        for word, word_occurrences in occurrences.iteritems():
+            entry = term_entries.get(word)
+            if entry is None:
+                entry = term_entries[word] = [line_id, 0, 0, 0, []]
+            numbers = entry[4]
+            if len(word_occurrences) == 1:
+                numbers += (line_id - entry[1], 1) + word_occurrences[0]
+            else:
+                numbers += [line_id - entry[1], len(word_occurrences)]
+                for values in zip(*word_occurrences):
+                    numbers += [value - previous_value for previous_value,
+                        value in zip((0,) + values[:-1], values)]
+            entry[1] = line_id
+            entry[2] += len(word_occurrences)
+            entry[3] += 1
+        for trigram in get_trigrams(line):
+            try:
+                trigram_line_ids[trigram].append(line_id)
+            except KeyError:
+                trigram_line_ids[trigram] = [line_id]
+
+    terms = dict((term, (first, last, count, line_count,
+        postings_codec.encode_varints(numbers[1:])))
+        for term, (first, last, count, line_count, numbers)
+        in term_entries.iteritems())
+    trigrams = dict((trigram, (line_ids[0], line_ids[-1], len(line_ids),
+        postings_codec.encode_varints([line_id - previous for previous,
+        line_id in zip(line_ids, line_ids[1:])])))
+        for trigram, line_ids in trigram_line_ids.iteritems())
+    return word_counts, terms, trigrams
+
+
+def _join_postings(chunks):
+    """Join the postings of the works of a term or trigram.
+
+    Args:
+        chunks: a list of tuples (start, first, last, data) sorted by start,
+            being start the id of the first line of a work and first, last
+            and data those returned by _encode_work for the work.
+
+    Returns:
+        The postings of the corpus, as a string.
+    """
+    pieces = []
+    previous = 0
+    for start, first, last, data in chunks:
+        pieces.append(postings_codec.encode_varints([start + first -
+            previous]))
+        pieces.append(data)
+        previous = start + last
+    return ''.join(pieces)
+
+
+def write_index_file(index, path, map_function=map):
+    """Write the index file of a corpus.
+
+    The postings of each work are encoded on their own by _encode_work, and
+    then joined, so the works can be encoded in parallel.
+
+    Args:
+        index: an index_builder.CorpusIndex.
+        path: path of the file to write.
+        map_function: a function like map that runs _encode_work on each
+            work, like the map of a multiprocessing.Pool to encode them in
+            parallel.
+    """
+    work_lines = []
+    work_starts = []
+    file_index = None
+    for line_id, (line_file, _, line, _) in enumerate(index.lines):
+        if line_file != file_index:
+            file_index = line_file
+            work_lines.append([])
+            work_starts.append(line_id)
+        work_lines[-1].append(line)
+    results = map_function(_encode_work,
+        [(lines, index.analyzer) for lines in work_lines])
+
+    word_counts = []
+    term_chunks = {}
+    trigram_chunks = {}
+    for start, (line_word_counts, work_terms, work_trigrams) in zip(
+            work_starts, results):
+        word_counts += line_word_counts
+        for term, (first, last, count, line_count, data) in \
+                work_terms.iteritems():
+            chunk = (start, first, last, count, line_count, data)
+            try:
+                term_chunks[term].append(chunk)
+            except KeyError:
+                term_chunks[term] = [chunk]
+        for trigram, (first, last, line_count, data) in \
+                work_trigrams.iteritems():
+            chunk = (start, first, last, line_count, data)
+            try:
+                trigram_chunks[trigram].append(chunk)
+            except KeyError:
+                trigram_chunks[trigram] = [chunk]
+
+    names = [[], 0]
+    works = []
+    chars = []
+    char_ids = {}
+    segments = []
+    segment = None
+    lines = []
+    text = []
+    text_size = 0
+    file_index = None
+    line_scenes = _iter_line_scenes(index)
+    for line_id, (line_file, _, line, character) in enumerate(index.lines):
+        if line_file != file_index:
+            file_index = line_file
+            works.append(_add_name(names, index.titles[file_index]) +
+                (line_id,))
+        work_id = len(works) - 1
+        char_id = char_ids.get((work_id, character))
+        if char_id is None:
+            char_id = char_ids[(work_id, character)] = len(chars)
+            chars.append(_add_name(names, character) + (work_id,))
+        act, scene = next(line_scenes)
+        if segment != (work_id, act, scene):
+            segment = (work_id, act, scene)
+            segments.append(_add_name(names, act) + _add_name(names, scene) +
+                (line_id,))
+            number = 0
+        if character == _DIRECTIONS:
+            line_number = 0
+        else:
+            number += 1
+            line_number = number
+        lines.append((text_size, char_id, word_counts[line_id], line_number))
+        text.append(line)
+        text_size += len(line)
+    lines.append((text_size, 0, 0, 0))
+    works.append((0, 0, len(index.lines)))
+    segments.append((0, 0, 0, 0, len(index.lines)))
+
+    terms = []
+    term_text = []
+    postings = []
+    term_offset = 0
+    postings_offset = 0
+    for term in sorted(term_chunks):
+        chunks = term_chunks[term]
+        data = _join_postings([(start, first, last, chunk_data)
+            for start, first, last, _, _, chunk_data in chunks])
+        terms.append((term_offset, len(term), postings_offset, len(data),
+            sum(chunk[3] for chunk in chunks),
+            sum(chunk[4] for chunk in chunks)))
+        term_text.append(term)
+        postings.append(data)
+        term_offset += len(term)
+        postings_offset += len(data)
+
+    trigrams = []
+    trigram_postings = []
+    postings_offset = 0
+    for trigram in sorted(trigram_chunks):
+        chunks = trigram_chunks[trigram]
+        data = _join_postings([(start, first, last, chunk_data)
+            for start, first, last, _, chunk_data in chunks])
+        trigrams.append((trigram, postings_offset, len(data),
+            sum(chunk[3] for chunk in chunks)))
+        trigram_postings.append(data)
+        postings_offset += len(data)
+
+    sections = [
+        ('text', ''.join(text)),
+        ('lines', _pack(_LINE, lines)),
+        ('works', _pack(_NAME, works)),
+        ('chars', _pack(_NAME, chars)),
+        ('segments', _pack(_SEGMENT, segments)),
+        ('names', ''.join(names[0])),
+        ('terms', _pack(_TERM, terms)),
+        ('term_text', ''.join(term_text)),
+        ('stats', _STATS.pack(len(index.lines), sum(word_counts))),
+        ('analyzer', json.dumps(index.analyzer.get_config())),
+        ('postings', ''.join(postings)),
+        ('trigrams', _pack(_TRIGRAM, trigrams)),
+        ('trigram_postings', ''.join(trigram_postings)),
+    ]
+    offset = _HEADER.size + _SECTION.size * len(sections)
+    with open(path, 'wb') as index_file:
+        index_file.write(_HEADER.pack(_MAGIC, _VERSION, len(sections)))
+        for name, data in sections:
+            index_file.write(_SECTION.pack(name, offset, len(data)))
+            offset += len(data)
+        for _, data in sections:
+            index_file.write(data)
+
+
+def get_index_file(path):
+    """Get the index file of a path, opened once per instance.
+
+    The returned IndexFile is shared by all threads.
+
+    Returns:
+        An IndexFile, or None if there is no index file in path.
+    """
+    if path not in _index_files:
+        with _lock:
+            if path not in _index_files:
+                index_file = None
+                if os.path.exists(path):
+                    index_file = IndexFile.open(path)
+                _index_files[path] = index_file
+    return _index_files[path]
+
+
+class IndexFile(object):
+    """Searches the index file of a corpus.
+
+    Only the small tables of works and characters are decoded when the file
+    is opened. Terms are found by a binary search over the term dictionary in
+    the file, and only the postings and lines of the results are read.
+
+    Attributes:
+        analyzer: the analyzer.Analyzer that built the index.
+    """
+
+    def __init__(self, data):
+        """Initialize the index with the contents of an index file.
+
+        Args:
+            data: the contents of the file, as a string or a memory map.
+
+        Raises:
+            ValueError: if data is not an index file this module can read.
+        """
+        self._data = data
+        magic, version, section_count = _HEADER.unpack_from(data, 0)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError('Not an index file of version %d' % _VERSION)
+        self._sections = {}
+        for number in range(section_count):
+            name, offset, length = _SECTION.unpack_from(data,
+                _HEADER.size + number * _SECTION.size)
+            self._sections[name.rstrip('\0')] = (offset, length)
+        names = self._get_section('names')
+        works = list(self._iter_records('works', _NAME))
+        self._titles = [names[offset:offset + length]
+            for offset, length, _ in works[:-1]]
+        self._first_lines = [first_line for _, _, first_line in works]
+        chars = list(self._iter_records('chars', _NAME))
+        self._char_names = [names[offset:offset + length]
+            for offset, length, _ in chars]
+        self._char_works = [work_id for _, _, work_id in chars]
+        segments = list(self._iter_records('segments', _SEGMENT))
+        self._segment_acts = [names[offset:offset + length]
+            for offset, length, _, _, _ in segments[:-1]]
+        self._segment_scenes = [names[offset:offset + length]
+            for _, _, offset, length, _ in segments[:-1]]
+        self._segment_lines = [first_line for _, _, _, _, first_line in
+            segments]
+        self._term_count = self._sections['terms'][1] / _TERM.size
+        self._trigram_count = self._sections['trigrams'][1] / _TRIGRAM.size
+        self._line_count, self._word_count = _STATS.unpack_from(data,
+            self._sections['stats'][0])
+        self.analyzer = analyzers.get_analyzer(
+            json.loads(self._get_section('analyzer')))
+
+    @classmethod
+    def open(cls, path):
+        """Open an index file, mapping it in memory if possible."""
+        with open(path, 'rb') as index_file:
+            if mmap is None:
+                return cls(index_file.read())
+            return cls(mmap.mmap(index_file.fileno(), 0,
+                access=mmap.ACCESS_READ))
+
+    def _get_section(self, name):
+        """Get the contents of a section."""
+        offset, length = self._sections[name]
+        return self._data[offset:offset + length]
+
+    def _iter_records(self, name, record):
+        """Iterate over the records of a section."""
+        offset, length = self._sections[name]
+        for position in range(offset, offset + length, record.size):
+            yield record.unpack_from(self._data, position)
+
+    def _get_record(self, name, record, number):
+        """Get a record of a section."""
+        return record.unpack_from(self._data,
+            self._sections[name][0] + number * record.size)
+
+    def _find_term(self, term):
+        """Find the entry of a term in the term dictionary, or None."""
+        if isinstance(term, unicode):
+            term = term.encode('utf-8')
+        text_offset = self._sections['term_text'][0]
+        low, high = 0, self._term_count
+        while low < high:
+            middle = (low + high) // 2
+            entry = self._get_record('terms', _TERM, middle)
+            start = text_offset + entry[0]
+            middle_term = self._data[start:start + entry[1]]
+            if middle_term < term:
+                low = middle + 1
+            elif middle_term > term:
+                high = middle
+            else:
+                return entry
+        return None
+
+    def get_positions(self, term):
+        """Get the lines in which a term appears and its positions in them.
+
+        Returns:
+            A list of tuples (line_id, positions) sorted by line id, being
+            positions the sorted list of the positions of the term in the line.
+        """
+        entry = self._find_term(term)
+        if entry is None:
+            return []
+        start = self._sections['postings'][0] + entry[2]
+        numbers = postings_codec.iter_varints(
+            self._data[start:start + entry[3]])
+        postings = []
+        line_id = 0
+        for delta in numbers:
+            line_id += delta
+            count = next(numbers)
+            positions = []
+            position = 0
+            for _ in range(count):
+                position += next(numbers)
+                positions.append(position)
+            for _ in range(count):
+                next(numbers)
+            postings.append((line_id, positions))
+        return postings
+
+    def iter_offsets(self, term):
+        """Decode the postings of a term lazily, with the offsets of the
+        occurrences of the term instead of their positions.
+
+        Yields:
+            Tuples (line_id, count, offsets) sorted by line id, being offsets
+            the sorted list of the indexes of the first character of each
+            occurrence of the term in the text of the line.
+        """
+        entry = self._find_term(term)
+        if entry is None:
+            return
+        start = self._sections['postings'][0] + entry[2]
+        numbers = postings_codec.iter_varints(
+            self._data[start:start + entry[3]])
+        line_id = 0
+        for delta in numbers:
+            line_id += delta
+            count = next(numbers)
+            for _ in range(count):
+                next(numbers)
+            offsets = []
+            offset = 0
+            for _ in range(count):
+                offset += next(numbers)
+                offsets.append(offset)
+            yield line_id, count, offsets
+
+    def iter_occurrences(self, term):
+        """Decode the postings of a term lazily, with both the positions and
+        the offsets of its occurrences.
+
+        Yields:
+            Tuples (line_id, positions, offsets) sorted by line id, being
+            positions and offsets the sorted lists of those of the
+            occurrences of the term in the line, in the same order.
+        """
+        entry = self._find_term(term)
+        if entry is None:
+            return
+        start = self._sections['postings'][0] + entry[2]
+        numbers = postings_codec.iter_varints(
+            self._data[start:start + entry[3]])
+        line_id = 0
+        for delta in numbers:
+            line_id += delta
+            count = next(numbers)
+            lists = ([], [])
+            for values in lists:
+                value = 0
+                for _ in range(count):
+                    value += next(numbers)
+                    values.append(value)
+            yield (line_id,) + lists
+
+    def get_term_spans(self, terms, line_ids):
+        """Get the spans of the occurrences of some terms in some lines, from
+        their offsets, without reading the text of the lines.
+
+        Args:
+            terms: the terms.
+            line_ids: the sorted ids of the lines.
+
+        Returns:
+            A dict that maps the id of each line with an occurrence of a term
+            to the sorted spans (start, end) of the occurrences in its text,
+            as expected by formatter.apply_tag_to_spans.
+        """
+        wanted = set(line_ids)
+        last = line_ids[-1] if line_ids else -1
+        spans = {}
+        for term in set(terms):
+            for line_id, _, offsets in self.iter_offsets(term):
+                if line_id > last:
+                    break
+                if line_id in wanted:
+                    spans.setdefault(line_id, []).extend((offset,
+                        offset + len(term)) for offset in offsets)
+        for line_spans in spans.itervalues():
+            line_spans.sort()
+        return spans
+
+    def get_phrase_spans(self, terms, line_ids):
+        """Get the spans of the occurrences of a phrase in some lines, like
+        get_term_spans.
+
+        Each span goes from the first character of the first word of the
+        phrase to the last one of its last word, and overlapping occurrences
+        share a single span.
+
+        Args:
+            terms: the words of the phrase (lowercase), in order.
+            line_ids: the sorted ids of the lines.
+        """
+        wanted = set(line_ids)
+        last = line_ids[-1] if line_ids else -1
+        term_occurrences = []
+        for term in terms:
+            occurrences = {}
+            for line_id, positions, offsets in self.iter_occurrences(term):
+                if line_id > last:
+                    break
+                if line_id in wanted:
+                    occurrences[line_id] = dict(zip(positions, offsets))
+            term_occurrences.append(occurrences)
+        spans = {}
+        for line_id in line_ids:
+            line_occurrences = [occurrences.get(line_id, {})
+                for occurrences in term_occurrences]
+            line_spans = []
+            for position, offset in sorted(line_occurrences[0].iteritems()):
+                if not all(position + distance in following for distance,
+                        following in enumerate(line_occurrences[1:], 1)):
+                    continue
+                end = line_occurrences[-1][position + len(terms) - 1] + \
+                    len(terms[-1])
+                if line_spans and offset <= line_spans[-1][1]:
+                    line_spans[-1] = (line_spans[-1][0], end)
+                else:
+                    line_spans.append((offset, end))
+            if line_spans:
+                spans[line_id] = line_spans
+        return spans
+
+    def iter_postings(self, term):
+        """Decode the postings of a term lazily, skipping the positions.
+
+        Yields:
+            Tuples (line_id, count) sorted by line id, with the number of
+            occurrences of the term in each line.
+        """
+        entry = self._find_term(term)
+        if entry is None:
+            return
+        start = self._sections['postings'][0] + entry[2]
+        numbers = postings_codec.iter_varints(
+            self._data[start:start + entry[3]])
+        line_id = 0
+        for delta in numbers:
+            line_id += delta
+            count = next(numbers)
+            for _ in range(2 * count):
+                next(numbers)
+            yield line_id, count
+
+    def get_line_ids(self, term):
+        """Get the sorted ids of the lines in which a term appears."""
+        return [line_id for line_id, _ in self.iter_postings(term)]
+
+    def get_document_frequency(self, term):
+        """Get the number of lines in which a term appears, without decoding
+        its postings."""
+        entry = self._find_term(term)
+        return entry[5] if entry else 0
+
+    def _find_trigram(self, trigram):
+        """Find the entry of a trigram, or None."""
+        low, high = 0, self._trigram_count
+        while low < high:
+            middle = (low + high) // 2
+            entry = self._get_record('trigrams', _TRIGRAM, middle)
+            if entry[0] < trigram:
+                low = middle + 1
+            elif entry[0] > trigram:
+                high = middle
+            else:
+                return entry
+        return None
+
+    def get_trigram_line_ids(self, trigram):
+        """Get the sorted ids of the lines whose lowercase text has a string
+        of 3 characters."""
+        entry = self._find_trigram(trigram)
+        if entry is None:
+            return []
+        start = self._sections['trigram_postings'][0] + entry[1]
+        line_ids = []
+        line_id = 0
+        for delta in postings_codec.iter_varints(
+                self._data[start:start + entry[2]]):
+            line_id += delta
+            line_ids.append(line_id)
+        return line_ids
+
+    def get_trigram_frequency(self, trigram):
+        """Get the number of lines whose lowercase text has a string of 3
+        characters, without decoding its postings."""
+        entry = self._find_trigram(trigram)
+        return entry[3] if entry else 0
+
+    def get_terms(self):
+        """Get every term of the index, sorted."""
+        term_text = self._get_section('term_text')
+        return [term_text[offset:offset + length]
+            for offset, length, _, _, _, _ in self._iter_records('terms',
+            _TERM)]
+
+    def get_line_count(self):
+        """Get the number of lines of the corpus."""
+        return self._line_count
+
+    def get_average_line_length(self):
+        """Get the average number of words of the lines of the corpus."""
+        return float(self._word_count) / max(self._line_count, 1)
+
+    def get_postings(self, term):
+        """Get the lines in which a term appears.
+
+        Returns:
+            A list of tuples (line_id, count) sorted by line id, with the
+            number of occurrences of the term in each line.
+        """
+        return list(self.iter_postings(term))
+
+    def get_phrase_postings(self, terms):
+        """Get the lines in which a phrase appears.
+
+        The lines that contain all the terms are found by intersecting their
+        postings, starting from the rarest term, and then the positions of
+        the terms in those lines are checked for adjacency.
+
+        Args:
+            terms: the words of the phrase (lowercase), in order.
+
+        Returns:
+            A list of tuples (line_id, count) sorted by line id, with the
+            number of occurrences of the phrase in each line.
+        """
+        if not terms:
+            return []
+        term_postings = [dict(self.get_positions(term)) for term in terms]
+        line_ids = min(term_postings, key=len).viewkeys()
+        for positions in term_postings:
+            line_ids = line_ids & positions.viewkeys()
+        postings = []
+        for line_id in sorted(line_ids):
+            starts = set(term_postings[0][line_id])
+            for distance, positions in enumerate(term_postings[1:], 1):
+                starts.intersection_update(position - distance
+                    for position in positions[line_id])
+            if starts:
+                postings.append((line_id, len(starts)))
+        return postings
+
+    def get_line(self, line_id):
+        """Get the text of a line."""
+        start = self._get_record('lines', _LINE, line_id)[0]
+        end = self._get_record('lines', _LINE, line_id + 1)[0]
+        text_offset = self._sections['text'][0]
+        return self._data[text_offset + start:text_offset + end]
+
+    def get_line_citation(self, line_id):
+        """Get the citation of a line.
+
+        Returns:
+            A tuple (act, scene, number), with empty act and scene names for
+            lines outside scenes and number 0 for stage directions.
+        """
+        segment = bisect.bisect(self._segment_lines, line_id) - 1
+        return (self._segment_acts[segment], self._segment_scenes[segment],
+            self._get_record('lines', _LINE, line_id)[3])
+
+    def get_line_length(self, line_id):
+        """Get the number of words of a line."""
+        return self._get_record('lines', _LINE, line_id)[2]
+
+    def get_line_character(self, line_id):
+        """Get the id of the character of a line."""
+        return self._get_record('lines', _LINE, line_id)[1]
+
+    def get_line_work(self, line_id):
+        """Get the id of the work of a line."""
+        return bisect.bisect(self._first_lines, line_id) - 1
+
+    def get_work_ids(self, title):
+        """Get the ids of the works with a title."""
+        return [work_id for work_id, work_title in enumerate(self._titles)
+            if work_title == title]
+
+    def get_work_lines(self, work_id):
+        """Get the range of ids of the lines of a work."""
+        return self._first_lines[work_id], self._first_lines[work_id + 1]
+
+    def get_title(self, work_id):
+        """Get the title of a work."""
+        return self._titles[work_id]
+
+    def get_character_name(self, char_id):
+        """Get the name of a character."""
+        return self._char_names[char_id]
+
+    def get_line_ranges(self, work_title=None, act=None, scene=None):
+        """Get the ranges of ids of the lines of a work, act and scene.
+
+        The ranges are precomputed, so filtering postings with them only
+        costs a binary search per range.
+
+        Args:
+            work_title: title of the work, or None for any work.
+            act: name of the act, like 'I', or None for any act.
+            scene: name of the scene, like 'II', or None for any scene.
+
+        Returns:
+            A sorted list of tuples (start, end), or None if every line passes
+            the filters.
+        """
+        if work_title is None and act is None and scene is None:
+            return None
+        work_ids = None
+        if work_title is not None:
+            work_ids = set(self.get_work_ids(work_title))
+        if act is None and scene is None:
+            return [self.get_work_lines(work_id) for work_id in
+                sorted(work_ids)]
+        ranges = []
+        for segment, first_line in enumerate(self._segment_lines[:-1]):
+            if act is not None and self._segment_acts[segment] != act:
+                continue
+            if scene is not None and self._segment_scenes[segment] != scene:
+                continue
+            if work_ids is not None and \
+                self.get_line_work(first_line) not in work_ids:
+                continue
+            ranges.append((first_line, self._segment_lines[segment + 1]))
+        return ranges
+
+    def filter_postings(self, postings, work_title=None, char_name=None,
+                        act=None, scene=None):
+        """Keep only the postings of a work, character, act and scene.
+
+        Args:
+            postings: a list of tuples sorted by line id, being the line id
+                the first element of each one, like the lists returned by
+                get_postings.
+            work_title: title of the work, or None for any work.
+            char_name: name of the character, or None for any character. It
+                is only used along with a work.
+            act: name of the act, or None for any act.
+            scene: name of the scene, or None for any scene.
+
+        Returns:
+            The postings of the lines that pass the filters.
+        """
+        ranges = self.get_line_ranges(work_title, act, scene)
+        if ranges is None:
+            return postings
+        filtered = []
+        line_ids = [posting[0] for posting in postings]
+        for start, end in ranges:
+            filtered += postings[bisect.bisect_left(line_ids, start):
+                bisect.bisect_left(line_ids, end)]
+        if char_name is not None and work_title is not None:
+            filtered = [posting for posting in filtered
+                if self._char_names[self.get_line_character(posting[0])] ==
+                char_name]
+        return filtered
+
+    def get_line_filter(self, work_title=None, char_name=None, act=None,
+                        scene=None):
+        """Get a function that tells if a line passes the filters of a work,
+        character, act and scene, like filter_postings, without decoding any
+        postings.
+
+        Returns:
+            A function that takes a line id and returns a boolean, or None if
+            every line passes the filters.
+        """
+        ranges = self.get_line_ranges(work_title, act, scene)
+        if ranges is None:
+            return None
+        starts = [start for start, _ in ranges]
+        def accepts(line_id):
+            """Tell if a line passes the filters."""
+            number = bisect.bisect(starts, line_id) - 1
+            if number < 0 or line_id >= ranges[number][1]:
+                return False
+            return char_name is None or work_title is None or \
+                char_name == self._char_names[self.get_line_character(line_id)]
+        return accepts
+
+    def _get_grouped_lines(self, postings):
+        """Group the lines of a list of postings by work and character.
+
+        Returns:
+            A tuple (mentions, count). Mentions is a dictionary of
+            dictionaries, being the first key the work title and the second,
+            the character name, and count is the sum of the counts of the
+            postings.
+        """
+        mentions = {}
+        for line_id, _ in postings:
+            char_id = self.get_line_character(line_id)
+            title = self._titles[self._char_works[char_id]]
+            mentions.setdefault(title, {}).setdefault(
+                self._char_names[char_id], []).append(self.get_line(line_id))
+        return mentions, sum(count for _, count in postings)
+
+    def _get_grouped_spans(self, postings, line_spans):
+        """Group the spans of the lines of a list of postings like
+        _get_grouped_lines groups the lines.
+
+        Args:
+            postings: the postings of the lines.
+            line_spans: a dict that maps line ids to their spans, like those
+                returned by get_term_spans.
+
+        Returns:
+            A dictionary indexed like the mentions of _get_grouped_lines,
+            with the spans of each line.
+        """
+        spans = {}
+        for line_id, _ in postings:
+            char_id = self.get_line_character(line_id)
+            title = self._titles[self._char_works[char_id]]
+            spans.setdefault(title, {}).setdefault(
+                self._char_names[char_id], []).append(
+                line_spans.get(line_id, []))
+        return spans
+
+    def get_mention_page(self, word, work_title=None, char_name=None,
+                         act=None, scene=None, start=0, page_size=None):
+        """Get a page of the mentions of each character that says a word in
+        an act and scene, along with the citation of each one.
+
+        Every posting of the word is decoded, since the number of lines of
+        each character and the count are returned too, but only the lines of
+        the page are read and cited, so most of the cost of a page is that of
+        its own lines.
+
+        Args:
+            word: the word (lowercase).
+            work_title: title of the work, or None for any work.
+            char_name: name of the character, or None for any character.
+            act: name of the act, like 'I', or None for any act.
+            scene: name of the scene, like 'II', or None for any scene.
+            start: number of lines of each character before the page.
+            page_size: the largest number of lines of each character in the
+                page, or None for all of them.
+
+        Returns:
+            A tuple (mentions, citations, spans, line_counts, count).
+            Mentions is a dictionary of dictionaries with the lines of the
+            page, being the first key the work title and the second, the
+            character name, and count is the number of occurrences of the
+            word in all the pages. Citations, spans and line_counts are
+            dictionaries with the same keys. The values of citations are the
+            lists of citations (act, scene, number) of the lines, those of
+            spans are lists with the sorted spans (start, end) of the word in
+            each line, so it can be highlighted by
+            formatter.apply_tag_to_spans, and those of line_counts are the
+            number of lines of each character.
+        """
+        postings = self.filter_postings(list(self.iter_offsets(word)),
+            work_title, char_name, act, scene)
+        mentions = {}
+        citations = {}
+        spans = {}
+        line_counts = {}
+        end = None if page_size is None else start + page_size
+        for line_id, _, offsets in postings:
+            char_id = self.get_line_character(line_id)
+            title = self._titles[self._char_works[char_id]]
+            name = self._char_names[char_id]
+            number = line_counts.setdefault(title, {}).get(name, 0)
+            line_counts[title][name] = number + 1
+            lines = mentions.setdefault(title, {}).setdefault(name, [])
+            line_citations = citations.setdefault(title, {}).setdefault(name,
+                [])
+            line_spans = spans.setdefault(title, {}).setdefault(name, [])
+            if number < start or (end is not None and number >= end):
+                continue
+            lines.append(self.get_line(line_id))
+            line_citations.append(self.get_line_citation(line_id))
+            line_spans.append([(offset, offset + len(word))
+                for offset in offsets])
+        return (mentions, citations, spans, line_counts,
+            sum(count for _, count, _ in postings))
+
+    def get_line_mentions(self, line_ids, work_title=None, char_name=None):
+        """Get lines grouped by work and character.
+
+        Args:
+            line_ids: the sorted ids of the lines.
+            work_title: title of the work, or None for any work.
+            char_name: name of the character, or None for any character.
+
+        Returns:
+            A tuple (mentions, count), being mentions a dictionary of
+            dictionaries of lines, being the first key the work title and the
+            second, the character name, and count the number of lines that
+            pass the filters.
+        """
+        return self._get_grouped_lines(self.filter_postings(
+            [(line_id, 1) for line_id in line_ids], work_title, char_name))
+
+    def get_line_span_mentions(self, line_ids, terms, work_title=None,
+                               char_name=None):
+        """Get lines grouped by work and character, like get_line_mentions,
+        along with the spans of some terms in them.
+
+        Args:
+            line_ids: the sorted ids of the lines.
+            terms: the terms whose occurrences are spanned.
+            work_title: title of the work, or None for any work.
+            char_name: name of the character, or None for any character.
+
+        Returns:
+            A tuple (mentions, spans, count), being mentions and count like
+            those of get_line_mentions and spans a dictionary with the same
+            keys as mentions, with the sorted spans of the terms in each line
+            (see get_term_spans).
+        """
+        postings = self.filter_postings([(line_id, 1) for line_id in line_ids],
+            work_title, char_name)
+        mentions, count = self._get_grouped_lines(postings)
+        return mentions, self._get_grouped_spans(postings, self.get_term_spans(
+            terms, [line_id for line_id, _ in postings])), count
+
+    def get_phrase_span_mentions(self, terms, work_title=None,
+                                 char_name=None):
+        """Get the mentions of a phrase, grouped by work and character, along
+        with the spans of the phrase in them (see get_phrase_spans).
+
+        Args:
+            terms: the words of the phrase (lowercase), in order.
+            work_title: title of the work, or None for any work.
+            char_name: name of the character, or None for any character.
+
+        Returns:
+            A tuple (mentions, spans, count), like get_line_span_mentions,
+            being count the number of occurrences of the phrase.
+        """
+        postings = self.filter_postings(self.get_phrase_postings(terms),
+            work_title, char_name)
+        mentions, count = self._get_grouped_lines(postings)
+        return mentions, self._get_grouped_spans(postings,
+            self.get_phrase_spans(terms, [line_id for line_id, _
+            in postings])), count
+
+    def get_counts(self, word):
+        """Get the number of occurrences of a word by work and character.
+
+        Returns:
+            A tuple (count, works). Count is the number of occurrences of the
+            word and works maps each work title to a tuple (count, chars), in
+            which chars maps the name of each character to its count.
+        """
+        works = {}
+        total = 0
+        for line_id, count in self.get_postings(word):
+            char_id = self.get_line_character(line_id)
+            title = self._titles[self._char_works[char_id]]
+            work_count, chars = works.get(title, (0, {}))
+            char_name = self._char_names[char_id]
+            chars[char_name] = chars.get(char_name, 0) + count
+            works[title] = (work_count + count, chars)
+            total += count
+        return total, works
+
+    def get_works(self, word):
+        """Get the sorted titles of the works in which a word occurs."""
+        return sorted(set(self._titles[self.get_line_work(line_id)]
+            for line_id, _ in self.get_postings(word)))
+
+    def get_characters(self, word, work_title):
+        """Get the sorted names of the characters that say a word in a
+        work."""
+        return sorted(set(
+            self._char_names[self.get_line_character(line_id)]
+            for line_id, _ in self.filter_postings(self.get_postings(word),
+                work_title)))
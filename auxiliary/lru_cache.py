@@ -0,0 +1,80 @@
+"""A bounded in-process cache that evicts the least recently used entries.
+
+Each instance of the app keeps its caches in memory between requests, so an
+LRUCache lives in a module global and is shared by every request an instance
+serves. It counts its hits, misses and evictions, so its size can be tuned
+from its hit rate.
+"""
+
+import collections
+import threading
+
+
+class LRUCache(object):
+    """Maps keys to values, keeping only the most recently used ones.
+
+    Attributes:
+        capacity: the largest number of entries kept.
+        hits: number of gets that found their key.
+        misses: number of gets that did not find their key.
+        evictions: number of entries dropped to make room for others.
+    """
+
+    def __init__(self, capacity):
+        if capacity < 1:
+            raise ValueError('The capacity of a cache must be positive')
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        """Get the value of a key and mark it as the most recently used."""
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return default
+            self.hits += 1
+            value = self._entries.pop(key)
+            self._entries[key] = value
+            return value
+
+    def put(self, key, value):
+        """Set the value of a key, evicting the least recently used entry if
+        the cache is full."""
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = value
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every entry, without counting them as evictions."""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self):
+        """Get the counters of the cache.
+
+        Returns:
+            A dict with the size, capacity, hits, misses, evictions and hit
+            rate of the cache, being the hit rate 0 before any get.
+        """
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'capacity': self.capacity,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': float(self.hits) / lookups if lookups else 0.0
+        }
@@ -0,0 +1,208 @@
+"""Structural parser of Shakespeare's plays.
+
+A play is a title, an epilog with the dramatis personae that ends with the
+title again, and a body made of act and scene headings, speeches and stage
+directions:
+
+    ACT I
+
+    SCENE I	Elsinore. A platform before the castle.
+
+    	[FRANCISCO at his post. Enter to him BERNARDO]
+
+    BERNARDO	Who's there?
+
+parse_play walks the lines of a work once and finds the byte ranges of each of
+these parts, and which character each line belongs to. Works that are not
+plays, like the poems, have no structure and their lines belong to no
+character.
+"""
+
+import re
+
+from auxiliary.preprocessing import find_title
+from auxiliary.preprocessing import get_epilog_len
+from auxiliary.preprocessing import get_lines
+
+# Character of the lines before the first speech of a play.
+EPILOG = 'EPILOG'
+# Character of the stage directions and of the act and scene headings.
+STAGE_DIRECTIONS = 'STAGE DIRECTIONS'
+
+_HEADING_REGEX = re.compile(r'(ACT|SCENE)\b([^\t]*)')
+
+
+class Play(object):
+    """The structure of a work, as found by parse_play.
+
+    Ranges are tuples that start with the offsets (start, end) of their first
+    and past their last byte in the text of the work, and they are sorted by
+    start.
+
+    Attributes:
+        title: the title of the work, as it is written in it.
+        body_offset: the offset of the body of the play, after the epilog, or
+            None if the work is not a play.
+        acts: list of (start, end, name) of each act. Name is the number of
+            the act, like 'I'.
+        scenes: list of (start, end, act, name) of each scene. Act is the name
+            of its act, or None if it is not in an act, and name is the number
+            of the scene, or '' for scenes without number like prologues.
+        speeches: list of (start, end, character) of each speech. A speech
+            ends with its last line, and stage directions inside it do not
+            split it.
+        directions: list of (start, end) of each stage direction, including
+            those that span many lines.
+        offset_to_char: dict that maps the offsets in which the character of
+            the lines changes to the new character, as expected by
+            preprocessing.get_characters_lines. Lines of stage directions and
+            headings belong to STAGE_DIRECTIONS, and the lines after them to
+            the character of the speech they interrupt.
+    """
+
+    def __init__(self, title, body_offset):
+        self.title = title
+        self.body_offset = body_offset
+        self.acts = []
+        self.scenes = []
+        self.speeches = []
+        self.directions = []
+        self.offset_to_char = {}
+
+
+class _PlayBuilder(object):
+    """Builds a Play one line at a time."""
+
+    def __init__(self, play):
+        self.play = play
+        self.character = EPILOG
+        self.line_character = EPILOG
+        self.act = None
+        self.scene = None
+        self.speech = None
+        self.direction = None
+
+    def attribute(self, offset, character):
+        """Attribute the lines from an offset to a character."""
+        if character != self.line_character:
+            self.play.offset_to_char[offset] = character
+            self.line_character = character
+
+    def close_speech(self):
+        """End the current speech, if any."""
+        if self.speech is not None:
+            self.play.speeches.append(tuple(self.speech))
+            self.speech = None
+
+    def close_scene(self, offset):
+        """End the current scene, if any, at an offset."""
+        self.close_speech()
+        if self.scene is not None:
+            start, act, name = self.scene
+            self.play.scenes.append((start, offset, act, name))
+            self.scene = None
+
+    def close_act(self, offset):
+        """End the current act, if any, at an offset."""
+        self.close_scene(offset)
+        if self.act is not None:
+            start, name = self.act
+            self.play.acts.append((start, offset, name))
+            self.act = None
+
+    def add_heading(self, offset, kind, name):
+        """Add an act or scene heading line."""
+        if kind == 'ACT':
+            if self.act is None or self.act[1] != name:
+                self.close_act(offset)
+                self.act = (offset, name)
+            else:
+                self.close_scene(offset)
+        else:
+            self.close_scene(offset)
+            self.scene = (offset, self.act and self.act[1], name)
+        self.attribute(offset, STAGE_DIRECTIONS)
+
+    def add_speech(self, offset, end, character):
+        """Add the first line of a speech."""
+        self.close_speech()
+        self.speech = [offset, end, character]
+        self.character = character
+        self.attribute(offset, character)
+
+    def add_direction_line(self, offset, end, line):
+        """Add a line of a stage direction. Returns True if it ends it."""
+        if self.direction is None:
+            self.direction = [offset, end]
+        self.direction[1] = end
+        self.attribute(offset, STAGE_DIRECTIONS)
+        if ']' not in line:
+            return False
+        self.close_direction()
+        return True
+
+    def close_direction(self):
+        """End the current stage direction, if any."""
+        if self.direction is not None:
+            self.play.directions.append(tuple(self.direction))
+            self.direction = None
+
+    def add_speech_line(self, offset, end):
+        """Add a line that continues the current speech."""
+        self.attribute(offset, self.character)
+        if self.speech is not None:
+            self.speech[1] = end
+
+    def finish(self, offset):
+        """End every open range at the end of the text."""
+        self.close_direction()
+        self.close_act(offset)
+
+
+def parse_play(text):
+    """Find the structure of a work in a single pass over its lines.
+
+    Args:
+        text: string containing a work.
+
+    Returns:
+        A Play. If the work is not a play, or it has no speeches, all of its
+        lines belong to no character: offset_to_char is {0: ''}.
+    """
+    title = find_title(text)
+    play = Play(title, get_epilog_len(text, title))
+    if play.body_offset is None:
+        play.offset_to_char = {0: ''}
+        return play
+
+    builder = _PlayBuilder(play)
+    in_direction = False
+    for offset, line in get_lines(text[play.body_offset:]):
+        offset += play.body_offset
+        end = offset + len(line)
+        if line.strip() == '':
+            # Some stage directions lack their closing bracket, but they all
+            # end with their paragraph.
+            if in_direction:
+                builder.close_direction()
+                in_direction = False
+            continue
+        if in_direction:
+            in_direction = not builder.add_direction_line(offset, end, line)
+            continue
+        tab = line.rfind('\t')
+        heading = _HEADING_REGEX.match(line)
+        if heading:
+            builder.add_heading(offset, heading.group(1),
+                heading.group(2).strip())
+        elif 'A' <= line[0] <= 'Z' and tab != -1:
+            builder.add_speech(offset, end, line[:tab])
+        elif line.lstrip().startswith('['):
+            in_direction = not builder.add_direction_line(offset, end, line)
+        else:
+            builder.add_speech_line(offset, end)
+    builder.finish(len(text))
+
+    if not play.speeches:
+        play.offset_to_char = {0: ''}
+    return play
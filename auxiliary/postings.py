@@ -0,0 +1,118 @@
+"""Compact encoding of postings lists.
+
+A postings list is a sorted list of line ordinals (see
+preprocessing.get_line_ordinal). It is stored as the differences between
+consecutive ordinals, each one written as a varint: 7 bits per byte, with the
+high bit set in every byte but the last one. Lines of the same work are close
+to each other, so most differences fit in one or two bytes.
+"""
+
+import array
+
+# Maximum number of ordinals of an encoded chunk. Even if every difference
+# took the 10 bytes of a 64 bit varint, a chunk stays far below the size
+# limit of an entity.
+CHUNK_SIZE = 65536
+
+
+def _encode_long_varints(numbers):
+    """Encode a list of non-negative integers as varints, one byte at a
+    time."""
+    data = array.array('B')
+    for number in numbers:
+        while number > 0x7f:
+            data.append((number & 0x7f) | 0x80)
+            number >>= 7
+        data.append(number)
+    return data.tostring()
+
+
+# Varints of the numbers that take one or two bytes, which are most of the
+# differences of a postings list, so they are encoded by a lookup.
+_SHORT_VARINTS = [_encode_long_varints([number])
+    for number in range(1 << 14)]
+
+
+def encode_varints(numbers):
+    """Encode a list of non-negative integers as varints.
+
+    Returns:
+        The encoded list as a string.
+    """
+    numbers = list(numbers)
+    if not numbers:
+        return ''
+    if min(numbers) < 0 or max(numbers) >= len(_SHORT_VARINTS):
+        return _encode_long_varints(numbers)
+    short_varints = _SHORT_VARINTS
+    return ''.join([short_varints[number] for number in numbers])
+
+
+def iter_varints(data):
+    """Decode a string of varints lazily.
+
+    Args:
+        data: a string returned by encode_varints.
+
+    Yields:
+        The integers, in order.
+    """
+    number = 0
+    shift = 0
+    for byte in array.array('B', data):
+        number |= (byte & 0x7f) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        yield number
+        number = 0
+        shift = 0
+
+
+def encode_postings(ordinals):
+    """Encode a sorted list of ordinals.
+
+    Args:
+        ordinals: sorted list of non-negative integers, without repetitions.
+
+    Returns:
+        The encoded list as a string.
+    """
+    ordinals = list(ordinals)
+    return encode_varints(ordinal - previous for previous, ordinal in
+        zip([0] + ordinals[:-1], ordinals))
+
+
+def iter_postings(data):
+    """Decode the ordinals of an encoded list lazily.
+
+    Args:
+        data: a string returned by encode_postings.
+
+    Yields:
+        The ordinals, in order.
+    """
+    ordinal = 0
+    for delta in iter_varints(data):
+        ordinal += delta
+        yield ordinal
+
+
+def decode_postings(data):
+    """Decode an encoded list of ordinals. See iter_postings."""
+    return list(iter_postings(data))
+
+
+def encode_chunks(ordinals, chunk_size=CHUNK_SIZE):
+    """Encode a sorted list of ordinals in chunks of at most chunk_size.
+
+    Each chunk is encoded on its own, so it can be decoded without the
+    others.
+
+    Returns:
+        A list with the encoded chunks. It has at least one, maybe empty,
+        chunk.
+    """
+    chunks = [encode_postings(ordinals[start:start + chunk_size])
+        for start in range(0, len(ordinals), chunk_size)]
+    return chunks or ['']
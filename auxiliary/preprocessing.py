@@ -0,0 +1,177 @@
+"""Pure text processing of Shakespeare's works.
+
+These functions do not depend on App Engine, so they are shared by the
+mapreduce jobs in database_creation and by the offline index_builder.
+"""
+
+import bisect
+import re
+
+# Number of bits of a line ordinal that hold the offset of the line.
+_OFFSET_BITS = 32
+
+# Characters matched by \s in regexes.
+_WHITESPACE = ' \t\n\r\f\v'
+
+
+def get_character(char_map, sorted_offsets, offset):
+    """Get character relative to a line.
+
+    Args:
+        char_map: dict that relates a byte offset to the name of a character
+        sorted_offsets: sorted list of the keys in the char_map dict.
+        offset: initial byte offset of a line in the text file.
+
+    Returns:
+        character: a string with the name of the character or 'EPILOG' if
+        the line is part of the epilog.
+
+    Example:
+        Consider that char_map = {30: 'ANA', 7: 'BEATRIZ', 45: 'MARCO'}. This
+        means that the respective text file has character speaks starting at the
+        byte offsets 30, 7 and 45, and that these speaks are from Ana, Beatriz
+        and Marco, respectively.
+
+        If the character for the offset 32 is requested, this function will
+        return 'ANA', because this is the closest smaller offset.
+
+        The char_map built by play_parser.parse_play also has the offsets of
+        the stage directions, mapped to play_parser.STAGE_DIRECTIONS, and of
+        the lines that follow them, mapped back to the character whose speak
+        they interrupt. So lines that indicate stage behavior of characters
+        are not attributed to the previous character who pronounced anything.
+    """
+
+    #Find closest smaller offset via binary search
+    aux = bisect.bisect(sorted_offsets, offset) - 1
+    if aux >= 0:
+        closest_offset = sorted_offsets[aux]
+        return char_map[str(closest_offset)]
+    return 'EPILOG'
+
+
+def titlecase(title):
+    """Capitalize first letter of each word.
+
+    Args:
+        title: A string to be capitalized as title.
+
+    Returns:
+        The title with only the first letter of each word capitalized.
+    
+    Example: 'LOVE'S LABOUR'S LOST' returns 'Love's Labour's Lost'.
+    """
+    return re.sub(r"[A-Za-z]+('[A-Za-z]+)?", lambda mo:
+        mo.group(0)[0].upper() + mo.group(0)[1:].lower(), title)
+
+
+def find_title(text):
+    """Get first non-empty line of a text."""
+    title_reg = re.compile(r'\t([A-Z0-9]+.*[A-Z])\s*\n')
+    title = re.search(title_reg, text).group(1)
+    return title
+
+
+def get_epilog_len(text, title):
+    """Get the length of the epilog.
+
+    This function expects text to contain a section enclosed between two
+    appearances of <title>, which we call epilog. This section does not follow
+    the same part of the rest and stripping it makes the parsing of the file
+    easier.
+
+    The second appearance is the first one after a tab that is followed only
+    by whitespace up to the end of its line. The epilog ends after that
+    whitespace, at the beginning of the next non-blank line. Appearances are
+    found with str.find, so the text is scanned once.
+
+    Args:
+        text: string containing a work
+        title: a string containing the title the same way it is written in
+            text.
+
+    Returns:
+        epilog_len, if text is a play and therefore contains an epilog, or None,
+            otherwise.
+    """
+    marker = '\t' + title
+    first = text.find(marker)
+    if first == -1:
+        return None
+    start = first + len(marker)
+    while True:
+        found = text.find(marker, start)
+        if found == -1:
+            return None
+        end = found + len(marker)
+        blank_end = end
+        while blank_end < len(text) and text[blank_end] in _WHITESPACE:
+            blank_end += 1
+        last_newline = text.rfind('\n', end, blank_end)
+        if last_newline != -1:
+            return last_newline + 1
+        start = found + 1
+
+
+def get_lines(text):
+    """Split a text into lines, along with their byte offsets.
+
+    Lines are split the same way the ZipLineInputReader does, so the offsets
+    match the ones given to index_map.
+
+    Yields:
+        Tuples (offset, line), without the trailing newline.
+    """
+    offset = 0
+    while offset < len(text):
+        end = text.find('\n', offset)
+        if end == -1:
+            end = len(text)
+        yield offset, text[offset:end]
+        offset = end + 1
+
+
+def get_line_ordinal(file_index, offset):
+    """Get a number that identifies a line of the corpus.
+
+    Ordinals sort the same way as the lines in the corpus: by file index and
+    then by offset.
+
+    Args:
+        file_index: position of the file of the line inside the zip file.
+        offset: initial byte offset of the line in the text file.
+    """
+    return (file_index << _OFFSET_BITS) | offset
+
+
+def split_line_ordinal(ordinal):
+    """Get the (file_index, offset) of a line from its ordinal."""
+    return ordinal >> _OFFSET_BITS, ordinal & ((1 << _OFFSET_BITS) - 1)
+
+
+def get_characters_lines(text, offset_to_char):
+    """Attribute each non-empty line of a work to a character.
+
+    This gives the same result as calling get_character for each line, but
+    merges the lines with the sorted speaks offsets instead of searching them,
+    as both are visited in order.
+
+    Args:
+        text: string containing a work.
+        offset_to_char: a map of the type {offset: character}, like the
+            offset_to_char of a play_parser.Play.
+
+    Yields:
+        Tuples (offset, line, character).
+    """
+    sorted_offsets = sorted(offset_to_char.keys())
+    next_speak = 0
+    character = 'EPILOG'
+    for offset, line in get_lines(text):
+        while next_speak < len(sorted_offsets) and \
+            sorted_offsets[next_speak] <= offset:
+            character = offset_to_char[sorted_offsets[next_speak]]
+            next_speak += 1
+        if line.strip() == '':
+            continue
+        yield offset, line, character
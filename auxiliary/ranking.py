@@ -0,0 +1,114 @@
+"""Ranked search of lines with BM25.
+
+The lines in which the words of a query appear are scored with BM25, which
+grows with the number of occurrences of each word in the line, weighted by
+how rare the word is in the corpus, and is normalized by the length of the
+line. Document frequencies and line lengths are precomputed in the index
+file.
+
+The postings of the words are merged line by line, and only the best k lines
+seen so far are kept in a bounded heap, so the memory and response size of a
+query do not depend on how frequent its words are.
+"""
+
+import heapq
+import math
+
+# Saturation of the number of occurrences of a word in a line.
+_K1 = 1.2
+# Weight of the normalization by the length of the line.
+_B = 0.75
+
+DEFAULT_TOP = 10
+MAX_TOP = 100
+
+
+def get_idf(line_count, document_frequency):
+    """Get the inverse document frequency of a word.
+
+    Args:
+        line_count: number of lines of the corpus.
+        document_frequency: number of lines in which the word appears.
+
+    Returns:
+        A positive float, larger for rarer words.
+    """
+    return math.log(1 + (line_count - document_frequency + 0.5) /
+        (document_frequency + 0.5))
+
+
+def get_score(idf, count, length, average_length):
+    """Get the BM25 score of a word in a line.
+
+    Args:
+        idf: the inverse document frequency of the word.
+        count: number of occurrences of the word in the line.
+        length: number of words of the line.
+        average_length: average number of words of the lines of the corpus.
+    """
+    norm = _K1 * (1 - _B + _B * length / average_length)
+    return idf * count * (_K1 + 1) / (count + norm)
+
+
+def _iter_term_postings(index, term_number, term):
+    """Tag the postings of a term with its number in the query."""
+    for line_id, count in index.iter_postings(term):
+        yield line_id, term_number, count
+
+
+def get_top_lines(index, terms, top=DEFAULT_TOP, work_title=None,
+                  char_name=None):
+    """Get the lines that best match some words.
+
+    Args:
+        index: an index_file.IndexFile.
+        terms: the words (lowercase).
+        top: maximum number of lines to return.
+        work_title: title of the work, or None for any work.
+        char_name: name of the character, or None for any character.
+
+    Returns:
+        A list of at most top tuples (score, line_id), from the best line.
+    """
+    terms = sorted(set(terms))
+    line_count = index.get_line_count()
+    average_length = index.get_average_line_length()
+    idfs = [get_idf(line_count, index.get_document_frequency(term))
+        for term in terms]
+    accepts = index.get_line_filter(work_title, char_name)
+
+    heap = []
+    line_id, score = None, None
+    merged = heapq.merge(*[_iter_term_postings(index, number, term)
+        for number, term in enumerate(terms)])
+    for posting_line, term_number, count in merged:
+        if posting_line != line_id:
+            if score is not None:
+                _push(heap, top, score, line_id)
+            line_id = posting_line
+            score = None
+            if accepts is not None and not accepts(line_id):
+                continue
+            score = 0.0
+        elif score is None:
+            continue
+        score += get_score(idfs[term_number], count,
+            index.get_line_length(line_id), average_length)
+    if score is not None:
+        _push(heap, top, score, line_id)
+    return [(score, -negated_line_id)
+        for score, negated_line_id in sorted(heap, reverse=True)]
+
+
+def _push(heap, top, score, line_id):
+    """Keep a line in the heap if it is among the top best seen so far.
+
+    Lines with the same score are ranked by their order in the corpus, so the
+    heap holds (score, -line_id).
+    """
+    if top <= 0:
+        return
+    if len(heap) < top:
+        heapq.heappush(heap, (score, -line_id))
+    elif (score, -line_id) > heap[0]:
+        heapq.heapreplace(heap, (score, -line_id))
@@ -0,0 +1,248 @@
+"""Regex searches over the text of the lines of the index file.
+
+A regex can not be looked up in the word index, but every line it matches
+contains the literal strings the regex is made of. So the regex is compiled
+into a plan of boolean_query over the trigrams of the lines (see the trigrams
+of index_file): th(ee|ou)\\s+art becomes
+    (the AND hee) OR (tho AND hou), AND art
+and only the lines of the plan are matched with re, instead of every line of
+the corpus.
+
+The plan is built from the parsed regex. Each part of it yields the set of
+strings it can match exactly, when there are a few, and a plan that the lines
+it matches satisfy. Consecutive parts join their exact strings, and when they
+can not, like after a repetition, their strings are turned into the AND of
+their trigrams. Trigrams are taken from the lowercase text, so the plan holds
+for case insensitive regexes too.
+"""
+
+import re
+import sre_constants
+import sre_parse
+
+from auxiliary import boolean_query
+from auxiliary.index_file import get_trigrams
+
+# Plan that matches every line.
+ALL = ('and', ())
+
+# Most exact strings kept for a part of a regex. Parts with more, like [a-z],
+# only match every line.
+_MAX_STRINGS = 16
+
+# Trigrams of an AND in more lines than this times those of its rarest
+# trigram are not decoded, since checking the extra candidates with the regex
+# is cheaper than decoding their lines.
+_MAX_FREQUENCY_RATIO = 8
+
+
+def _join(operator, children):
+    """Build an AND or OR node, simplifying the plans that match every
+    line."""
+    flattened = []
+    for child in children:
+        if child == ALL:
+            if operator == 'or':
+                return ALL
+            continue
+        if child[0] == operator:
+            flattened.extend(child[1])
+        elif child not in flattened:
+            flattened.append(child)
+    if len(flattened) == 1:
+        return flattened[0]
+    return (operator, tuple(flattened))
+
+
+def _get_strings_plan(strings):
+    """Get the plan of the lines that contain one of some strings."""
+    plans = []
+    for string in strings:
+        trigrams = sorted(get_trigrams(string))
+        if not trigrams:
+            return ALL
+        plans.append(_join('and', [('term', trigram)
+            for trigram in trigrams]))
+    return _join('or', plans)
+
+
+def _cross(first, second):
+    """Join every string of a set with every string of another, or None if
+    there would be too many."""
+    if first is None or second is None or \
+        len(first) * len(second) > _MAX_STRINGS:
+        return None
+    return set(prefix + suffix for prefix in first for suffix in second)
+
+
+def _analyze_sequence(items):
+    """Analyze a sequence of parsed items.
+
+    Returns:
+        A tuple (strings, plan), being strings the set of strings the
+        sequence matches exactly, or None if they are unknown, and plan the
+        plan of the lines the sequence matches, besides containing one of
+        those strings.
+    """
+    strings = set([''])
+    plans = []
+    exact = True
+    for item in items:
+        item_strings, item_plan = _analyze_item(item)
+        plans.append(item_plan)
+        joined = _cross(strings, item_strings)
+        if joined is not None:
+            strings = joined
+            continue
+        exact = False
+        plans.append(_get_strings_plan(strings))
+        strings = item_strings if item_strings is not None else set([''])
+    if exact:
+        return strings, _join('and', plans)
+    plans.append(_get_strings_plan(strings))
+    return None, _join('and', plans)
+
+
+def _get_plan(strings, plan):
+    """Get the whole plan of the result of an analysis."""
+    if strings is None:
+        return plan
+    return _join('and', [plan, _get_strings_plan(strings)])
+
+
+def _analyze_item(item):
+    """Analyze an item of a parsed regex, like _analyze_sequence."""
+    opcode, value = item
+    if opcode == sre_constants.LITERAL:
+        return set([chr(value).lower()]) if value < 256 else None, ALL
+    if opcode == sre_constants.IN:
+        letters = set()
+        for member_opcode, member_value in value:
+            if member_opcode != sre_constants.LITERAL or member_value > 255:
+                return None, ALL
+            letters.add(chr(member_value).lower())
+        if len(letters) > _MAX_STRINGS:
+            return None, ALL
+        return letters, ALL
+    if opcode == sre_constants.AT:
+        return set(['']), ALL
+    if opcode == sre_constants.SUBPATTERN:
+        return _analyze_sequence(value[-1])
+    if opcode == sre_constants.BRANCH:
+        results = [_analyze_sequence(branch) for branch in value[1]]
+        strings = set()
+        for branch_strings, _ in results:
+            if branch_strings is None or strings is None:
+                strings = None
+            else:
+                strings |= branch_strings
+        if strings is not None and len(strings) <= _MAX_STRINGS:
+            return strings, _join('or', [plan for _, plan in results])
+        return None, _join('or', [_get_plan(branch_strings, plan)
+            for branch_strings, plan in results])
+    if opcode in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT):
+        minimum, maximum, repeated = value
+        if minimum == 0:
+            return None, ALL
+        strings, plan = _analyze_sequence(repeated)
+        if minimum == maximum == 1:
+            return strings, plan
+        return None, _get_plan(strings, plan)
+    return None, ALL
+
+
+def compile_regex(regex):
+    """Compile a regex and its plan over the trigrams of the lines.
+
+    Args:
+        regex: the regex, as a string.
+
+    Returns:
+        A tuple (compiled, plan), being compiled the compiled regex and plan
+        a plan of boolean_query, whose terms are trigrams, that every line
+        the regex matches satisfies. The plan is ALL if the regex has no
+        literal string of 3 characters.
+
+    Raises:
+        ValueError: if the regex is not valid.
+    """
+    if isinstance(regex, unicode):
+        regex = regex.encode('utf-8')
+    try:
+        compiled = re.compile(regex)
+        parsed = sre_parse.parse(regex)
+    except (re.error, sre_constants.error) as error:
+        raise ValueError('Invalid regex: %s' % error)
+    return compiled, _get_plan(*_analyze_sequence(list(parsed)))
+
+
+class _TrigramIndex(object):
+    """Exposes the trigrams of an index file as the terms of a
+    boolean_query plan."""
+
+    def __init__(self, index):
+        self._index = index
+
+    def get_line_count(self):
+        """Get the number of lines of the corpus."""
+        return self._index.get_line_count()
+
+    def get_document_frequency(self, trigram):
+        """Get the number of lines with a trigram."""
+        return self._index.get_trigram_frequency(trigram)
+
+    def get_line_ids(self, trigram):
+        """Get the sorted ids of the lines with a trigram."""
+        return self._index.get_trigram_line_ids(trigram)
+
+
+def _prune(plan, index):
+    """Drop from the ANDs of a plan the trigrams much more frequent than
+    their rarest one."""
+    if plan[0] == 'term':
+        return plan
+    children = [_prune(child, index) for child in plan[1]]
+    if plan[0] == 'or':
+        return _join('or', children)
+    frequencies = dict((child, index.get_trigram_frequency(child[1]))
+        for child in children if child[0] == 'term')
+    if not frequencies:
+        return _join('and', children)
+    rarest = min(frequencies.itervalues())
+    return _join('and', [child for child in children
+        if frequencies.get(child, 0) <= rarest * _MAX_FREQUENCY_RATIO])
+
+
+def get_candidate_line_ids(plan, index):
+    """Get the sorted ids of the lines that may match a regex.
+
+    Args:
+        plan: a plan returned by compile_regex.
+        index: an index_file.IndexFile.
+
+    Returns:
+        The sorted ids of the lines that satisfy the plan, or of some more
+        lines, when decoding some frequent trigrams would be slower than
+        matching them.
+    """
+    return boolean_query.execute_plan(_prune(plan, index),
+        _TrigramIndex(index))
+
+
+def search(compiled, plan, index, line_ids=None):
+    """Get the lines a regex matches.
+
+    Args:
+        compiled: the compiled regex.
+        plan: its plan, as returned by compile_regex.
+        index: an index_file.IndexFile.
+        line_ids: the sorted ids of the lines to search, or None to search
+            the lines of the plan.
+
+    Returns:
+        The sorted ids of the lines with a match of the regex.
+    """
+    if line_ids is None:
+        line_ids = get_candidate_line_ids(plan, index)
+    return [line_id for line_id in line_ids
+        if compiled.search(index.get_line(line_id))]
@@ -0,0 +1,149 @@
+"""Two-tier cache of search results.
+
+Results are first looked up in an LRUCache of the instance and then in
+memcache, which is shared by all instances. Results found in memcache are
+copied to the LRUCache, and computed results are stored in both.
+
+The key of a result includes the generation of the index, a counter kept in
+memcache that is bumped whenever the datastore index changes: when a pipeline
+of database_creation finishes and when the datastore is cleared. So cached
+results are never invalidated one by one: after a bump their keys are just
+never looked up again, and they age out of both tiers. If memcache loses the
+counter, it starts again from the current time, which is larger than any
+generation seen before.
+
+Each instance reads the generation from memcache at most once every few
+seconds, so results of the LRUCache are served without any RPC. An instance
+may thus keep serving the results of the previous generation for that long
+after another one bumps it.
+
+Results too large for memcache are only kept in the LRUCache.
+"""
+
+import hashlib
+import logging
+import os
+import time
+
+from google.appengine.api import memcache
+
+from auxiliary.lru_cache import LRUCache
+
+_GENERATION_KEY = 'result_cache:generation'
+
+# Results of the most popular searches kept by each instance.
+_LOCAL_CAPACITY = 256
+
+# Seconds an instance keeps using the generation it read from memcache.
+_GENERATION_TTL = 5
+
+# The generation read by this instance, as a tuple (generation, expiry time).
+_local_generation = (None, 0)
+
+
+def _get_initial_generation():
+    """Get a generation larger than any previous one."""
+    return int(time.time() * 1000)
+
+
+def get_generation():
+    """Get the current generation of the index."""
+    generation = memcache.get(_GENERATION_KEY)
+    if generation is None:
+        memcache.add(_GENERATION_KEY, _get_initial_generation())
+        generation = memcache.get(_GENERATION_KEY)
+    return generation
+
+
+def get_local_generation():
+    """Get the current generation of the index, as read from memcache by this
+    instance at most _GENERATION_TTL seconds ago."""
+    global _local_generation
+    generation, expiry = _local_generation
+    now = time.time()
+    if generation is None or now >= expiry:
+        generation = get_generation()
+        _local_generation = (generation, now + _GENERATION_TTL)
+    return generation
+
+
+def bump_generation():
+    """Invalidate every cached result, by starting a new generation."""
+    global _local_generation
+    _local_generation = (None, 0)
+    return memcache.incr(_GENERATION_KEY,
+        initial_value=_get_initial_generation())
+
+
+class ResultCache(object):
+    """A cache of results in an LRUCache backed by memcache.
+
+    Attributes:
+        name: prefix of the keys of the cache in memcache, so different
+            caches do not share entries.
+        local: the LRUCache of the instance.
+        shared_hits: number of gets found in memcache but not in local.
+    """
+
+    def __init__(self, name, capacity=_LOCAL_CAPACITY):
+        self.name = name
+        self.local = LRUCache(capacity)
+        self.shared_hits = 0
+
+    def _get_key(self, key):
+        """Get the key of a result in the current generation of the index.
+
+        Versions of the app may deploy different index files, so the key also
+        includes the version. Keys are hashed to fit in memcache.
+        """
+        full_key = repr((os.environ.get('CURRENT_VERSION_ID'),
+            get_local_generation(), key))
+        return '%s:%s' % (self.name, hashlib.sha1(full_key).hexdigest())
+
+    def get(self, key):
+        """Get a cached result.
+
+        Args:
+            key: a tuple of the normalized parameters of the search.
+
+        Returns:
+            The result, or None if it is not cached.
+        """
+        full_key = self._get_key(key)
+        result = self.local.get(full_key)
+        if result is not None:
+            return result
+        result = memcache.get(full_key)
+        if result is not None:
+            self.shared_hits += 1
+            self.local.put(full_key, result)
+        return result
+
+    def set(self, key, result):
+        """Cache a result. It must not be None.
+
+        Results larger than the values memcache accepts are only cached by
+        the instance.
+        """
+        full_key = self._get_key(key)
+        self.local.put(full_key, result)
+        try:
+            memcache.set(full_key, result)
+        except ValueError as error:
+            logging.info('Result of %s not shared: %s', self.name, error)
+
+    def get_stats(self):
+        """Get the counters of the cache.
+
+        Returns:
+            A dict with the counters of the local cache (see
+            LRUCache.get_stats), the number of hits in memcache, the hit rate
+            of both tiers together and the current generation.
+        """
+        stats = self.local.get_stats()
+        lookups = stats['hits'] + stats['misses']
+        stats['shared_hits'] = self.shared_hits
+        stats['total_hit_rate'] = (float(stats['hits'] + self.shared_hits) /
+            lookups if lookups else 0.0)
+        stats['generation'] = get_generation()
+        return stats
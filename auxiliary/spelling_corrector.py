@@ -1,14 +1,64 @@
 '''Spelling Corrector module.
 
-Contains functionality used to know, given a misspelled word, if there is any
-correct word close to it. A word is considered close to another is they are
-have distance 1.
+Contains functionality used to know, given a misspelled word, which correct
+words are close to it. The suggestions served by get_suggestions are the
+indexed words at distance 2 at most, ranked by their frequency with a penalty
+for each edit (see symspell.SymSpell.get_top_suggestions), while
+get_suggestion only gives the most frequent word at distance 1.
+
+Suggestions are answered from memory by the symmetric delete dictionary of the
+indexed words (see symspell), which is loaded once per instance from the file
+written by index_builder or, if it is not deployed, from the datastore, where
+database_creation puts it when an index is built. Only if there is no
+dictionary at all, the strings at distance 1 are looked up in the datastore,
+so no word at distance 2 is suggested then.
 '''
+import threading
+
+from auxiliary import result_cache
+from auxiliary import symspell
+from models.spelling_dictionary import SpellingDictionary
 from models.word import Word
 from google.appengine.ext import ndb
+from resources.constants import Constants
 
 _ALPHABET = 'abcdefghijklmnopqrstuvwxyz'
 
+_lock = threading.Lock()
+# The dictionary loaded from the datastore, as a tuple (generation,
+# dictionary), so it is loaded again when the index changes. The generation is
+# the one read by the instance every few seconds, so lookups make no RPC.
+_datastore_dictionary = (None, None)
+
+def get_dictionary():
+    '''Gets the spelling dictionary of the index.
+
+    Returns:
+        A symspell.SymSpell, or None if there is none.
+    '''
+    global _datastore_dictionary
+    dictionary = symspell.get_dictionary_file(Constants.SPELLING_FILE)
+    if dictionary:
+        return dictionary
+    generation = result_cache.get_local_generation()
+    if _datastore_dictionary[0] != generation:
+        with _lock:
+            if _datastore_dictionary[0] != generation:
+                data = SpellingDictionary.load()
+                dictionary = None
+                if data:
+                    dictionary = symspell.SymSpell.deserialize(data)
+                _datastore_dictionary = (generation, dictionary)
+    return _datastore_dictionary[1]
+
+def build_dictionary():
+    '''Builds the spelling dictionary of the words in the datastore and puts
+    it in the datastore.'''
+    words = Word.query().fetch(projection=[Word.count])
+    dictionary = symspell.SymSpell.build((word.key.id(), word.count)
+        for word in words)
+    SpellingDictionary.save(dictionary.serialize())
+
 def get_suggestion(word):
     '''Gets the most used suggestion for a misspelled word.
 
@@ -24,6 +74,10 @@ def get_suggestion(word):
     Returns:
         A suggestion of this word for the user or None if it doesn't find any.
     '''
+    dictionary = get_dictionary()
+    if dictionary:
+        return dictionary.get_suggestion(word)
+
     if Word.get_by_id(word):
         return None
 
@@ -38,6 +92,34 @@ def get_suggestion(word):
         return suggestion.name
     return None
 
+def get_suggestions(word, top=Constants.SPELLING_SUGGESTIONS):
+    '''Gets the best suggestions for a misspelled word.
+
+    With the dictionary, the suggestions are at distance 2 at most and are
+    ranked by their frequency, penalized by their distance. Without it, only
+    the words at distance 1 are found, ranked by their frequency.
+
+    Args:
+        word: misspelled word.
+        top: the largest number of suggestions.
+
+    Returns:
+        A list of suggestions, the best first, empty if the word is indexed.
+    '''
+    dictionary = get_dictionary()
+    if dictionary:
+        if word in dictionary:
+            return []
+        return [suggestion for suggestion, _, _ in
+            dictionary.get_top_suggestions(word, top)]
+
+    if Word.get_by_id(word):
+        return []
+
+    candidates = _select_valid_words(_words_edit_distance_one(word))
+    candidates.sort(key=lambda candidate: (-candidate.count, candidate.name))
+    return [candidate.name for candidate in candidates[:top]]
+
 def _splits(word):
     '''Convert a word into a list of tuples of all the possible splits of it.
 
@@ -0,0 +1,348 @@
+"""Symmetric delete dictionary of the words of the corpus.
+
+Two words are at edit distance d at most only if some word obtained by
+deleting up to d letters from one of them is also obtained by deleting up to
+d letters from the other one. So instead of generating every string close to
+a misspelled word and looking each one up, as the datastore corrector does,
+the dictionary keeps, for every delete of every word of the corpus, the words
+it comes from. A lookup only generates the deletes of the misspelled word,
+which are far fewer than its edits and do not depend on the alphabet, and
+checks the distance of the words they point to.
+
+The dictionary is built once, when the corpus is indexed, and serialized as a
+single compressed string, by index_builder to DICTIONARY_FILENAME next to the
+index file and by database_creation to the datastore. It holds the sorted
+words with their counts and the sorted deletes, each one with the numbers of
+its words, in flat arrays instead of dicts, so instances load it in a few
+milliseconds, once, and answer lookups from memory with binary searches.
+"""
+
+import array
+import bisect
+import heapq
+import marshal
+import os
+import threading
+import zlib
+
+# Edits kept by default. Early Modern spellings, like "publick" or "shew",
+# are often two edits away from the modern ones.
+DEFAULT_MAX_DISTANCE = 2
+
+# Factor applied to the count of a suggestion for each edit.
+DISTANCE_PENALTY = 0.01
+
+DICTIONARY_FILENAME = 'shakespeare.spell'
+
+_FORMAT = 'symspell 1'
+
+_lock = threading.Lock()
+_dictionary_files = {}
+
+
+def get_deletes(word, max_distance):
+    """Get the strings obtained by deleting up to max_distance letters from a
+    word, including the word itself."""
+    deletes = set([word])
+    edges = [word]
+    for _ in range(max_distance):
+        next_edges = []
+        for edge in edges:
+            for index in range(len(edge)):
+                delete = edge[:index] + edge[index + 1:]
+                if delete not in deletes:
+                    deletes.add(delete)
+                    next_edges.append(delete)
+        edges = next_edges
+    return deletes
+
+
+def _is_within(first, second, distance):
+    """Tell whether two words are at most at some edit distance, counting the
+    transposition of two adjacent letters as a single edit."""
+    start = 0
+    while start < len(first) and start < len(second) and \
+        first[start] == second[start]:
+        start += 1
+    first = first[start:]
+    second = second[start:]
+    if not first or not second:
+        return len(first) + len(second) <= distance
+    if distance == 0 or abs(len(first) - len(second)) > distance:
+        return False
+    distance -= 1
+    return (_is_within(first[1:], second[1:], distance) or
+        _is_within(first[1:], second, distance) or
+        _is_within(first, second[1:], distance) or
+        (len(first) > 1 and len(second) > 1 and first[0] == second[1] and
+        first[1] == second[0] and _is_within(first[2:], second[2:], distance)))
+
+
+def get_distance(first, second, max_distance):
+    """Get the edit distance between two words, counting the transposition of
+    two adjacent letters as a single edit.
+
+    The distances computed are small, so instead of filling the table of the
+    distance between every pair of prefixes, the words are compared trying
+    the edits of their first different letter, up to max_distance times.
+
+    Returns:
+        The distance, or max_distance + 1 if it is larger than max_distance.
+    """
+    if abs(len(first) - len(second)) > max_distance:
+        return max_distance + 1
+    # Only the part between the common prefix and the common suffix can
+    # differ, and for close words it is a few letters long.
+    start = 0
+    while start < len(first) and start < len(second) and \
+        first[start] == second[start]:
+        start += 1
+    end = 0
+    while end < len(first) - start and end < len(second) - start and \
+        first[-1 - end] == second[-1 - end]:
+        end += 1
+    first = first[start:len(first) - end]
+    second = second[start:len(second) - end]
+    if not first or not second:
+        return min(len(first) + len(second), max_distance + 1)
+    # Each edit adds at most one letter missing in the other word, which
+    # discards most candidates without comparing them.
+    first_letters = set(first)
+    second_letters = set(second)
+    if len(first_letters - second_letters) > max_distance or \
+        len(second_letters - first_letters) > max_distance:
+        return max_distance + 1
+    for distance in range(1, max_distance + 1):
+        if _is_within(first, second, distance):
+            return distance
+    return max_distance + 1
+
+
+def _get_array(data):
+    """Get an array of unsigned integers from its serialized string."""
+    numbers = array.array('I')
+    numbers.fromstring(data)
+    return numbers
+
+
+class SymSpell(object):
+    """Finds the words of the corpus close to a misspelled word.
+
+    Attributes:
+        max_distance: the largest distance of the words it finds.
+        words: the sorted words of the corpus.
+        counts: the number of occurrences of each word, in the same order.
+    """
+
+    def __init__(self, words, counts, deletes, starts, word_ids,
+                 max_distance):
+        """Create a dictionary from its arrays. Use build or deserialize.
+
+        Args:
+            words: the sorted words.
+            counts: the count of each word.
+            deletes: the sorted deletes of all the words.
+            starts: for each delete, the index in word_ids of its first word,
+                plus a last entry with the length of word_ids.
+            word_ids: the numbers of the words of each delete, one after the
+                other.
+            max_distance: the largest number of letters deleted.
+        """
+        self.max_distance = max_distance
+        self.words = words
+        self.counts = counts
+        self._deletes = deletes
+        self._starts = starts
+        self._word_ids = word_ids
+
+    @classmethod
+    def build(cls, word_counts, max_distance=DEFAULT_MAX_DISTANCE):
+        """Build the dictionary of some words.
+
+        Args:
+            word_counts: iterable of tuples (word, count).
+            max_distance: the largest distance of the words it finds.
+        """
+        words = []
+        counts = array.array('I')
+        delete_words = {}
+        for word_id, (word, count) in enumerate(sorted(word_counts)):
+            words.append(word)
+            counts.append(count)
+            for delete in get_deletes(word, max_distance):
+                delete_words.setdefault(delete, []).append(word_id)
+        deletes = sorted(delete_words)
+        starts = array.array('I')
+        word_ids = array.array('I')
+        for delete in deletes:
+            starts.append(len(word_ids))
+            word_ids.extend(delete_words[delete])
+        starts.append(len(word_ids))
+        return cls(words, counts, deletes, starts, word_ids, max_distance)
+
+    @classmethod
+    def deserialize(cls, data):
+        """Load a dictionary serialized by serialize.
+
+        Raises:
+            ValueError: if the data is not a serialized dictionary.
+        """
+        try:
+            values = marshal.loads(zlib.decompress(data))
+        except (zlib.error, EOFError, TypeError, ValueError):
+            raise ValueError('Not a serialized dictionary')
+        if not isinstance(values, tuple) or len(values) != 7 or \
+            values[0] != _FORMAT:
+            raise ValueError('Not a serialized dictionary')
+        _, max_distance, words, counts, deletes, starts, word_ids = values
+        return cls(words.split('\n') if words else [], _get_array(counts),
+            deletes.split('\n') if deletes else [], _get_array(starts),
+            _get_array(word_ids), max_distance)
+
+    def serialize(self):
+        """Serialize the dictionary as a compressed string."""
+        return zlib.compress(marshal.dumps((_FORMAT, self.max_distance,
+            '\n'.join(self.words), self.counts.tostring(),
+            '\n'.join(self._deletes), self._starts.tostring(),
+            self._word_ids.tostring())), 9)
+
+    def _find_word(self, word):
+        """Get the number of a word, or None if it is unknown."""
+        word_id = bisect.bisect_left(self.words, word)
+        if word_id < len(self.words) and self.words[word_id] == word:
+            return word_id
+        return None
+
+    def _get_delete_words(self, delete):
+        """Get the numbers of the words a delete comes from."""
+        number = bisect.bisect_left(self._deletes, delete)
+        if number == len(self._deletes) or self._deletes[number] != delete:
+            return ()
+        return self._word_ids[self._starts[number]:self._starts[number + 1]]
+
+    def __contains__(self, word):
+        return self._find_word(word) is not None
+
+    def get_count(self, word):
+        """Get the number of occurrences of a word, or 0 if it is unknown."""
+        word_id = self._find_word(word)
+        return 0 if word_id is None else self.counts[word_id]
+
+    def _get_candidates(self, word, max_distance):
+        """Get the numbers of the words that share a delete with a word."""
+        word_ids = set()
+        for delete in get_deletes(word, max_distance):
+            word_ids.update(self._get_delete_words(delete))
+        return word_ids
+
+    def lookup(self, word, max_distance=None):
+        """Find the words close to a word.
+
+        Args:
+            word: the word (lowercase).
+            max_distance: the largest distance of the words to find, up to
+                that of the dictionary, or None for that of the dictionary.
+
+        Returns:
+            A list of tuples (word, distance, count), sorted by distance, then
+            by decreasing count and then by word.
+        """
+        if max_distance is None or max_distance > self.max_distance:
+            max_distance = self.max_distance
+        candidates = []
+        for word_id in self._get_candidates(word, max_distance):
+            candidate = self.words[word_id]
+            distance = get_distance(word, candidate, max_distance)
+            if distance <= max_distance:
+                candidates.append((distance, -self.counts[word_id],
+                    candidate))
+        return [(candidate, distance, -count)
+            for distance, count, candidate in sorted(candidates)]
+
+    def get_top_suggestions(self, word, top, max_distance=None):
+        """Get the best words close to a misspelled word.
+
+        Words are ranked by their count times DISTANCE_PENALTY raised to their
+        distance, so a word one edit further must be DISTANCE_PENALTY times
+        more frequent to rank the same. Candidates are checked from the most
+        frequent one, only up to the distance at which they could still enter
+        the top, and the check stops as soon as none of the rest could, so
+        usually only a few of them are compared with the word.
+
+        Args:
+            word: the word (lowercase).
+            top: the number of suggestions.
+            max_distance: the largest distance of the suggestions, up to that
+                of the dictionary, or None for that of the dictionary.
+
+        Returns:
+            A list of up to top tuples (word, distance, count), best first,
+            without the word itself.
+        """
+        if max_distance is None or max_distance > self.max_distance:
+            max_distance = self.max_distance
+        word_ids = sorted(self._get_candidates(word, max_distance),
+            key=lambda word_id: -self.counts[word_id])
+        best = []
+        for word_id in word_ids:
+            count = self.counts[word_id]
+            # The largest distance at which the candidate would enter the top.
+            distance_left = max_distance
+            while len(best) == top and distance_left and \
+                count * DISTANCE_PENALTY ** distance_left <= best[0][0]:
+                distance_left -= 1
+            if not distance_left:
+                break
+            candidate = self.words[word_id]
+            distance = get_distance(word, candidate, distance_left)
+            if distance == 0 or distance > distance_left:
+                continue
+            entry = (count * DISTANCE_PENALTY ** distance, -word_id,
+                candidate, distance, count)
+            if len(best) < top:
+                heapq.heappush(best, entry)
+            elif entry > best[0]:
+                heapq.heapreplace(best, entry)
+        return [(candidate, distance, count)
+            for _, _, candidate, distance, count in sorted(best,
+            reverse=True)]
+
+    def get_suggestion(self, word):
+        """Get the most frequent word at distance 1 of a misspelled word.
+
+        Returns:
+            The suggestion, or None if the word is known or there is no word
+            close to it.
+        """
+        if word in self:
+            return None
+        for candidate, distance, _ in self.lookup(word, 1):
+            if distance == 1:
+                return candidate
+        return None
+
+
+def get_dictionary_file(path):
+    """Get the dictionary serialized in a file, loaded once per instance.
+
+    The returned SymSpell is shared by all threads.
+
+    Returns:
+        A SymSpell, or None if there is no dictionary in path.
+    """
+    if path not in _dictionary_files:
+        with _lock:
+            if path not in _dictionary_files:
+                dictionary = None
+                if os.path.exists(path):
+                    with open(path, 'rb') as dictionary_file:
+                        dictionary = SymSpell.deserialize(
+                            dictionary_file.read())
+                _dictionary_files[path] = dictionary
+    return _dictionary_files[path]
+
+
+def write_dictionary_file(dictionary, path):
+    """Write a dictionary to a file, to be read by get_dictionary_file."""
+    with open(path, 'wb') as dictionary_file:
+        dictionary_file.write(dictionary.serialize())
@@ -0,0 +1,145 @@
+"""Wildcard searches over the term dictionary of the index file.
+
+A pattern is a word in which * stands for any number of letters and ? for a
+single one, like lov*, *ness or wh?ther. It is expanded into the terms of the
+index that match it, and its lines are those of any of them.
+
+Instead of matching the pattern against every term, the terms are looked up
+in a k-gram index, which maps each string of K letters, and of 2 letters for
+the shorter pieces of the patterns, to the sorted numbers of the terms that
+contain it. Terms are padded with $ at both ends, so the k-grams of the start
+and the end of a term are kept too. The k-grams of the letters between the
+wildcards of a pattern, padded the same way, are in every term that matches
+it, so intersecting their terms, from the rarest k-gram, gives a few
+candidates. The terms are sorted, so the letters before the first
+wildcard also narrow the candidates to a range. Candidates are then checked
+against the pattern, since their k-grams may be in a different order.
+
+The k-gram index is built from the term dictionary once per instance, when
+the first wildcard search arrives.
+"""
+
+import bisect
+import re
+import threading
+
+from auxiliary import boolean_query
+
+# Length of the k-grams.
+K = 3
+
+# Most terms a pattern is expanded into, the first ones in the order of the
+# dictionary, so a pattern like a* does not merge thousands of postings.
+MAX_TERMS = 500
+
+_WILDCARDS = '*?'
+_PATTERN_REGEX = re.compile(r'[*?]|[^*?]+')
+
+_lock = threading.Lock()
+_kgram_indexes = {}
+
+
+def get_kgrams(text, length=K):
+    """Get the k-grams of a string, in order, with repetitions."""
+    return [text[start:start + length]
+        for start in range(len(text) - length + 1)]
+
+
+def get_regex(pattern):
+    """Compile the regex that matches the terms that match a pattern."""
+    regex = ''
+    for piece in _PATTERN_REGEX.findall(pattern):
+        if piece == '*':
+            regex += '.*'
+        elif piece == '?':
+            regex += '.'
+        else:
+            regex += re.escape(piece)
+    return re.compile(regex + r'\Z', re.DOTALL)
+
+
+def is_pattern(text):
+    """Tell whether a word has wildcards."""
+    return any(wildcard in text for wildcard in _WILDCARDS)
+
+
+class KGramIndex(object):
+    """Finds the terms that match a wildcard pattern.
+
+    Attributes:
+        terms: the sorted terms.
+    """
+
+    def __init__(self, terms):
+        """Build the k-gram index of some terms.
+
+        Args:
+            terms: the sorted terms.
+        """
+        self.terms = terms
+        self._kgram_terms = {}
+        for term_id, term in enumerate(terms):
+            padded_term = '$%s$' % term
+            for kgram in set(get_kgrams(padded_term, 2) +
+                get_kgrams(padded_term)):
+                self._kgram_terms.setdefault(kgram, []).append(term_id)
+
+    def _get_candidates(self, pattern):
+        """Get the sorted numbers of the terms that may match a pattern."""
+        prefix = re.split(r'[*?]', pattern, 1)[0]
+        first = bisect.bisect_left(self.terms, prefix)
+        last = bisect.bisect_left(self.terms, prefix + '\xff', first)
+        if prefix == pattern:
+            return range(first, last)
+        kgrams = set()
+        for piece in re.split(r'[*?]', '$%s$' % pattern):
+            if len(piece) >= 2:
+                kgrams.update(get_kgrams(piece, min(len(piece), K)))
+        if not kgrams:
+            return range(first, last)
+        term_lists = sorted((self._kgram_terms.get(kgram, [])
+            for kgram in kgrams), key=len)
+        candidates = term_lists[0]
+        for term_ids in term_lists[1:]:
+            if not candidates:
+                break
+            candidates = boolean_query.intersect(candidates, term_ids)
+        if first == 0 and last == len(self.terms):
+            return candidates
+        return candidates[bisect.bisect_left(candidates, first):
+            bisect.bisect_left(candidates, last)]
+
+    def expand(self, pattern, limit=MAX_TERMS):
+        """Get the terms that match a pattern.
+
+        Args:
+            pattern: the pattern, with the case of the terms.
+            limit: the largest number of terms.
+
+        Returns:
+            The sorted list of the first terms that match the pattern.
+        """
+        if isinstance(pattern, unicode):
+            pattern = pattern.encode('utf-8')
+        regex = get_regex(pattern)
+        terms = []
+        for term_id in self._get_candidates(pattern):
+            term = self.terms[term_id]
+            if regex.match(term):
+                terms.append(term)
+                if len(terms) == limit:
+                    break
+        return terms
+
+
+def get_kgram_index(index):
+    """Get the k-gram index of the terms of an index file, built once per
+    instance.
+
+    The returned KGramIndex is shared by all threads.
+    """
+    if index not in _kgram_indexes:
+        with _lock:
+            if index not in _kgram_indexes:
+                _kgram_indexes[index] = KGramIndex(index.get_terms())
+    return _kgram_indexes[index]
@@ -45,10 +45,14 @@ from google.appengine.ext.webapp import blobstore_handlers
 from models.character import Character
 from models.file_metadata import FileMetadata
 from models.line import Line
+from models.postings_chunk import PostingsChunk
+from models.spelling_dictionary import SpellingDictionary
 from models.word import Word
+from models.word_summary import WordSummary
 from models.work import Work
 from resources.constants import Constants
 from auxiliary import database_creation
+from auxiliary import result_cache
 
 class Parent(db.Model):
     """ A dumb parent class.
@@ -147,8 +151,12 @@ class ClearDatastoreHandler(webapp2.RequestHandler):
     def get(self):
         """Clears the datastore."""
         ndb.delete_multi(Word.query().fetch(keys_only=True))
+        ndb.delete_multi(WordSummary.query().fetch(keys_only=True))
         ndb.delete_multi(Work.query().fetch(keys_only=True))
         ndb.delete_multi(Character.query().fetch(keys_only=True))
+        ndb.delete_multi(PostingsChunk.query().fetch(keys_only=True))
         ndb.delete_multi(Line.query().fetch(keys_only=True))
+        ndb.delete_multi(SpellingDictionary.query().fetch(keys_only=True))
         db.delete(FileMetadata.all(keys_only=True).run())
+        result_cache.bump_generation()
         self.redirect('/admin')
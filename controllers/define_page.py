@@ -1,8 +1,9 @@
 '''Handler for Definition features.'''
 import webapp2
+from webapp2_extras import json
 
-from auxiliary.definition_service import DefinitionService
-from auxiliary.definition_service import DefinitionRequest
+from auxiliary import definition_store
+from resources.constants import Constants
 
 #Too few public methods (1/2) (too-few-public-methods)
 #pylint: disable=R0903
@@ -19,23 +20,62 @@ class DefinePageController(webapp2.RequestHandler):
     def get(self):
         '''Obtains the definion of the searched word.
 
-        Gets the searched word from the request and calls the DefinitionService
-        in order to obtain its definion.
+        Gets the searched word from the request and looks up its definitions
+        in the definition store, which only calls the DefinitionService for
+        the words it has not seen.
 
         Returns:
-            The first definition of the word if it is found in the dictionary or
-            an 'Word not found' message. All results are returned as plain text.
+            The first definition of the word if it is found in the dictionary,
+            a 'Word not found' message or, if the service does not answer in
+            time, a message to retry later. All results are returned as plain
+            text.
         '''
-        definition_request = DefinitionRequest()
-        definition_request.term = self.request.get('searched_word')
+        definitions = definition_store.get_definitions(
+            self.request.get('searched_word'))
 
-        definition_service = DefinitionService()
-        definition_response = definition_service.define(definition_request)
-
-        if len(definition_response.definition) > 0:
-            result = definition_response.definition[0]
+        if definitions is None:
+            result = 'The dictionary is not available, try again later'
+        elif len(definitions) > 0:
+            result = definitions[0]
         else:
             result = 'Word not found in the dictionary'
 
         self.response.headers['Content-Type'] = 'text/plain'
         self.response.out.write(result)
+
+
+class DefinitionBatchHandler(webapp2.RequestHandler):
+    '''Handler for defining all the words of a page in a single call.'''
+
+    def get(self):
+        '''Obtains the definitions of the words given in the terms parameter.
+
+        The words are looked up at the same time in the definition store, so
+        the call takes about as long as the slowest of them.
+
+        Returns:
+            A JSON object that maps each word, in lowercase, to its list of
+            definitions, empty if it is not found in the dictionary, or to
+            null if the service does not answer in time. Asking for more than
+            Constants.DEFINITION_BATCH_SIZE words is a bad request.
+        '''
+        terms = self.request.get_all('terms')
+        if len(terms) > Constants.DEFINITION_BATCH_SIZE:
+            self.abort(400, detail='At most %d terms can be defined at once'
+                % Constants.DEFINITION_BATCH_SIZE)
+        self.response.headers['Content-Type'] = 'text/json'
+        self.response.out.write(json.encode(
+            definition_store.get_many_definitions(terms)))
+
+    def post(self):
+        '''Like get, for lists of words too long for a URL.'''
+        self.get()
+
+
+class DefinitionCacheHandler(webapp2.RequestHandler):
+    '''Handler for the counters of the definitions cache of the instance.'''
+
+    def get(self):
+        '''Returns the counters of the cache as JSON.'''
+        self.response.headers['Content-Type'] = 'text/json'
+        self.response.out.write(json.encode(definition_store.get_stats()))
@@ -8,9 +8,19 @@ from controllers.admin_page import UploadHandler
 from controllers.home_page import HomePageController
 from controllers.results_page import ResultsPageController
 from controllers.define_page import DefinePageController
+from controllers.define_page import DefinitionBatchHandler
+from controllers.define_page import DefinitionCacheHandler
 from controllers.results_page import TreemapHandler
 from controllers.results_page import CharactersHandler
+from controllers.results_page import CompleteHandler
+from controllers.results_page import MentionsPageHandler
+from controllers.results_page import PhraseSearchHandler
+from controllers.results_page import QuerySearchHandler
+from controllers.results_page import RankedSearchHandler
+from controllers.results_page import RegexSearchHandler
+from controllers.results_page import SearchCacheHandler
 from controllers.results_page import SearchHandler
+from controllers.results_page import WildcardSearchHandler
 from controllers.results_page import WorksHandler
 
 APP = webapp2.WSGIApplication([
@@ -20,10 +30,20 @@ APP = webapp2.WSGIApplication([
     ('/upload', UploadHandler),
     (r'/blobstore/(.*)', DownloadHandler),
     ('/define', DefinePageController),
+    ('/define/batch', DefinitionBatchHandler),
+    ('/define/cache', DefinitionCacheHandler),
     ('/clear', ClearDatastoreHandler),
     ('/treemap', TreemapHandler),
     ('/chars', CharactersHandler),
+    ('/complete', CompleteHandler),
     ('/search', SearchHandler),
+    ('/search/cache', SearchCacheHandler),
+    ('/mentions', MentionsPageHandler),
+    ('/phrase', PhraseSearchHandler),
+    ('/query', QuerySearchHandler),
+    ('/ranked', RankedSearchHandler),
+    ('/regex', RegexSearchHandler),
+    ('/wildcard', WildcardSearchHandler),
     ('/works', WorksHandler)
 ], debug=True)
 
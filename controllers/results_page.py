@@ -1,18 +1,37 @@
-"""Module for handling the search results page requests"""
+"""Module for handling the search results page requests
 
-import cgi
+Words are searched in the index file deployed with the app or, if there is
+none, in the datastore. Phrases, wildcards, regexes, boolean queries and
+ranked searches need what only the index file keeps, like the positions of the
+words and the trigrams of the lines, so their handlers answer 503 without it.
+"""
+
+import base64
 import webapp2
 import time
+from google.appengine.ext import ndb
 from webapp2_extras import json
 
+import auxiliary.analyzer as analyzer
+import auxiliary.autocomplete as autocomplete
+import auxiliary.boolean_query as boolean_query
 import auxiliary.formatter as formatter
+import auxiliary.index_file as index_file
+import auxiliary.ranking as ranking
+import auxiliary.regex_search as regex_search
+import auxiliary.result_cache as result_cache
+import auxiliary.wildcard as wildcard
 
 from models.character import Character
 from models.word import Word
+from models.word_summary import WordSummary
 from models.work import Work
 from resources.constants import Constants
 import auxiliary.spelling_corrector as spelling_corrector
 
+# Results of /search, keyed by the normalized word and filters.
+_SEARCH_CACHE = result_cache.ResultCache('search')
+
 
 def _bold_mentions(word_name, mentions):
     """Turns into bold certain word in textual mentions.
@@ -31,86 +50,398 @@ def _bold_mentions(word_name, mentions):
             line) for line in mentions]
 
 
-def _get_all_word_mentions(word_name):
-    """Get all the mentions of a certain word string representation accessed
-       first by work and then by character.
+def _bold_span_mentions(mentions, spans):
+    """Turns into bold the known spans of mentions grouped by work and
+    character, without searching for them.
 
     Args:
-        word_name: the string representation of the word.
+        mentions: A dictionary of dictionaries of lists of lines, being the
+            first key the work title and the second, the character name.
+        spans: A dictionary indexed like mentions, with the sorted spans
+            (start, end) to be bolded in each line.
 
     Returns:
-        A dictionary of dictionaries, being the first key the work title and the
-        second, the character name.
+        The same dictionary, with the spans within bold HTML tags.
     """
-    all_mentions = {}
-    word = Word.get_by_id(word_name)
-    if not word:
-        return {}, 0
-    works = Work.query(ancestor=word.key)
-    for work in works:
-        work_chars = Character.query(ancestor=work.key)
-        all_mentions[work.title] = {}
-        for char in work_chars:
-            mentions = char.get_string_mentions()
-            bold_mentions = _bold_mentions(word.name, mentions)
-            all_mentions[work.title][char.name] = bold_mentions
-    return all_mentions, word.count
+    return {work: {char: formatter.apply_tag_to_page(Constants.BOLD_TAG,
+        lines, spans[work][char]) for char, lines in chars.iteritems()}
+        for work, chars in mentions.iteritems()}
 
 
-def _get_word_mentions_in_work(word_name, work_title):
-    """Get all mentions of a word that appear in a certain work.
+def _bold_regex_mentions(compiled, mentions):
+    """Turns into bold the matches of a compiled regex in mentions grouped by
+    work and character.
+
+    Regexes are not made of the terms of the index, so their matches are
+    found in each line, which also bolds regexes with groups, spaces or
+    punctuation.
+    """
+    return {work: {char: [formatter.apply_tag_to_spans(Constants.BOLD_TAG,
+        line, [match.span() for match in compiled.finditer(line)
+        if match.end() > match.start()]) for line in lines]
+        for char, lines in chars.iteritems()}
+        for work, chars in mentions.iteritems()}
+
+
+def _get_index_file():
+    """Gets the index file deployed with the app, or None if there is none.
+
+    When it exists, searches are answered from it without datastore RPCs.
+    """
+    return index_file.get_index_file(Constants.INDEX_FILE)
+
+
+def _get_analyzer():
+    """Gets the analyzer that splits queries into the terms of the index.
+
+    It is the analyzer that built the index file, or the default one, which
+    the datastore index is built with, if there is no index file.
+    """
+    index = _get_index_file()
+    if index:
+        return index.analyzer
+    return analyzer.get_analyzer()
+
+
+@ndb.tasklet
+def _get_datastore_mentions_async(word_name, work_title=None, char_name=None,
+                                  start=0, page_size=None):
+    """Get a page of the mentions of a word from the datastore, optionally in
+    a work or by a character.
+
+    Every query and get that does not depend on another is issued at once:
+    the characters of all the works are queried concurrently, the postings of
+    all the characters are decoded concurrently, and then the lines of the
+    page of all of them are fetched in a few large batches. So the time it
+    takes follows the slowest of those calls instead of their sum.
 
     Args:
         word_name: the string of the word being searched (lowercase).
-        work_title: the title of the work (titlecase).
+        work_title: the title of the work (titlecase), or None for any work.
+        char_name: the name of the character (titlecase), or None for any
+            character. It is only used along with a work.
+        start: number of lines of each character before the page.
+        page_size: the largest number of lines of each character in the page,
+            or None for all of them.
 
     Returns:
-        A dictionary first indexed by work and second by character. The work is
-        inserted to comply with the data pattern.
+        A future of a tuple (mentions, line_counts, count), being mentions a
+        dictionary first indexed by work and second by character, and
+        line_counts a dictionary with the same keys whose values are the
+        number of lines of each character.
     """
-
-    word = Word.get_by_id(word_name)
+    word = yield Word.get_by_id_async(word_name)
     if not word:
-        return {}, 0
-    work = Work.get_by_id(work_title, parent=word.key)
-    if not work:
-        return {}, 0
-    chars = Character.query(ancestor=work.key).fetch()
-    mentions_dict = {work_title: {}}
-    for char in chars:
-        mentions = char.get_string_mentions()
-        bold_mentions = _bold_mentions(word_name, mentions)
-        mentions_dict[work_title][char.name] = bold_mentions
-    return mentions_dict, work.count
-
-
-def _get_word_mentions_by_char(word_name, work_title, char_name):
-    """Get the words that a said by a character of a certain work
+        raise ndb.Return({}, {}, 0)
+    if work_title is None:
+        works = yield Work.query(ancestor=word.key).fetch_async()
+        count = word.count
+    else:
+        work = yield Work.get_by_id_async(work_title, parent=word.key)
+        if not work:
+            raise ndb.Return({}, {}, 0)
+        works = [work]
+        count = work.count
+
+    if char_name is None or work_title is None:
+        chars_by_work = yield [
+            Character.query(ancestor=work.key).fetch_async() for work in works]
+    else:
+        char = yield Character.get_by_id_async(char_name, parent=works[0].key)
+        if not char:
+            raise ndb.Return({}, {}, 0)
+        chars_by_work = [[char]]
+        count = char.count
+
+    chars = [(work.title, char)
+        for work, work_chars in zip(works, chars_by_work)
+        for char in work_chars]
+    char_keys = yield [char.get_mention_keys_async() for _, char in chars]
+    end = None if page_size is None else start + page_size
+    page_keys = [line_keys[start:end] for line_keys in char_keys]
+    keys = [key for line_keys in page_keys for key in line_keys]
+    batch_size = Constants.LINES_BATCH_SIZE
+    batches = yield [ndb.get_multi_async(keys[first:first + batch_size])
+        for first in range(0, len(keys), batch_size)]
+    lines = [line.line for batch in batches for line in batch]
+
+    all_mentions = dict((work.title, {}) for work in works)
+    line_counts = dict((work.title, {}) for work in works)
+    first = 0
+    for (title, char), line_keys, all_keys in zip(chars, page_keys,
+                                                  char_keys):
+        mentions = lines[first:first + len(line_keys)]
+        first += len(line_keys)
+        all_mentions[title][char.name] = _bold_mentions(word_name, mentions)
+        line_counts[title][char.name] = len(all_keys)
+    raise ndb.Return(all_mentions, line_counts, count)
+
+
+def _get_mention_page(word_name, work_title=None, char_name=None, act=None,
+                      scene=None, start=0, page_size=None):
+    """Get a page of the mentions of each character that says a word,
+    optionally in a work, by a character or in an act and scene.
+
+    Acts, scenes and line numbers are only kept in the index file, so lines
+    are only cited when it is deployed.
 
     Args:
         word_name: the string of the word being searched (lowercase).
-        work_title: the title of the work in which the character appears
-            (titlecase).
-        char_name: the name of the character (titlecase).
+        work_title: the title of the work (titlecase), or None for any work.
+        char_name: the name of the character (titlecase), or None for any
+            character. It is only used along with a work.
+        act: the number of the act, like 'I', or None for any act.
+        scene: the number of the scene, like 'II', or None for any scene.
+        start: number of lines of each character before the page.
+        page_size: the largest number of lines of each character in the page,
+            or None for all of them.
 
     Returns:
-        A dictionary indexed by the work and the characters. This redundant data
-        is created in order to comply with the data pattern.
+        A tuple (mentions, citations, line_counts, count). Mentions is a
+        dictionary first indexed by work and second by character, citations
+        is a dictionary indexed like mentions whose values are the lists of
+        citations (act, scene, number) of their lines, or None if there is no
+        index file, line_counts is indexed like mentions too and has the
+        number of lines of each character, and count is the number of
+        occurrences of the word. None if the search needs the index file and
+        there is none.
     """
+    index = _get_index_file()
+    if index:
+        mentions, citations, spans, line_counts, count = \
+            index.get_mention_page(word_name, work_title, char_name, act,
+            scene, start, page_size)
+        return (_bold_span_mentions(mentions, spans), citations, line_counts,
+            count)
+    if act is not None or scene is not None:
+        return None
+    mentions, line_counts, count = _get_datastore_mentions_async(word_name,
+        work_title, char_name, start, page_size).get_result()
+    return mentions, None, line_counts, count
+
+
+def _encode_cursor(search, start):
+    """Encode the position of the next page of the lines of a search.
+
+    Args:
+        search: a tuple of the parameters of the search, like (word, work,
+            character, act, scene) for the lines of a character.
+        start: the number of lines of the search before the page.
+
+    Returns:
+        An opaque string, safe to be sent in URLs.
+    """
+    return base64.urlsafe_b64encode(json.encode(list(search) + [start]))
+
+
+def _decode_cursor(cursor, search_length=5):
+    """Decode a cursor returned by _encode_cursor.
+
+    Args:
+        cursor: the cursor.
+        search_length: the number of parameters of the search.
+
+    Returns:
+        A tuple (search, start).
+
+    Raises:
+        ValueError: if the cursor is not valid.
+    """
+    try:
+        values = json.decode(base64.urlsafe_b64decode(str(cursor)))
+    except (TypeError, ValueError):
+        raise ValueError('Invalid cursor')
+    if not isinstance(values, list) or len(values) != search_length + 1 or \
+        not isinstance(values[-1], int) or values[-1] < 0:
+        raise ValueError('Invalid cursor')
+    return tuple(values[:-1]), values[-1]
+
+
+def _get_page_size(value, default=Constants.MENTIONS_PAGE_SIZE,
+                   maximum=Constants.MAX_MENTIONS_PAGE_SIZE):
+    """Get the number of lines of a page from a parameter, by default per
+    character of a search."""
+    try:
+        page_size = int(value)
+    except ValueError:
+        return default
+    return min(max(page_size, 1), maximum)
+
+
+def _get_phrase_mentions(terms, work_title=None, char_name=None):
+    """Get the mentions of a phrase, optionally in a work or by a character.
+
+    Phrases are matched with the positions of the words in their lines.
+
+    Args:
+        terms: the words of the phrase (lowercase), in order.
+        work_title: the title of the work (titlecase), or None for any work.
+        char_name: the name of the character (titlecase), or None for any
+            character.
+
+    Returns:
+        A tuple (mentions, count), being mentions a dictionary first indexed by
+        work and second by character, or None if there is no index file.
+    """
+    index = _get_index_file()
+    if not index:
+        return None
+    mentions, spans, count = index.get_phrase_span_mentions(terms,
+        work_title, char_name)
+    return _bold_span_mentions(mentions, spans), count
+
+
+def _get_wildcard_mentions(pattern, work_title=None, char_name=None):
+    """Get the lines of the words that match a wildcard pattern, optionally in
+    a work or by a character.
+
+    Patterns are expanded with the term dictionary of the index file.
+
+    Args:
+        pattern: the pattern, with * and ? as wildcards.
+        work_title: the title of the work (titlecase), or None for any work.
+        char_name: the name of the character (titlecase), or None for any
+            character.
+
+    Returns:
+        A tuple (mentions, terms, count), being mentions a dictionary first
+        indexed by work and second by character, terms the words that match
+        the pattern and count the number of lines, or None if there is no
+        index file.
+    """
+    index = _get_index_file()
+    if not index:
+        return None
+    if index.analyzer.fold_case:
+        pattern = pattern.lower()
+    terms = wildcard.get_kgram_index(index).expand(pattern)
+    line_ids = boolean_query.unite([index.get_line_ids(term)
+        for term in terms])
+    mentions, spans, count = index.get_line_span_mentions(line_ids, terms,
+        work_title, char_name)
+    return _bold_span_mentions(mentions, spans), terms, count
 
-    word = Word.get_by_id(word_name)
-    if not word:
-        return {}, 0
-    work = Work.get_by_id(work_title, parent=word.key)
-    if not work:
-        return {}, 0
-    char = Character.get_by_id(char_name, parent=work.key)
-    if not char:
-        return {}, 0
-    mentions = char.get_string_mentions()
-    bold_mentions = _bold_mentions(word_name, mentions)
-    mentions_dict = {work_title: {char_name: bold_mentions}}
-    return mentions_dict, char.count
+
+def _get_regex_mentions(compiled, plan, work_title=None, char_name=None):
+    """Get the lines that match a regex, optionally in a work or by a
+    character.
+
+    Regexes are only matched against the lines with their trigrams.
+
+    Args:
+        compiled: the compiled regex.
+        plan: its plan, as returned by regex_search.compile_regex.
+        work_title: the title of the work (titlecase), or None for any work.
+        char_name: the name of the character (titlecase), or None for any
+            character.
+
+    Returns:
+        A tuple (mentions, count), being mentions a dictionary first indexed by
+        work and second by character and count the number of lines, or None
+        if there is no index file.
+    """
+    index = _get_index_file()
+    if not index:
+        return None
+    line_ids = [line_id for line_id, _ in index.filter_postings(
+        [(line_id, 1) for line_id in
+        regex_search.get_candidate_line_ids(plan, index)],
+        work_title, char_name)]
+    mentions, count = index.get_line_mentions(regex_search.search(compiled,
+        plan, index, line_ids))
+    return _bold_regex_mentions(compiled, mentions), count
+
+
+def _get_query_mentions(plan, work_title=None, char_name=None, start=0,
+                        page_size=None):
+    """Get a page of the lines that match a boolean query, optionally in a
+    work or by a character.
+
+    Queries are executed over the postings of the index file.
+
+    Args:
+        plan: the plan of the query, as returned by boolean_query.parse_query.
+        work_title: the title of the work (titlecase), or None for any work.
+        char_name: the name of the character (titlecase), or None for any
+            character.
+        start: number of lines before the page.
+        page_size: the largest number of lines in the page, or None for all
+            of them.
+
+    Returns:
+        A tuple (mentions, count), being mentions a dictionary first indexed by
+        work and second by character with the lines of the page and count the
+        number of lines of all the pages, or None if there is no index file.
+    """
+    index = _get_index_file()
+    if not index:
+        return None
+    line_ids = [line_id for line_id, _ in index.filter_postings(
+        [(line_id, 1) for line_id in boolean_query.execute_plan(plan, index)],
+        work_title, char_name)]
+    end = None if page_size is None else start + page_size
+    mentions, spans, _ = index.get_line_span_mentions(line_ids[start:end],
+        boolean_query.get_terms(plan))
+    return _bold_span_mentions(mentions, spans), len(line_ids)
+
+
+def _get_top_mentions(terms, top, work_title=None, char_name=None):
+    """Get the lines that best match some words, optionally in a work or by a
+    character.
+
+    Lines are ranked with the document frequencies and line lengths of the
+    index file.
+
+    Args:
+        terms: the words (lowercase).
+        top: maximum number of lines.
+        work_title: the title of the work (titlecase), or None for any work.
+        char_name: the name of the character (titlecase), or None for any
+            character.
+
+    Returns:
+        A list of dictionaries with the work, character, bolded line and
+        score of each line, from the best one, or None if there is no index
+        file.
+    """
+    index = _get_index_file()
+    if not index:
+        return None
+    top_lines = ranking.get_top_lines(index, terms, top, work_title,
+        char_name)
+    spans = index.get_term_spans(terms, sorted(line_id
+        for _, line_id in top_lines))
+    results = []
+    for score, line_id in top_lines:
+        results.append({
+            'work': index.get_title(index.get_line_work(line_id)),
+            'character': index.get_character_name(
+                index.get_line_character(line_id)),
+            'line': formatter.apply_tag_to_spans(Constants.BOLD_TAG,
+                index.get_line(line_id), spans.get(line_id, [])),
+            'score': round(score, 4)
+        })
+    return results
+
+
+def _get_word_counts(word_name):
+    """Get the number of occurrences of a word by work and character.
+
+    Args:
+        word_name: the string representation of the word.
+
+    Returns:
+        A tuple (count, works). Count is the number of occurrences of the word
+        and works maps each work title to a tuple (count, chars), in which
+        chars maps the name of each character to its count.
+    """
+    index = _get_index_file()
+    if index:
+        return index.get_counts(word_name)
+    summary = WordSummary.get_or_build(word_name)
+    if not summary:
+        return 0, {}
+    return summary.get_counts()
 
 
 def _get_work_characters(word_name, work_title):
@@ -125,15 +456,13 @@ def _get_work_characters(word_name, work_title):
         A list with the names of the characters.
     """
 
-    word_db = Word.get_by_id(word_name)
-    if not word_db:
+    index = _get_index_file()
+    if index:
+        return index.get_characters(word_name, work_title)
+    summary = WordSummary.get_or_build(word_name)
+    if not summary or work_title not in summary.works:
         return []
-    work_db = Work.get_by_id(work_title, parent=word_db.key)
-    if not work_db:
-        return []
-    char_names = [char_db.name for char_db in
-        Character.query(ancestor=work_db.key).fetch()]
-    return char_names
+    return sorted(summary.works[work_title][1])
 
 
 def _get_word_works(word_name):
@@ -146,12 +475,61 @@ def _get_word_works(word_name):
         A list with the titles of the works.
     """
 
-    word_db = Word.get_by_id(word_name)
-    if not word_db:
+    index = _get_index_file()
+    if index:
+        return index.get_works(word_name)
+    summary = WordSummary.get_or_build(word_name)
+    if not summary:
         return []
-    work_titles = [work_db.title for work_db in
-        Work.query(ancestor=word_db.key).fetch()]
-    return work_titles
+    return sorted(summary.works)
+
+
+def _get_search_result(word_name, work_title, char_name, act, scene,
+                       page_size):
+    """Get the first page of the result of a search of a word, optionally
+    filtered.
+
+    Args:
+        word_name: the string of the word being searched (lowercase).
+        work_title: the title of the work (titlecase), or None for any work.
+        char_name: the name of the character (titlecase), or None for any
+            character. It is only used along with a work.
+        act: the number of the act, or None for any act.
+        scene: the number of the scene, or None for any scene.
+        page_size: the largest number of lines of each character.
+
+    Returns:
+        A dict with the first page of mentions of each character, their
+        number of lines, the cursors of the characters that have more lines,
+        the number of occurrences, spelling suggestions and, if the index
+        file is deployed, the citations of the lines. None if the search
+        needs the index file and there is none.
+    """
+    results = _get_mention_page(word_name, work_title, char_name, act, scene,
+        0, page_size)
+    if results is None:
+        return None
+    mentions, citations, line_counts, count = results
+
+    cursors = {}
+    for title, chars in line_counts.iteritems():
+        for name, lines in chars.iteritems():
+            if lines > page_size:
+                cursors.setdefault(title, {})[name] = _encode_cursor(
+                    (word_name, title, name, act, scene), page_size)
+
+    suggestions = spelling_corrector.get_suggestions(word_name)
+    result = {
+        'mentions': mentions,
+        'line_counts': line_counts,
+        'cursors': cursors,
+        'number_results': count,
+        'did_you_mean': suggestions[0] if suggestions else None,
+        'suggestions': suggestions
+    }
+    if citations is not None:
+        result['citations'] = citations
+    return result
 
 
 class ResultsPageController(webapp2.RequestHandler):
@@ -162,7 +540,7 @@ class ResultsPageController(webapp2.RequestHandler):
         searched_value = self.request.get('searched_word')
         value = searched_value.lower() if searched_value else ''
 
-        works = _get_word_works(value)
+        works = _get_word_works(_get_analyzer().get_term(value))
 
         template_values = {
             'searched_word': value,
@@ -189,31 +567,29 @@ class TreemapHandler(webapp2.RequestHandler):
            and color value is the value to be used as color acording to the
            color range.
 
-           It is called the function get_all_word_mentions to obtain a
-           dictionary that maps from work and character to mentions.
+           It is called the function get_word_counts to obtain a
+           dictionary that maps from work and character to counts.
         """
-        searched_value = cgi.escape(self.request.get('searched_word').lower())
+        searched_value = _get_analyzer().get_term(
+            self.request.get('searched_word'))
 
         if not searched_value:
             return
         
-        all_mentions, count = _get_all_word_mentions(searched_value)
+        count, works = _get_word_counts(searched_value)
         if not count:
             return
 
         treemap_data = [['Location', 'Parent', 'Word Occurrences'],
             ['Shakespeare\'s Corpus', None, count]]
 
-        word_db = Word.get_by_id(searched_value)
-        for work in all_mentions:
-            work_db = Work.get_by_id(work, parent=word_db.key)
-            treemap_data.append([work, 'Shakespeare\'s Corpus', work_db.count]) 
-            for char in all_mentions[work]:
+        for work, (work_count, chars) in works.iteritems():
+            treemap_data.append([work, 'Shakespeare\'s Corpus', work_count]) 
+            for char, char_count in chars.iteritems():
                 if not char:
                     continue
-                char_db = Character.get_by_id(char, parent=work_db.key)
                 treemap_data.append([{'v': work + '+' + char, 'f': char}, work, 
-                    char_db.count])
+                    char_count])
 
         self.response.headers['Content-Type'] = 'text/json'
         self.response.out.write(json.encode({"array": treemap_data}))
@@ -224,7 +600,8 @@ class CharactersHandler(webapp2.RequestHandler):
 
     def get(self):
         """Returns the characters of a work."""
-        word_value = cgi.escape(self.request.get('searched_word').lower())
+        word_value = _get_analyzer().get_term(
+            self.request.get('searched_word'))
         work_value = self.request.get('work_filter')
         chars = _get_work_characters(word_value, work_value)
 
@@ -237,7 +614,8 @@ class WorksHandler(webapp2.RequestHandler):
 
     def get(self):
         """Returns the works that refers to a word."""
-        word_value = cgi.escape(self.request.get('searched_word').lower())
+        word_value = _get_analyzer().get_term(
+            self.request.get('searched_word'))
         works = _get_word_works(word_value)
 
         self.response.headers['Content-Type'] = 'text/json'
@@ -250,28 +628,283 @@ class SearchHandler(webapp2.RequestHandler):
 
     def get(self):
         """Returns the mentions related to a specific work and character"""
-        word_value = cgi.escape(self.request.get('searched_word').lower())
+        word_value = _get_analyzer().get_term(
+            self.request.get('searched_word'))
         work_value = self.request.get('work_filter')
         char_value = self.request.get('char_filter')
+        act_value = self.request.get('act_filter')
+        scene_value = self.request.get('scene_filter')
+
+        work_title = None if work_value in ('', 'Any') else work_value
+        # Characters are only filtered within a work
+        char_name = None if char_value in ('', 'Any') or work_title is None \
+            else char_value
+        act = None if act_value in ('', 'Any') else act_value
+        scene = None if scene_value in ('', 'Any') else scene_value
+
+        page_size = _get_page_size(self.request.get('page_size'))
+
+        start = time.time()
+        key = (word_value, work_title, char_name, act, scene, page_size)
+        result = _SEARCH_CACHE.get(key)
+        if result is None:
+            result = _get_search_result(*key)
+            if result is None:
+                self.abort(503, detail='Acts and scenes need the index file')
+            _SEARCH_CACHE.set(key, result)
+        end = time.time()
+
+        result = dict(result, time=round(end - start, 4))
+        self.response.headers['Content-Type'] = 'text/json'
+        self.response.out.write(json.encode(result))
+
+
+class MentionsPageHandler(webapp2.RequestHandler):
+    """Class for receiving requests of the next page of the lines of a
+       character, after a search."""
+
+    def get(self):
+        """Returns the page of lines of the cursor sent by /search, and the
+           cursor of the next page, if any"""
+        try:
+            search, first = _decode_cursor(self.request.get('cursor'))
+        except ValueError as error:
+            self.abort(400, detail=str(error))
+        word_value, work_title, char_name, act, scene = search
+        page_size = _get_page_size(self.request.get('page_size'))
 
         start = time.time()
-        if work_value == 'Any':
-            mentions, count = _get_all_word_mentions(word_value)
-        else: 
-            if char_value == 'Any':
-                mentions, count = _get_word_mentions_in_work(word_value, 
-                    work_value)
-            else:
-                mentions, count = _get_word_mentions_by_char(word_value, 
-                    work_value, char_value)
+        results = _get_mention_page(word_value, work_title, char_name, act,
+            scene, first, page_size)
         end = time.time()
+        if results is None:
+            self.abort(503, detail='Acts and scenes need the index file')
+        mentions, citations, line_counts, _ = results
+
+        lines = mentions.get(work_title, {}).get(char_name, [])
+        line_count = line_counts.get(work_title, {}).get(char_name, 0)
+        result = {
+            'lines': lines,
+            'cursor': None,
+            'time': round(end - start, 4)
+        }
+        if first + page_size < line_count:
+            result['cursor'] = _encode_cursor(search, first + page_size)
+        if citations is not None:
+            result['citations'] = citations.get(work_title, {}).get(
+                char_name, [])
+
+        self.response.headers['Content-Type'] = 'text/json'
+        self.response.out.write(json.encode(result))
+
+
+class CompleteHandler(webapp2.RequestHandler):
+    """Class for completing the word typed in the search box."""
+
+    def get(self):
+        """Returns the most frequent words that start with a prefix"""
+        prefix = _get_analyzer().get_term(self.request.get('prefix'))
+        try:
+            limit = min(max(int(self.request.get('limit')), 1),
+                Constants.COMPLETIONS)
+        except ValueError:
+            limit = Constants.COMPLETIONS
+        self.response.headers['Content-Type'] = 'text/json'
+        self.response.out.write(json.encode({
+            'completions': autocomplete.get_completions(prefix, limit)}))
+
+
+class SearchCacheHandler(webapp2.RequestHandler):
+    """Class for retrieving the counters of the cache of searches."""
+
+    def get(self):
+        """Returns the hit rate and evictions of the cache of this instance"""
+        self.response.headers['Content-Type'] = 'text/json'
+        self.response.out.write(json.encode(_SEARCH_CACHE.get_stats()))
+
+
+class PhraseSearchHandler(webapp2.RequestHandler):
+    """Class for receiving request of phrases, filtered by work and
+       character."""
+
+    def get(self):
+        """Returns the mentions of a phrase in a specific work and character"""
+        terms = _get_analyzer().analyze(self.request.get('searched_phrase'))
+        work_value = self.request.get('work_filter')
+        char_value = self.request.get('char_filter')
+
+        work_title = None if work_value in ('', 'Any') else work_value
+        char_name = None if char_value in ('', 'Any') else char_value
+
+        start = time.time()
+        results = _get_phrase_mentions(terms, work_title, char_name)
+        end = time.time()
+        if results is None:
+            self.abort(503, detail='Phrase search needs the index file')
+        mentions, count = results
 
         result = {
             'mentions': mentions,
             'number_results': count,
-            'time': round(end - start, 4),
-            'did_you_mean': spelling_corrector.get_suggestion(word_value)
+            'time': round(end - start, 4)
         }
-        
+
+        self.response.headers['Content-Type'] = 'text/json'
+        self.response.out.write(json.encode(result))
+
+
+class WildcardSearchHandler(webapp2.RequestHandler):
+    """Class for receiving wildcard searches, filtered by work and
+       character."""
+
+    def get(self):
+        """Returns the mentions of the words that match a pattern in a
+           specific work and character"""
+        pattern = self.request.get('searched_pattern').strip()
+        work_value = self.request.get('work_filter')
+        char_value = self.request.get('char_filter')
+
+        work_title = None if work_value in ('', 'Any') else work_value
+        char_name = None if char_value in ('', 'Any') else char_value
+
+        if not pattern or pattern.strip('*?') == '':
+            self.abort(400, detail='The pattern needs some letters')
+
+        start = time.time()
+        results = _get_wildcard_mentions(pattern, work_title, char_name)
+        end = time.time()
+        if results is None:
+            self.abort(503, detail='Wildcard search needs the index file')
+        mentions, terms, count = results
+
+        result = {
+            'mentions': mentions,
+            'terms': terms,
+            'number_results': count,
+            'time': round(end - start, 4)
+        }
+
+        self.response.headers['Content-Type'] = 'text/json'
+        self.response.out.write(json.encode(result))
+
+
+class RegexSearchHandler(webapp2.RequestHandler):
+    """Class for receiving regex searches over the text of the lines,
+       filtered by work and character."""
+
+    def get(self):
+        """Returns the lines that match a regex in a specific work and
+           character"""
+        regex = self.request.get('searched_regex')
+        work_value = self.request.get('work_filter')
+        char_value = self.request.get('char_filter')
+
+        work_title = None if work_value in ('', 'Any') else work_value
+        char_name = None if char_value in ('', 'Any') else char_value
+
+        try:
+            compiled, plan = regex_search.compile_regex(regex)
+        except ValueError as error:
+            self.abort(400, detail=str(error))
+        if plan == regex_search.ALL:
+            self.abort(400, detail='The regex needs a literal string of 3 '
+                'characters')
+
+        start = time.time()
+        results = _get_regex_mentions(compiled, plan, work_title, char_name)
+        end = time.time()
+        if results is None:
+            self.abort(503, detail='Regex search needs the index file')
+        mentions, count = results
+
+        result = {
+            'mentions': mentions,
+            'number_results': count,
+            'time': round(end - start, 4)
+        }
+
+        self.response.headers['Content-Type'] = 'text/json'
+        self.response.out.write(json.encode(result))
+
+
+class QuerySearchHandler(webapp2.RequestHandler):
+    """Class for receiving boolean queries, filtered by work and character."""
+
+    def get(self):
+        """Returns a page of the lines that match a query in a specific work
+           and character, and the cursor of the next page, if any"""
+        cursor = self.request.get('cursor')
+        if cursor:
+            try:
+                search, first = _decode_cursor(cursor, 3)
+            except ValueError as error:
+                self.abort(400, detail=str(error))
+            query, work_title, char_name = search
+        else:
+            query = self.request.get('searched_query')
+            work_value = self.request.get('work_filter')
+            char_value = self.request.get('char_filter')
+            work_title = None if work_value in ('', 'Any') else work_value
+            char_name = None if char_value in ('', 'Any') else char_value
+            first = 0
+        page_size = _get_page_size(self.request.get('page_size'),
+            Constants.QUERY_PAGE_SIZE, Constants.MAX_QUERY_PAGE_SIZE)
+
+        try:
+            plan = boolean_query.parse_query(query, _get_analyzer())
+        except ValueError as error:
+            self.abort(400, detail=str(error))
+
+        start = time.time()
+        results = _get_query_mentions(plan, work_title, char_name, first,
+            page_size)
+        end = time.time()
+        if results is None:
+            self.abort(503, detail='Query search needs the index file')
+        mentions, count = results
+
+        result = {
+            'mentions': mentions,
+            'number_results': count,
+            'cursor': None,
+            'time': round(end - start, 4)
+        }
+        if first + page_size < count:
+            result['cursor'] = _encode_cursor((query, work_title, char_name),
+                first + page_size)
+
+        self.response.headers['Content-Type'] = 'text/json'
+        self.response.out.write(json.encode(result))
+
+
+class RankedSearchHandler(webapp2.RequestHandler):
+    """Class for receiving ranked searches, filtered by work and character."""
+
+    def get(self):
+        """Returns the best lines for some words in a specific work and
+           character"""
+        terms = _get_analyzer().analyze(self.request.get('searched_query'))
+        work_value = self.request.get('work_filter')
+        char_value = self.request.get('char_filter')
+        try:
+            top = int(self.request.get('top', ranking.DEFAULT_TOP))
+        except ValueError:
+            self.abort(400, detail='top must be a number')
+        top = max(0, min(top, ranking.MAX_TOP))
+
+        work_title = None if work_value in ('', 'Any') else work_value
+        char_name = None if char_value in ('', 'Any') else char_value
+
+        start = time.time()
+        results = _get_top_mentions(terms, top, work_title, char_name)
+        end = time.time()
+        if results is None:
+            self.abort(503, detail='Ranked search needs the index file')
+
+        result = {
+            'results': results,
+            'time': round(end - start, 4)
+        }
+
         self.response.headers['Content-Type'] = 'text/json'
         self.response.out.write(json.encode(result))
@@ -24,14 +24,19 @@ from handlers such as counters, log messages, mutation pools.
 
 
 __all__ = ["get",
+           "broadcast_spec",
            "Pool",
            "Context",
+           "BROADCAST_PARAM",
            "COUNTER_MAPPER_CALLS",
            "COUNTER_MAPPER_WALLTIME_MS",
            "DATASTORE_DEADLINE",
            "MAX_ENTITY_COUNT",
+           "MAX_ENTITY_COUNT_PARAM",
           ]
 
+import collections
+import hashlib
 import heapq
 import logging
 import threading
@@ -41,8 +46,12 @@ try:
 except ImportError:
   ndb = None
 from google.appengine.api import datastore
+from google.appengine.ext import blobstore
 from google.appengine.ext import db
 from google.appengine.runtime import apiproxy_errors
+from mapreduce import errors
+from mapreduce import util
+from mapreduce.lib import simplejson
 
 
 # Maximum number of items. Pool will be flushed when reaches this amount.
@@ -53,6 +62,9 @@ from google.appengine.runtime import apiproxy_errors
 # TODO(user): Do batching by entity size if cheap. b/10427424
 MAX_ENTITY_COUNT = 20
 
+# Mapper parameter overriding MAX_ENTITY_COUNT for jobs with small entities.
+MAX_ENTITY_COUNT_PARAM = "max_entity_count"
+
 # Deadline in seconds for mutation pool datastore operations.
 DATASTORE_DEADLINE = 15
 
@@ -63,6 +75,21 @@ COUNTER_MAPPER_CALLS = "mapper-calls"
 # hundler function, but includes all i/o overhead.
 COUNTER_MAPPER_WALLTIME_MS = "mapper-walltime-ms"
 
+# Mapper parameter declaring the named broadcast side inputs of a job.
+# Its value is a dict from name to spec. A spec is either
+#   {"files": [<"/blobstore/<blob_key>" filename>, ...], "loader": <fq name>}
+# or
+#   {"value": <any json value>, "loader": <optional fq name>}
+# and carries a "version", set by broadcast_spec() when the job is declared.
+# The loader is called once per instance with the concatenated file contents
+# (or the inline value) and its return value is what handlers get from
+# Context.get_broadcast().
+BROADCAST_PARAM = "broadcast"
+
+# Number of broadcast inputs kept decoded by each instance, so jobs running at
+# the same time with inputs of the same name do not evict each other.
+BROADCAST_CACHE_SIZE = 8
+
 
 # pylint: disable=protected-access
 # pylint: disable=g-bad-name
@@ -369,6 +396,110 @@ class _Counters(Pool):
     pass
 
 
+def _get_broadcast_version(spec):
+  """Returns the version of a broadcast spec, derived from its content."""
+  content = dict((key, value) for key, value in spec.iteritems()
+                 if key != "version")
+  return hashlib.md5(simplejson.dumps(content, sort_keys=True)).hexdigest()
+
+
+def broadcast_spec(value=None, files=None, loader=None, version=None):
+  """Builds the spec of a broadcast input. See BROADCAST_PARAM.
+
+  The version is computed here, once per job, so handlers find the cached
+  input without serializing the spec on every lookup.
+
+  Args:
+    value: inline value of the input, any json value.
+    files: list of "/blobstore/<blob_key>" filenames whose concatenated
+      contents are the input, instead of value.
+    loader: fully qualified name of the function that decodes the input, or
+      None to use it as is.
+    version: version of the input as string, or None to derive it from the
+      rest of the spec.
+
+  Returns:
+    the spec as dict, to be put under BROADCAST_PARAM in the mapper params.
+  """
+  if files is not None:
+    spec = {"files": files}
+  else:
+    spec = {"value": value}
+  if loader:
+    spec["loader"] = loader
+  spec["version"] = (str(version) if version is not None
+                     else _get_broadcast_version(spec))
+  return spec
+
+
+class _BroadcastCache(object):
+  """Process wide cache of decoded broadcast side inputs.
+
+  Broadcast inputs are loaded at most once per instance and version, no matter
+  how many slices, shards or worker threads of the job run in that instance.
+  Entries are keyed by name and version, and only the BROADCAST_CACHE_SIZE
+  most recently used are kept, so jobs running at the same time with inputs
+  of the same name share the instance, while old inputs are not leaked.
+  """
+
+  def __init__(self, size=BROADCAST_CACHE_SIZE):
+    self._lock = threading.Lock()
+    self._size = size
+    self._entries = collections.OrderedDict()
+
+  def get(self, name, spec):
+    """Returns the decoded value of a broadcast input, loading it if needed.
+
+    Args:
+      name: broadcast input name as string.
+      spec: broadcast spec as dict. See BROADCAST_PARAM. Specs built without
+        broadcast_spec() get their version computed on the first lookup and
+        stored in them.
+
+    Returns:
+      the value returned by the spec loader.
+    """
+    version = spec.get("version")
+    if version is None:
+      version = spec["version"] = _get_broadcast_version(spec)
+    key = (name, str(version))
+    with self._lock:
+      if key in self._entries:
+        value = self._entries.pop(key)
+        self._entries[key] = value
+        return value
+      logging.info("Loading broadcast input %s (version %s).", name, version)
+      value = self._load(spec)
+      self._entries[key] = value
+      while len(self._entries) > self._size:
+        self._entries.popitem(last=False)
+    return value
+
+  def clear(self):
+    """Drops all cached values."""
+    with self._lock:
+      self._entries = collections.OrderedDict()
+
+  @classmethod
+  def _load(cls, spec):
+    """Reads and decodes a broadcast input described by spec."""
+    if "files" in spec:
+      data = "".join(blobstore.BlobReader(filename.split("/")[-1]).read()
+                     for filename in spec["files"])
+    elif "value" in spec:
+      data = spec["value"]
+    else:
+      raise errors.BadParamsError(
+          "Broadcast spec needs either 'files' or 'value': %r" % spec)
+    loader = spec.get("loader")
+    if not loader:
+      return data
+    return util.for_name(loader)(data)
+
+
+_broadcast_cache = _BroadcastCache()
+
+
 class Context(object):
   """MapReduce execution context.
 
@@ -418,9 +549,14 @@ class Context(object):
       # Only in tests
       self.shard_id = None
 
-    # TODO(user): Allow user to specify max entity count for the pool
-    # as they know how big their entities are.
-    self._mutation_pool = _MutationPool(mapreduce_spec=mapreduce_spec)
+    # Users know how big their entities are, so they may raise the
+    # max entity count of the pool through the mapper parameters.
+    max_entity_count = MAX_ENTITY_COUNT
+    if self.mapreduce_spec:
+      max_entity_count = self.mapreduce_spec.mapper.params.get(
+          MAX_ENTITY_COUNT_PARAM, MAX_ENTITY_COUNT)
+    self._mutation_pool = _MutationPool(max_entity_count=max_entity_count,
+                                        mapreduce_spec=mapreduce_spec)
     self._counters = _Counters(shard_state)
     # TODO(user): Remove this after fixing
     # keyhole/dataeng/imagery/feeds/client_lib.py in another CL.
@@ -455,6 +591,27 @@ class Context(object):
     """
     return self._pools.get(key, None)
 
+  def get_broadcast(self, name):
+    """Obtains a broadcast side input declared in the mapper parameters.
+
+    The input is loaded and decoded once per instance and shared by every
+    handler call afterwards, so handlers can do O(1) lookups in it instead of
+    re-reading side data for each input record.
+
+    Args:
+      name: broadcast input name as string, a key of BROADCAST_PARAM.
+
+    Returns:
+      the decoded broadcast value.
+
+    Raises:
+      errors.BadParamsError: if the job does not declare the input.
+    """
+    specs = self.mapreduce_spec.mapper.params.get(BROADCAST_PARAM, {})
+    if name not in specs:
+      raise errors.BadParamsError("Unknown broadcast input: %s" % name)
+    return _broadcast_cache.get(name, specs[name])
+
   @classmethod
   def _set(cls, context):
     """Set current context instance.
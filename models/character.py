@@ -1,7 +1,10 @@
 """Character model for the datastore."""
 from google.appengine.ext import ndb
 
+from auxiliary import postings as postings_codec
+from auxiliary.preprocessing import split_line_ordinal
 from models.line import Line
+from models.postings_chunk import PostingsChunk
 
 class Character(ndb.Model):
     """Model a Character of a Work. The parent of this object is a Work.
@@ -12,21 +15,90 @@ class Character(ndb.Model):
     Attributes:
         name: Name of the character.
         mentions: List of the keys for lines (that contains an specific word)
-            said by this character. 
+            said by this character.
             This list is actually a set: if the word is repeated more than one
-            time in the line, the character would not have the line repeated. 
+            time in the line, the character would not have the line repeated.
+            Only characters indexed before postings existed use it.
         count: The number of times a character says an specific word inside a
             book.
+        corpus: The blob key of the corpus the postings refer to.
+        postings: The sorted ordinals of the lines (see
+            preprocessing.get_line_ordinal) in which the character says the
+            word, encoded by auxiliary.postings. If there are too many of
+            them, this is only the first chunk and the rest are kept in
+            PostingsChunk children.
+        chunks: The number of PostingsChunk children.
     """
     name = ndb.StringProperty()
     mentions = ndb.KeyProperty(kind=Line, repeated=True)
     count = ndb.IntegerProperty()
+    corpus = ndb.StringProperty(indexed=False)
+    postings = ndb.BlobProperty()
+    chunks = ndb.IntegerProperty(default=0, indexed=False)
 
     def __init__(self, *args, **kwargs):
         """Initialize the character with an empty list of mentions."""
         super(Character, self).__init__(*args, **kwargs)
         self.mentions = []
+        self._ordinals = None
+
+    def set_postings(self, corpus, ordinals):
+        """Set the lines in which the character says the word.
+
+        Args:
+            corpus: The blob key of the corpus of the lines.
+            ordinals: The sorted ordinals of the lines, without repetitions.
+
+        Returns:
+            The PostingsChunk entities that hold the postings that do not fit
+            in the character. They must be put along with it.
+        """
+        chunks = postings_codec.encode_chunks(ordinals)
+        self.corpus = str(corpus)
+        self.postings = chunks[0]
+        self.chunks = len(chunks) - 1
+        self._ordinals = list(ordinals)
+        return [PostingsChunk(parent=self.key, id=number, postings=chunk)
+            for number, chunk in enumerate(chunks[1:], 1)]
+
+    def get_ordinals(self):
+        """Get the sorted ordinals of the lines of the character.
+
+        The postings are only decoded, and their chunks fetched, the first
+        time this is called.
+        """
+        return self.get_ordinals_async().get_result()
+
+    @ndb.tasklet
+    def get_ordinals_async(self):
+        """Get a future of the sorted ordinals of the lines of the character,
+        fetching all of its chunks in a single batch."""
+        if self._ordinals is None:
+            data = [self.postings or '']
+            if self.chunks:
+                chunks = yield ndb.get_multi_async(
+                    [ndb.Key(PostingsChunk, number, parent=self.key)
+                    for number in range(1, self.chunks + 1)])
+                data += [chunk.postings for chunk in chunks]
+            self._ordinals = [ordinal for chunk in data
+                for ordinal in postings_codec.iter_postings(chunk)]
+        raise ndb.Return(self._ordinals)
+
+    def get_mention_keys(self):
+        """Get the keys of the lines in which the character says the word."""
+        return self.get_mention_keys_async().get_result()
+
+    @ndb.tasklet
+    def get_mention_keys_async(self):
+        """Get a future of the keys of the lines in which the character says
+        the word."""
+        if self.postings is None:
+            raise ndb.Return(self.mentions)
+        ordinals = yield self.get_ordinals_async()
+        raise ndb.Return([ndb.Key(Line, Line.get_key_name(self.corpus,
+            *split_line_ordinal(ordinal))) for ordinal in ordinals])
 
     def get_string_mentions(self):
         """Get all mentions as strings"""
-        return [mention.line for mention in ndb.get_multi(self.mentions)]
+        return [mention.line for mention in
+            ndb.get_multi(self.get_mention_keys())]
@@ -0,0 +1,14 @@
+'''Module for the model of the definitions of a word.'''
+from google.appengine.ext import ndb
+
+class Definition(ndb.Model):
+    '''Models the definitions of a word returned by the definition service, so
+    each word is only asked for once. Its id is the word, in lowercase.
+
+    Attributes:
+        definitions: the definitions of the word, empty if the dictionary does
+            not have it.
+        fetched: when the definitions were returned by the service.
+    '''
+    definitions = ndb.StringProperty(repeated=True, indexed=False)
+    fetched = ndb.DateTimeProperty(auto_now_add=True, indexed=False)
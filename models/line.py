@@ -2,6 +2,28 @@
 from google.appengine.ext import ndb
 
 class Line(ndb.Model):
-    """Model a mention in a work."""
+    """Model a mention in a work.
+
+    Lines are keyed by their position in the indexed corpus (see get_key_name),
+    so indexing the same corpus twice overwrites lines instead of duplicating
+    them.
+    """
+
+    __SEP = ':'
 
     line = ndb.StringProperty()
+
+    @staticmethod
+    def get_key_name(blob_key, file_index, offset):
+        """Returns the key name of a line of the indexed corpus.
+
+        Args:
+            blob_key: The blob key of the zip file that contains the line.
+            file_index: The position of the text file inside the zip file.
+            offset: The byte offset of the line inside the text file.
+
+        Returns:
+            A string of the form <blob_key>:<file_index>:<offset>.
+        """
+        sep = Line.__SEP
+        return str(blob_key) + sep + str(file_index) + sep + str(offset)
@@ -0,0 +1,12 @@
+"""Postings chunk model for the datastore."""
+from google.appengine.ext import ndb
+
+class PostingsChunk(ndb.Model):
+    """Models the continuation of the postings of a Character, when they are
+    too many to be kept in the Character itself. The parent of this object is
+    a Character and its id is the number of the chunk, starting at 1.
+
+    Attributes:
+        postings: chunk of the postings, encoded by auxiliary.postings.
+    """
+    postings = ndb.BlobProperty()
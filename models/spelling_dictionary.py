@@ -0,0 +1,44 @@
+"""Spelling dictionary model for the datastore."""
+from google.appengine.ext import ndb
+
+# Entities are limited to 1 MB, so the dictionary is split in chunks.
+_CHUNK_SIZE = 900000
+
+class SpellingDictionary(ndb.Model):
+    """Models the symmetric delete dictionary of the indexed words (see
+    auxiliary.symspell), serialized.
+
+    The dictionary is a single entity with id 'words' holding the first chunk
+    of the serialized dictionary, and the rest of the chunks are kept in its
+    children, whose ids are the numbers of the chunks starting at 1.
+
+    Attributes:
+        data: chunk of the serialized dictionary.
+        chunks: the number of children, only set in the root.
+    """
+    data = ndb.BlobProperty()
+    chunks = ndb.IntegerProperty(default=0, indexed=False)
+
+    ROOT_ID = 'words'
+
+    @classmethod
+    def save(cls, data):
+        """Put a serialized dictionary, replacing the previous one."""
+        ndb.delete_multi(cls.query().fetch(keys_only=True))
+        pieces = [data[start:start + _CHUNK_SIZE]
+            for start in range(0, len(data), _CHUNK_SIZE)] or ['']
+        root = cls(id=cls.ROOT_ID, data=pieces[0], chunks=len(pieces) - 1)
+        ndb.put_multi([root] + [cls(parent=root.key, id=number, data=piece)
+            for number, piece in enumerate(pieces[1:], 1)])
+
+    @classmethod
+    def load(cls):
+        """Get the serialized dictionary, or None if there is none."""
+        root = cls.get_by_id(cls.ROOT_ID)
+        if not root:
+            return None
+        chunks = ndb.get_multi([ndb.Key(cls, number, parent=root.key)
+            for number in range(1, root.chunks + 1)])
+        if None in chunks:
+            return None
+        return root.data + ''.join(chunk.data for chunk in chunks)
@@ -0,0 +1,74 @@
+"""Word summary model for the datastore."""
+from google.appengine.ext import ndb
+
+from models.character import Character
+from models.word import Word
+from models.work import Work
+
+class WordSummary(ndb.Model):
+    """Models the number of occurrences of a word by work and character, so
+    the treemap and the filters of the results page are answered with a
+    single get, without querying works and characters or fetching lines. Its
+    id is the word.
+
+    Attributes:
+        count: The number of times the word appears in all the works.
+        works: Dictionary that maps the title of each work in which the word
+            appears to a list [count, chars], in which chars maps the name of
+            each character that says it to its count.
+    """
+    count = ndb.IntegerProperty(indexed=False)
+    works = ndb.JsonProperty(indexed=False, compressed=True)
+
+    @classmethod
+    def create(cls, word_name, works):
+        """Create the summary of a word.
+
+        Args:
+            word_name: the word.
+            works: dictionary that maps the title of each work to a tuple
+                (count, chars), in which chars maps the name of each character
+                to its count.
+        """
+        return cls(id=word_name,
+            count=sum(count for count, _ in works.itervalues()),
+            works=dict((title, [count, chars])
+            for title, (count, chars) in works.iteritems()))
+
+    @classmethod
+    def get_or_build(cls, word_name):
+        """Get the summary of a word.
+
+        Words indexed before summaries existed have none, so their summary is
+        built from their works and characters, and put for the next time.
+
+        Returns:
+            The WordSummary, or None if the word is not indexed.
+        """
+        summary = cls.get_by_id(word_name)
+        if summary:
+            return summary
+        word = Word.get_by_id(word_name)
+        if not word:
+            return None
+        works = Work.query(ancestor=word.key).fetch()
+        chars = [query.get_result() for query in
+            [Character.query(ancestor=work.key).fetch_async()
+            for work in works]]
+        summary = cls.create(word_name, dict((work.title, (work.count,
+            dict((char.name, char.count) for char in work_chars)))
+            for work, work_chars in zip(works, chars)))
+        summary.count = word.count
+        summary.put()
+        return summary
+
+    def get_counts(self):
+        """Get the counts of the word.
+
+        Returns:
+            A tuple (count, works), in which works maps each work title to a
+            tuple (count, chars), and chars maps the name of each character to
+            its count.
+        """
+        return self.count, dict((title, (count, chars))
+            for title, (count, chars) in self.works.iteritems())
@@ -6,6 +6,46 @@ class Constants:
 	# HTML tags
 	BOLD_TAG = 'b'
 
+	# Index file written by auxiliary.index_builder and deployed with the app
+	INDEX_FILE = 'index/shakespeare.idx'
+
+	# Spelling dictionary written by auxiliary.index_builder next to the index
+	# file
+	SPELLING_FILE = 'index/shakespeare.spell'
+
+	# Spelling suggestions shown for a word that is not indexed
+	SPELLING_SUGGESTIONS = 5
+
+	# Completion trie written by auxiliary.index_builder next to the index file
+	COMPLETION_FILE = 'index/shakespeare.complete'
+
+	# Completions of the prefix typed in the search box
+	COMPLETIONS = 8
+
+	# Most lines fetched from the datastore by a single batch get
+	LINES_BATCH_SIZE = 1000
+
+	# Lines of each character sent by each page of a search
+	MENTIONS_PAGE_SIZE = 5
+	MAX_MENTIONS_PAGE_SIZE = 100
+
+	# Lines sent by each page of a boolean query
+	QUERY_PAGE_SIZE = 100
+	MAX_QUERY_PAGE_SIZE = 1000
+
+	# Definition service (see auxiliary.definition_store), which can be set in
+	# the environment to use the stand-in of auxiliary.definition_server
+	DEFINITION_SERVICE_URL = os.environ.get('DEFINITION_SERVICE_URL',
+		'http://definition-server.appspot.com/definition')
+
+	# Seconds a definition service call may take, and calls retried after a
+	# failure
+	DEFINITION_DEADLINE = 2
+	DEFINITION_RETRIES = 1
+
+	# Most words defined by a single call to /define/batch
+	DEFINITION_BATCH_SIZE = 50
+
 	JINJA_ENVIRONMENT = jinja2.Environment(
 		loader=jinja2.FileSystemLoader('templates/'),
     	extensions=['jinja2.ext.autoescape'],	
@@ -0,0 +1,30 @@
+$(document).ready(function(){
+    /* Suggest the most frequent words that start with the text of the search
+     * box, in a datalist. Only the answer to the last text typed is shown. */
+    var lastPrefix = null;
+    $('#search-value').attr('list', 'completions').attr('autocomplete', 'off');
+    $('#search-value').after($('<datalist>').attr('id', 'completions'));
+
+    $('#search-value').on('input', function(){
+        var prefix = $.trim($(this).val());
+        if (prefix == lastPrefix) {
+            return;
+        }
+        lastPrefix = prefix;
+        if (prefix.length == 0) {
+            $('#completions').empty();
+            return;
+        }
+        $.get('/complete', {prefix: prefix}, function(data) {
+            if (prefix != lastPrefix) {
+                return;
+            }
+            $('#completions').empty();
+            completions = data['completions'];
+            for (var i = 0; i < completions.length; i++) {
+                $('#completions').append($('<option>').attr('value',
+                    completions[i]));
+            }
+        });
+    });
+});
@@ -1,12 +1,91 @@
 var shakespy = {};
 
+/* Definitions already fetched, by lowercase word. Words the dictionary service
+ * could not define in time are not kept, so they are asked for again. */
+shakespy.definitions = {};
+
+/* Most words sent in a single call to /define/batch, as in
+ * Constants.DEFINITION_BATCH_SIZE. */
+shakespy.DEFINITION_BATCH_SIZE = 50;
+
+shakespy.isFetched = function(word) {
+	/* Tell if the definitions of a lowercase word are fetched, without taking
+	 * the names inherited by objects, like "constructor", as words. */
+	return Object.prototype.hasOwnProperty.call(shakespy.definitions, word);
+};
+
+shakespy.prefetchDefinitions = function(words, callback) {
+	/* Fetch the definitions of the words that are not fetched yet, in as few
+	 * calls to /define/batch as possible, and then call the callback. */
+	var missing = [];
+	for (var i = 0; i < words.length; i++) {
+		var word = words[i].toLowerCase();
+		if (word && !shakespy.isFetched(word) &&
+				$.inArray(word, missing) < 0) {
+			missing.push(word);
+		}
+	}
+	/* Each call is settled when it either succeeds or fails, so the callback
+	 * waits for all of them even if some fail. */
+	var calls = [];
+	for (var start = 0; start < missing.length;
+			start += shakespy.DEFINITION_BATCH_SIZE) {
+		var request = $.param({terms: missing.slice(start,
+			start + shakespy.DEFINITION_BATCH_SIZE)}, true);
+		var settled = $.Deferred();
+		$.post('/define/batch', request, function(definitions) {
+			for (var word in definitions) {
+				if (definitions[word] !== null) {
+					shakespy.definitions[word] = definitions[word];
+				}
+			}
+		}, 'json').always(settled.resolve);
+		calls.push(settled.promise());
+	}
+	$.when.apply($, calls).always(callback);
+};
+
+shakespy.getDefinition = function(word) {
+	/* Get the text shown as the definition of a fetched word. */
+	var definitions = [];
+	if (word) {
+		word = word.toLowerCase();
+		definitions = shakespy.isFetched(word) ? shakespy.definitions[word] :
+			undefined;
+	}
+	if (definitions === undefined) {
+		return 'The dictionary is not available, try again later';
+	}
+	if (definitions.length == 0) {
+		return 'Word not found in the dictionary';
+	}
+	return definitions[0];
+};
+
+shakespy.defineHighlighted = function(container) {
+	/* Show the definition of each highlighted word of the result lines of a
+	 * container when the mouse is over it, fetching all of them at once. */
+	var highlighted = $(container).find('.result-line b').filter(function() {
+		return /^[A-Za-z']+$/.test($(this).text());
+	});
+	var words = highlighted.map(function() {
+		return $(this).text();
+	}).get();
+	shakespy.prefetchDefinitions(words, function() {
+		highlighted.each(function() {
+			if (shakespy.isFetched($(this).text().toLowerCase())) {
+				$(this).attr('title', shakespy.getDefinition($(this).text()));
+			}
+		});
+	});
+};
+
 $(document).ready(function(){
-	var request = {
-		searched_word: $('#search-value').val()
-	};
+	var searchedWord = $.trim($('#search-value').val());
 
-	$.get( "/define", request, function( wordDefinition ) {
+	shakespy.prefetchDefinitions([searchedWord], function() {
 		$('#loading_message').remove();
-		$('#definition').append(wordDefinition);
+		$('#definition').append(document.createTextNode(
+			shakespy.getDefinition(searchedWord)));
 	});
 });
@@ -10,9 +10,48 @@ function getSearchedWord() {
     return document.location.search.split('=')[1]; 
 }
 
-function insertMentions(mentions) {
-    /* Displays the mentions of the search filtered by work and character. The 
-     * filter is optional */
+function formatCitation(citation) {
+    /* Format an (act, scene, number) citation like I.ii.23. Stage directions
+     * have number 0 and no citation. */
+    var act = citation[0], scene = citation[1], number = citation[2];
+    if (!number) {
+        return '';
+    }
+    var parts = [];
+    if (act) {
+        parts.push(act);
+    }
+    if (scene) {
+        parts.push(scene.toLowerCase());
+    }
+    parts.push(number);
+    return parts.join('.');
+}
+
+function createLine(text, citation) {
+    /* Create the element of a line of the results. The citation, when the
+     * server sends it, is shown before the line. */
+    line = document.createElement('p');
+    $(line).addClass('result-line');
+    $(line).html(text);
+    if (citation) {
+        citationElement = document.createElement('span');
+        $(citationElement).addClass('citation');
+        $(citationElement).text(formatCitation(citation) + ' ');
+        $(line).prepend(citationElement);
+    }
+    return line;
+}
+
+function setLoadMoreText(loadMore) {
+    /* Show the number of lines of a character that are not loaded yet */
+    $(loadMore).text("Load " + $(loadMore).attr('remaining') + " more lines");
+}
+
+function insertMentions(mentions, citations, lineCounts, cursors) {
+    /* Displays the first page of the mentions of the search filtered by work
+     * and character. The filter is optional. Characters with more lines get a
+     * link that loads their next page. */
     if (jQuery.isEmptyObject(mentions)) {
         message = document.createElement('p');
         $(message).text('No results found for ');
@@ -50,22 +89,22 @@ function insertMentions(mentions) {
             characterLines = document.createElement('div');
             $(characterLines).addClass('character-lines');
 
-            var mentions_length = mentions[work][charac].length;
-            for (var i = 0; i < mentions_length; i++) {
-                line = document.createElement('p');
-                $(line).addClass('result-line');
-                $(line).html(mentions[work][charac][i]);
-                if (i > 4) {
-                    $(line).hide();
-                }
-                $(characterLines).append(line);
+            var lines = mentions[work][charac];
+            var lineCitations = citations && citations[work] &&
+                citations[work][charac];
+            for (var i = 0; i < lines.length; i++) {
+                $(characterLines).append(createLine(lines[i],
+                    lineCitations && lineCitations[i]));
             }
-            if(mentions_length > 4) {
+            if (cursors && cursors[work] && cursors[work][charac]) {
                 load_more = document.createElement('a');
                 $(load_more).addClass('load_more');
                 $(load_more).attr('character', charac);
                 $(load_more).attr('work', work);
-                $(load_more).text("Load " + (mentions_length-4-1) + " more lines");
+                $(load_more).attr('cursor', cursors[work][charac]);
+                $(load_more).attr('remaining',
+                    lineCounts[work][charac] - lines.length);
+                setLoadMoreText(load_more);
                 $(characterLines).append(load_more);
             }
 
@@ -84,13 +123,23 @@ function insertResultsInfo(time, number_results, number_works) {
         time + " seconds)");   
 }
 
-function insertDidYouMean(did_you_mean) {
+function insertDidYouMean(did_you_mean, suggestions) {
     /* If there is a suggestion for the not found word, this function inserts it
-    to the html */
+    to the html, followed by the other suggestions */
     if (did_you_mean) {
         $('#did-you-mean-sugg').attr('href', '/results?searched_word=' + 
             did_you_mean);
         $('#did-you-mean-sugg').text(did_you_mean);
+        $('#did-you-mean-others').empty();
+        suggestions = suggestions || [];
+        for (var i = 0; i < suggestions.length; i++) {
+            if (suggestions[i] == did_you_mean) {
+                continue;
+            }
+            link = $('<a>').attr('href', '/results?searched_word=' +
+                suggestions[i]).text(suggestions[i]);
+            $('#did-you-mean-others').append(', ').append(link);
+        }
         $('#did-you-mean').show();
     }
 }
@@ -100,14 +149,15 @@ function insertResults(result) {
     
     mentions = result['mentions'];
     console.log(mentions);
-    insertMentions(mentions);
+    insertMentions(mentions, result['citations'], result['line_counts'],
+        result['cursors']);
 
     time = result['time'];
     number_results = result['number_results'];
     insertResultsInfo(time, number_results, Object.keys(mentions).length);
 
     did_you_mean = result['did_you_mean'];
-    insertDidYouMean(did_you_mean); 
+    insertDidYouMean(did_you_mean, result['suggestions']); 
 }
 
 function populateChars(data){
@@ -143,6 +193,7 @@ function resultsLoadingFinish() {
     $('#results-loading').hide();
     $('#results').show();
     generateLoadMoreHandlers();
+    shakespy.defineHighlighted('#results');
 }
 
 function treemapLoadingStart() {
@@ -195,8 +246,26 @@ function generateLoadMoreHandlers() {
     That's why we are calling this function here, after the insertRestults
     method. */
     $('.load_more').click(function() {
-        $(this).parent().children().fadeIn();
-        $(this).hide();
+        /* Only the next page of lines of the character is requested */
+        var loadMore = this;
+        var request = {cursor: $(loadMore).attr('cursor')};
+        $.get('/mentions', request, function(page) {
+            var lines = page['lines'];
+            for (var i = 0; i < lines.length; i++) {
+                $(createLine(lines[i], page['citations'] &&
+                    page['citations'][i])).hide().insertBefore(
+                    loadMore).fadeIn();
+            }
+            shakespy.defineHighlighted($(loadMore).parent());
+            if (page['cursor']) {
+                $(loadMore).attr('cursor', page['cursor']);
+                $(loadMore).attr('remaining',
+                    $(loadMore).attr('remaining') - lines.length);
+                setLoadMoreText(loadMore);
+            } else {
+                $(loadMore).hide();
+            }
+        });
     });
 }
 
@@ -0,0 +1,62 @@
+"""Tests for the analyzers of text into terms.
+
+Run this tests like this:
+nosetests tests/analyzer_test.py
+"""
+
+import pickle
+import unittest
+
+from auxiliary import analyzer
+
+
+# Disable Too many public methods warning
+# pylint: disable=R0904
+class AnalyzerTest(unittest.TestCase):
+    """Tests for the analyzers of text into terms."""
+
+    line = "HAMLET\tO'er the hill, 'tis said: 'Farewell', Horatio_2!"
+
+    def test_default(self):
+        self.assertEqual(analyzer.get_analyzer().analyze(self.line),
+            ['hamlet', 'o', 'er', 'the', 'hill', 'tis', 'said', 'farewell',
+            'horatio'])
+
+    def test_elisions(self):
+        self.assertEqual(analyzer.Analyzer(elisions=True).analyze(self.line),
+            ['hamlet', "o'er", 'the', 'hill', "'tis", 'said', 'farewell',
+            'horatio'])
+
+    def test_keep_case(self):
+        self.assertEqual(analyzer.Analyzer(fold_case=False).analyze(
+            'Good night, Ana.'), ['Good', 'night', 'Ana'])
+
+    def test_analyze_spans(self):
+        for options in ({}, {'elisions': True}, {'fold_case': False}):
+            instance = analyzer.Analyzer(**options)
+            spans = instance.analyze_spans(self.line)
+            self.assertEqual([term for term, _, _ in spans],
+                instance.analyze(self.line))
+            for term, start, end in spans:
+                self.assertEqual(self.line[start:end].lower(), term.lower())
+
+    def test_get_term(self):
+        self.assertEqual(analyzer.get_analyzer().get_term(' Love! '), 'love')
+        self.assertEqual(analyzer.get_analyzer().get_term('?!'), '')
+
+    def test_config(self):
+        elisions = analyzer.Analyzer(elisions=True)
+        self.assertEqual(analyzer.Analyzer.from_config(
+            elisions.get_config()).analyze(self.line),
+            elisions.analyze(self.line))
+        self.assertIs(analyzer.get_analyzer({'elisions': False}),
+            analyzer.get_analyzer())
+
+    def test_pickle(self):
+        elisions = pickle.loads(pickle.dumps(analyzer.Analyzer(elisions=True)))
+        self.assertEqual(elisions.get_config(),
+            {'fold_case': True, 'elisions': True})
+
+
+if __name__ == '__main__':
+    unittest.main()
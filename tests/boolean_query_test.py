@@ -0,0 +1,102 @@
+"""Tests for the boolean queries.
+
+Run this tests like this:
+nosetests tests/boolean_query_test.py
+"""
+
+import unittest
+
+from auxiliary import boolean_query
+from index_fixture import IndexFileCase
+
+
+# Disable Too many public methods warning
+# pylint: disable=R0904
+class ParseQueryTest(unittest.TestCase):
+    """Tests for the parsing of queries into plans."""
+
+    def test_implicit_and(self):
+        self.assertEqual(boolean_query.parse_query('Love death'),
+            ('and', (('term', 'love'), ('term', 'death'))))
+
+    def test_precedence(self):
+        self.assertEqual(
+            boolean_query.parse_query('love AND death NOT sword OR king'),
+            ('or', (('and', (('term', 'love'), ('term', 'death'),
+                ('not', ('term', 'sword')))), ('term', 'king'))))
+
+    def test_parentheses(self):
+        self.assertEqual(boolean_query.parse_query('(love OR death) king'),
+            ('and', (('or', (('term', 'love'), ('term', 'death'))),
+                ('term', 'king'))))
+
+    def test_lowercase_operators_are_words(self):
+        self.assertEqual(boolean_query.parse_query('king and queen'),
+            ('and', (('term', 'king'), ('term', 'and'), ('term', 'queen'))))
+
+    def test_malformed_queries(self):
+        for query in ['', 'love AND', '(love', 'love)', 'OR love', '!!']:
+            self.assertRaises(ValueError, boolean_query.parse_query, query)
+
+    def test_negative_queries(self):
+        for query in ['NOT sword', 'NOT love NOT death', 'love OR NOT sword',
+                '(NOT love) OR (NOT death)']:
+            self.assertRaises(ValueError, boolean_query.parse_query, query)
+        self.assertEqual(boolean_query.parse_query('(love OR king) NOT death'),
+            ('and', (('or', (('term', 'love'), ('term', 'king'))),
+                ('not', ('term', 'death')))))
+
+    def test_get_terms(self):
+        plan = boolean_query.parse_query('love AND death NOT sword')
+        self.assertEqual(boolean_query.get_terms(plan), ['love', 'death'])
+
+
+class MergeTest(unittest.TestCase):
+    """Tests for the merging of lists of line ids."""
+
+    def test_intersect(self):
+        self.assertEqual(boolean_query.intersect([3, 70, 1000],
+            range(0, 2000, 5)), [70, 1000])
+        self.assertEqual(boolean_query.intersect(range(100), [99, 100]), [99])
+        self.assertEqual(boolean_query.intersect([], [1, 2]), [])
+
+    def test_subtract(self):
+        self.assertEqual(boolean_query.subtract([1, 5, 9, 12],
+            range(0, 20, 3)), [1, 5])
+        self.assertEqual(boolean_query.subtract([1, 2], []), [1, 2])
+
+    def test_unite(self):
+        self.assertEqual(boolean_query.unite([[1, 4], [2, 4, 8], []]),
+            [1, 2, 4, 8])
+
+
+class ExecutePlanTest(IndexFileCase):
+    """Tests for the execution of plans over an index file."""
+
+    def execute(self, query):
+        return boolean_query.execute_plan(boolean_query.parse_query(query),
+            self.index)
+
+    def test_and(self):
+        self.assertEqual(self.execute('king AND queen'), [4])
+        self.assertEqual(self.execute('king dead'), [2])
+        self.assertEqual(self.execute('king sword'), [])
+
+    def test_or(self):
+        self.assertEqual(self.execute('queen OR death'), [3, 4, 5, 9])
+
+    def test_not(self):
+        self.assertEqual(self.execute('dead NOT king'), [3])
+        self.assertEqual(boolean_query.execute_plan(
+            ('not', ('term', 'the')), self.index),
+            [0, 1, 5, 6, 7, 8, 9, 10, 11, 13])
+
+    def test_line_mentions(self):
+        line_ids = self.execute('the queen')
+        self.assertEqual(self.index.get_line_mentions(line_ids, 'Hamlet',
+            'Ophelia'), ({'Hamlet': {'Ophelia': [
+                'OPHELIA\tThe king and the queen.']}}, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -13,6 +13,7 @@ from google.appengine.ext import testbed
 
 from models.character import Character
 from models.word import Word
+from models.word_summary import WordSummary
 from models.work import Work
 from models.line import Line
 from controllers.admin_page import FileMetadata
@@ -50,6 +51,8 @@ class ClearDatastoreTest(unittest.TestCase):
         line = Line(line='Neither a borrower nor a lender be').put()
         char.mentions = [line]
         self.objects += [word, work, char]
+        self.objects.append(WordSummary.create('neither',
+            {'hamlet': (1, {'hamlet': 1})}))
 
         self.objects += [FileMetadata(filename='dummy'), 
             FileMetadata(filename='dummy2')]
@@ -84,6 +87,7 @@ class ClearDatastoreTest(unittest.TestCase):
         """
 
         self.assertNotEquals(Word.query().fetch(), [])
+        self.assertNotEquals(WordSummary.query().fetch(), [])
         self.assertNotEquals(Work.query().fetch(), [])
         self.assertNotEquals(Character.query().fetch(), [])
         self.assertNotEquals(list(FileMetadata.all().run()), [])
@@ -91,6 +95,7 @@ class ClearDatastoreTest(unittest.TestCase):
         self.testapp.get('/')
 
         self.assertEquals(Word.query().fetch(), [])
+        self.assertEquals(WordSummary.query().fetch(), [])
         self.assertEquals(Work.query().fetch(), [])
         self.assertEquals(Character.query().fetch(), [])
         self.assertEquals(list(FileMetadata.all().run()), [])
@@ -0,0 +1,75 @@
+"""Tests for the completion trie.
+
+Run this tests like this:
+nosetests tests/completion_trie_test.py
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from auxiliary import completion_trie
+
+
+# Disable Too many public methods warning
+# pylint: disable=R0904
+class CompletionTrieTest(unittest.TestCase):
+    """Tests for the completion trie."""
+
+    def setUp(self):
+        self.trie = completion_trie.CompletionTrie.build([('love', 12),
+            ('lover', 3), ('lovers', 5), ('lord', 40), ('lie', 100),
+            ('borrower', 2)], top=3)
+
+    def test_complete(self):
+        self.assertEqual(self.trie.complete('lo'),
+            [('lord', 40), ('love', 12), ('lovers', 5)])
+        self.assertEqual(self.trie.complete('love'),
+            [('love', 12), ('lovers', 5), ('lover', 3)])
+        self.assertEqual(self.trie.complete('lovers'), [('lovers', 5)])
+        self.assertEqual(self.trie.complete('b'), [('borrower', 2)])
+
+    def test_complete_every_word(self):
+        self.assertEqual(self.trie.complete(''),
+            [('lie', 100), ('lord', 40), ('love', 12)])
+
+    def test_limit(self):
+        self.assertEqual(self.trie.complete('l', 2),
+            [('lie', 100), ('lord', 40)])
+        self.assertEqual(len(self.trie.complete('l', 10)), 3)
+
+    def test_unknown_prefix(self):
+        self.assertEqual(self.trie.complete('lovee'), [])
+        self.assertEqual(self.trie.complete('x'), [])
+
+    def test_serialize(self):
+        trie = completion_trie.CompletionTrie.deserialize(
+            self.trie.serialize())
+        self.assertEqual(trie.words, self.trie.words)
+        self.assertEqual(trie.complete('lo'), self.trie.complete('lo'))
+        self.assertRaises(ValueError,
+            completion_trie.CompletionTrie.deserialize, 'words')
+
+    def test_empty(self):
+        trie = completion_trie.CompletionTrie.deserialize(
+            completion_trie.CompletionTrie.build([]).serialize())
+        self.assertEqual(trie.complete(''), [])
+        self.assertEqual(trie.complete('love'), [])
+
+    def test_trie_file(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, completion_trie.TRIE_FILENAME)
+            completion_trie.write_trie_file(self.trie, path)
+            trie = completion_trie.get_trie_file(path)
+            self.assertIs(completion_trie.get_trie_file(path), trie)
+            self.assertEqual(trie.complete('lov', 1), [('love', 12)])
+            self.assertIsNone(completion_trie.get_trie_file(
+                os.path.join(directory, 'missing.complete')))
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+"""Tests for the index mapper and reducer of database_creation.
+
+Run this tests like this:
+nosetests --with-gae --without-sandbox tests/database_creation_test.py
+"""
+
+import unittest
+
+from google.appengine.ext import ndb
+from google.appengine.ext import testbed
+from mapreduce import operation as op
+
+from auxiliary import database_creation
+from auxiliary.preprocessing import get_line_ordinal
+from models.character import Character
+from models.line import Line
+from models.word import Word
+from models.word_summary import WordSummary
+
+
+class _Spec(object):
+    """Stand-in of the mapreduce spec of a job, with its mapper params."""
+
+    def __init__(self, params):
+        self.mapreduce_spec = self
+        self.mapper = self
+        self.params = params
+
+
+# Disable Too many public methods warning
+# pylint: disable=R0904
+class IndexMapTest(unittest.TestCase):
+    """Tests for the outputs of the index mappers for a line."""
+
+    def setUp(self):
+        self.testbed = testbed.Testbed()
+        self.testbed.activate()
+        self.testbed.init_datastore_v3_stub()
+        self.testbed.init_memcache_stub()
+
+    def tearDown(self):
+        self.testbed.deactivate()
+
+    def _index_line(self, offset):
+        """Get the line put and the words emitted for a line of Hamlet."""
+        outputs = list(database_creation._index_line('blob', 2, offset,
+            'Thou art death', 'Hamlet', 'Ghost'))
+        puts = [output for output in outputs if isinstance(output,
+            op.db.Put)]
+        self.assertEqual(len(puts), 1)
+        return puts[0].entity, [output for output in outputs
+            if not isinstance(output, op.db.Put)]
+
+    def test_line_keys_are_deterministic(self):
+        line, words = self._index_line(400)
+        retried_line, retried_words = self._index_line(400)
+        self.assertEqual(line.key, ndb.Key(Line, 'blob:2:400'))
+        self.assertEqual(retried_line.key, line.key)
+        self.assertEqual(retried_words, words)
+        self.assertNotEqual(self._index_line(401)[0].key, line.key)
+
+    def test_retried_lines_are_overwritten(self):
+        ndb.put_multi([self._index_line(400)[0], self._index_line(400)[0]])
+        self.assertEqual(Line.query().count(), 1)
+
+    def test_words_are_emitted_with_their_line(self):
+        _, words = self._index_line(400)
+        ordinal = str(get_line_ordinal(2, 400))
+        self.assertEqual(words, [(word, 'Hamlet+Ghost+' + ordinal)
+            for word in ('thou', 'art', 'death')])
+
+
+# Disable Too many public methods warning
+# pylint: disable=R0904
+class IndexReduceTest(unittest.TestCase):
+    """Tests for the reducer of the index job."""
+
+    def setUp(self):
+        self.testbed = testbed.Testbed()
+        self.testbed.activate()
+        self.testbed.init_datastore_v3_stub()
+        self.testbed.init_memcache_stub()
+        self.get_context = database_creation.context.get
+        database_creation.context.get = lambda: _Spec({'corpus': 'blob'})
+        self.put_multi = ndb.put_multi
+        self.batches = []
+        ndb.put_multi = self._put_multi
+
+    def tearDown(self):
+        ndb.put_multi = self.put_multi
+        database_creation.context.get = self.get_context
+        self.testbed.deactivate()
+
+    def _put_multi(self, entities, **options):
+        """Record the batches put by the reducer."""
+        self.batches.append(entities)
+        return self.put_multi(entities, **options)
+
+    def _reduce(self):
+        """Reduce the mentions of death sent by two mapper shards."""
+        first_shard = ['hamlet+ghost+%d' % get_line_ordinal(0, 50),
+            'hamlet+ghost+%d' % get_line_ordinal(0, 50),
+            'macbeth+duncan+%d' % get_line_ordinal(1, 90)]
+        second_shard = ['hamlet+ghost+%d' % get_line_ordinal(0, 30),
+            'hamlet+horatio+%d' % get_line_ordinal(0, 70)]
+        database_creation.index_reduce('death', first_shard + second_shard)
+
+    def test_counts_are_summed_across_shards(self):
+        self._reduce()
+        self.assertEqual(Word.get_by_id('death').count, 5)
+        self.assertEqual(WordSummary.get_by_id('death').get_counts(), (5, {
+            'Hamlet': (4, {'Ghost': 3, 'Horatio': 1}),
+            'Macbeth': (1, {'Duncan': 1})}))
+
+    def test_lines_are_merged_across_shards(self):
+        self._reduce()
+        ghost = Character.get_by_id('Ghost', parent=ndb.Key('Word', 'death',
+            'Work', 'Hamlet'))
+        self.assertEqual(ghost.count, 3)
+        self.assertEqual(ghost.get_ordinals(),
+            [get_line_ordinal(0, 30), get_line_ordinal(0, 50)])
+
+    def test_entities_are_put_in_one_batch(self):
+        self._reduce()
+        self.assertEqual(len(self.batches), 1)
+        self.assertEqual(sorted(entity.key.kind()
+            for entity in self.batches[0]),
+            ['Character', 'Character', 'Character', 'Word', 'WordSummary',
+            'Work', 'Work'])
+
+
+if __name__ == '__main__':
+    unittest.main()
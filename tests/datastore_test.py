@@ -7,6 +7,8 @@ from models.word import Word
 from models.work import Work
 from models.line import Line
 from models.character import Character
+from models.word_summary import WordSummary
+from auxiliary.preprocessing import get_line_ordinal
 
 '''Run this tests like this:
 nosetests --with-gae --without-sandbox tests/datastore_test.py
@@ -85,5 +87,51 @@ class DatastoreTest(unittest.TestCase):
         self.assertEqual("Though yet of Hamlet our dear brother's death", 
             char.mentions[0].get().line)
 
-
-
+    def test_character_postings(self):
+        '''Mentions can be stored as postings and read as strings.'''
+        lines = [(0, 15, 'Though yet of Hamlet our dear brother\'s death'),
+            (2, 400, 'The death of Polonius')]
+        for file_index, offset, text in lines:
+            Line(id=Line.get_key_name('blob', file_index, offset),
+                line=text).put()
+        character = Character(
+            parent=self.work.key, id="Ghost", name="Ghost", count=2)
+        chunks = character.set_postings('blob', [get_line_ordinal(file_index,
+            offset) for file_index, offset, _ in lines])
+        self.assertEqual(chunks, [])
+        character.put()
+
+        retrieved_character = Character.get_by_id("Ghost",
+            parent=self.work.key)
+        self.assertEqual([text for _, _, text in lines],
+            retrieved_character.get_string_mentions())
+
+    def test_character_mention_keys_async(self):
+        '''The keys of the mentions of many characters can be fetched
+        concurrently.'''
+        ghost = Character(parent=self.work.key, id="Ghost", name="Ghost",
+            count=1)
+        ghost.set_postings('blob', [get_line_ordinal(2, 400)])
+        ghost.put()
+        futures = [character.get_mention_keys_async()
+            for character in (self.character, ghost)]
+        self.assertEqual([future.get_result() for future in futures], [
+            self.character.mentions,
+            [ndb.Key(Line, Line.get_key_name('blob', 2, 400))]])
+
+    def test_word_summary(self):
+        '''The counts of a word are kept in a single entity.'''
+        works = {'Hamlet': (2, {'Claudius': 1, 'Ghost': 1}),
+            'Macbeth': (1, {'Macbeth': 1})}
+        WordSummary.create('death', works).put()
+        self.assertEqual(WordSummary.get_by_id('death').get_counts(),
+            (3, works))
+
+    def test_word_summary_is_built_from_old_entities(self):
+        '''Words indexed without summary get one from their works and
+        characters.'''
+        self.assertIsNone(WordSummary.get_by_id('death'))
+        self.assertEqual(WordSummary.get_or_build('death').get_counts(),
+            (2, {'Hamlet': (1, {'Claudius': 1})}))
+        self.assertIsNotNone(WordSummary.get_by_id('death'))
+        self.assertIsNone(WordSummary.get_or_build('sdfgfdgdgf'))
@@ -1,5 +1,7 @@
 import webtest
 from controllers.define_page import DefinePageController
+from controllers.define_page import DefinitionBatchHandler
+from resources.constants import Constants
 import unittest
 import  webapp2
 
@@ -13,7 +15,8 @@ class DefinePageControllerTest(unittest.TestCase):
 
     def setUp(self):
         """Create the dummy webapp"""
-        app = webapp2.WSGIApplication([('/define', DefinePageController)])
+        app = webapp2.WSGIApplication([('/define', DefinePageController),
+            ('/define/batch', DefinitionBatchHandler)])
         self.testapp = webtest.TestApp(app)
 
     def test_get_definition(self):
@@ -31,3 +34,20 @@ class DefinePageControllerTest(unittest.TestCase):
         self.assertEqual(response.normal_body,
             'Word not found in the dictionary')
         self.assertEqual(response.content_type, 'text/plain')
+
+    def test_batch_definitions(self):
+        """Define several words in a single call"""
+        response = self.testapp.post('/define/batch',
+            {'terms': ['Friend', 'asts', 'friend']})
+        self.assertEqual(response.status_int, 200)
+        self.assertEqual(response.json, {
+            'friend': [
+                'a person you know well and regard with affection and trust',
+                'an associate who provides cooperation or assistance'],
+            'asts': []})
+
+    def test_batch_too_many_terms(self):
+        """Ask for more words than a single call can define"""
+        response = self.testapp.get('/define/batch', {'terms': ['word'] *
+            (Constants.DEFINITION_BATCH_SIZE + 1)}, expect_errors=True)
+        self.assertEqual(response.status_int, 400)
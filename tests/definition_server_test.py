@@ -0,0 +1,62 @@
+"""Tests for the local stand-in of the definition service.
+
+Run this tests like this:
+nosetests tests/definition_server_test.py
+"""
+
+import json
+import threading
+import unittest
+import urllib2
+
+from auxiliary.definition_server import DEFINE_PATH
+from auxiliary.definition_server import DefinitionServer
+
+
+# Disable Too many public methods warning
+# pylint: disable=R0904
+class DefinitionServerTest(unittest.TestCase):
+    """Tests for the local stand-in of the definition service."""
+
+    def setUp(self):
+        self.server = DefinitionServer(('localhost', 0),
+            {'love': ['a strong positive emotion']})
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _define(self, term, path=DEFINE_PATH):
+        """Call the define method of the server for a term."""
+        request = urllib2.Request('http://localhost:%d%s' % (
+            self.server.server_address[1], path),
+            json.dumps({'term': term}),
+            {'Content-Type': 'application/json'})
+        return json.loads(urllib2.urlopen(request).read())['definition']
+
+    def test_define(self):
+        self.assertEqual(self._define('Love'), ['a strong positive emotion'])
+        self.assertEqual(self.server.calls, 1)
+
+    def test_unknown_word(self):
+        self.assertEqual(self._define('gorbellied'), [])
+
+    def test_unknown_path(self):
+        with self.assertRaises(urllib2.HTTPError) as context:
+            self._define('love', '/other.define')
+        self.assertEqual(context.exception.code, 404)
+        self.assertEqual(self.server.calls, 0)
+
+    def test_failure_rate(self):
+        self.server.failure_rate = 1
+        with self.assertRaises(urllib2.HTTPError) as context:
+            self._define('love')
+        self.assertEqual(context.exception.code, 503)
+        self.assertEqual(self.server.calls, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
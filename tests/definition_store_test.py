@@ -0,0 +1,142 @@
+"""Tests for the cached definitions of words.
+
+Run this tests like this:
+nosetests --with-gae --without-sandbox tests/definition_store_test.py
+"""
+
+import threading
+import unittest
+
+from google.appengine.api import datastore_errors
+from google.appengine.ext import ndb
+from google.appengine.ext import testbed
+
+from auxiliary import definition_store
+from auxiliary.lru_cache import LRUCache
+from models.definition import Definition
+
+
+# Disable Too many public methods warning
+# pylint: disable=R0904
+class DefinitionStoreTest(unittest.TestCase):
+    """Tests for the cached definitions of words."""
+
+    def setUp(self):
+        self.testbed = testbed.Testbed()
+        self.testbed.activate()
+        self.testbed.init_datastore_v3_stub()
+        self.testbed.init_memcache_stub()
+        ndb.get_context().clear_cache()
+        definition_store._local = LRUCache(16)
+        self.remote_calls = []
+        self.remote_answer = threading.Event()
+        self.remote_answer.set()
+        self.remote_definitions = {'love': ['a strong positive emotion']}
+        self.define_remote_async = definition_store._define_remote_async
+        definition_store._define_remote_async = self._define_remote_async
+
+    def tearDown(self):
+        definition_store._define_remote_async = self.define_remote_async
+        self.testbed.deactivate()
+
+    @ndb.tasklet
+    def _define_remote_async(self, term):
+        """Stand-in of the definition service."""
+        self.remote_calls.append(term)
+        yield ndb.sleep(0)
+        while not self.remote_answer.is_set():
+            yield ndb.sleep(0.01)
+        if self.remote_definitions is None:
+            raise ndb.Return(None)
+        raise ndb.Return(self.remote_definitions.get(term, []))
+
+    def test_remote_definitions_are_stored(self):
+        self.assertEqual(definition_store.get_definitions(' Love '),
+            ['a strong positive emotion'])
+        self.assertEqual(Definition.get_by_id('love').definitions,
+            ['a strong positive emotion'])
+        self.assertEqual(definition_store.get_definitions('love'),
+            ['a strong positive emotion'])
+        self.assertEqual(self.remote_calls, ['love'])
+        self.assertEqual(definition_store.get_stats()['hits'], 1)
+
+    def test_datastore_definitions(self):
+        Definition(id='king', definitions=['a male sovereign']).put()
+        self.assertEqual(definition_store.get_definitions('King'),
+            ['a male sovereign'])
+        self.assertEqual(self.remote_calls, [])
+
+    def test_unknown_word_is_stored(self):
+        self.assertEqual(definition_store.get_definitions('gorbellied'), [])
+        self.assertEqual(definition_store.get_definitions('gorbellied'), [])
+        self.assertEqual(self.remote_calls, ['gorbellied'])
+
+    def test_failures_are_not_stored(self):
+        self.remote_definitions = None
+        self.assertIsNone(definition_store.get_definitions('love'))
+        self.assertIsNone(Definition.get_by_id('love'))
+        self.remote_definitions = {'love': ['a strong positive emotion']}
+        self.assertEqual(definition_store.get_definitions('love'),
+            ['a strong positive emotion'])
+        self.assertEqual(self.remote_calls, ['love', 'love'])
+
+    def test_datastore_failures_are_not_raised(self):
+        def fail_async(*_, **__):
+            """Stand-in of a datastore call that times out."""
+            future = ndb.Future()
+            future.set_exception(datastore_errors.Timeout())
+            return future
+        Definition.get_by_id_async = staticmethod(fail_async)
+        Definition.put_async = fail_async
+        try:
+            self.assertEqual(definition_store.get_many_definitions(
+                ['love', 'gorbellied']),
+                {'love': ['a strong positive emotion'], 'gorbellied': []})
+        finally:
+            del Definition.get_by_id_async
+            del Definition.put_async
+        self.assertIsNone(Definition.get_by_id('love'))
+
+    def test_concurrent_lookups_share_a_call(self):
+        futures = [definition_store.get_definitions_async(term)
+            for term in ('love', 'LOVE', 'death')]
+        self.assertEqual([future.get_result() for future in futures],
+            [['a strong positive emotion'], ['a strong positive emotion'],
+            []])
+        self.assertEqual(sorted(self.remote_calls), ['death', 'love'])
+
+    def test_lookups_of_other_threads_share_a_call(self):
+        self.remote_answer.clear()
+        results = []
+        thread = threading.Thread(target=lambda: results.append(
+            definition_store.get_definitions('love')))
+        thread.start()
+        future = definition_store.get_definitions_async('Love')
+        self.remote_answer.set()
+        thread.join()
+        self.assertEqual(future.get_result(), ['a strong positive emotion'])
+        self.assertEqual(results, [['a strong positive emotion']])
+        self.assertEqual(self.remote_calls, ['love'])
+
+    def test_get_many_definitions(self):
+        Definition(id='king', definitions=['a male sovereign']).put()
+        self.assertEqual(definition_store.get_many_definitions(
+            ['Love', 'king', 'love', '', 'gorbellied']),
+            {'love': ['a strong positive emotion'],
+            'king': ['a male sovereign'], 'gorbellied': []})
+        self.assertEqual(sorted(self.remote_calls), ['gorbellied', 'love'])
+
+    def test_empty_term(self):
+        self.assertEqual(definition_store.get_definitions('  '), [])
+        self.assertEqual(self.remote_calls, [])
+
+    def test_long_term(self):
+        term = 'a' * (definition_store.MAX_TERM_BYTES + 1)
+        self.assertEqual(definition_store.get_definitions(term), [])
+        self.assertEqual(definition_store.get_many_definitions([term]),
+            {term: []})
+        self.assertEqual(self.remote_calls, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -146,5 +146,22 @@ class RegexGeneration(unittest.TestCase):
             '\\b\\b')
 
 
+class SpansTest(unittest.TestCase):
+
+    def test_spans(self):
+        self.assertEqual(formatter.apply_tag_to_spans('tag',
+            'To be, or not to be', [(0, 2), (14, 16)]),
+            '<tag>To</tag> be, or not <tag>to</tag> be')
+
+    def test_no_spans(self):
+        self.assertEqual(formatter.apply_tag_to_spans('tag', 'To be', []),
+            'To be')
+
+    def test_page(self):
+        self.assertEqual(formatter.apply_tag_to_page('tag',
+            ['To be', 'or not'], [[(3, 5)], [(0, 2)]]),
+            ['To <tag>be</tag>', '<tag>or</tag> not'])
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,85 @@
+"""Tests for the offline index builder.
+
+Run this tests like this:
+nosetests tests/index_builder_test.py
+"""
+
+import json
+import unittest
+
+from auxiliary import index_builder
+from auxiliary.preprocessing import get_line_ordinal
+from auxiliary.preprocessing import split_line_ordinal
+
+_PLAY = '''\tJORGE
+\tJORGE
+
+ANA\tJorge, Jorge!
+\tSo long, Jorge.
+
+BEATRIZ\tGood night, Ana.
+'''
+
+_POEM = '''\tA LOVER'S COMPLAINT
+
+FROM off a hill whose concave womb reworded
+'''
+
+
+# Disable Too many public methods warning
+# pylint: disable=R0904
+class IndexBuilderTest(unittest.TestCase):
+    """Tests for the offline index builder."""
+
+    def test_line_ordinals(self):
+        ordinal = get_line_ordinal(3, 1221)
+        self.assertEqual(split_line_ordinal(ordinal), (3, 1221))
+        self.assertTrue(get_line_ordinal(2, 90000) < ordinal)
+
+    def test_index_work(self):
+        file_index, title, lines, postings, scenes = index_builder.index_work(
+            (2, _PLAY))
+        self.assertEqual(file_index, 2)
+        self.assertEqual(title, 'Jorge')
+        self.assertEqual([offset for offset, _, _ in lines],
+            [0, 7, 15, 33, 51])
+        self.assertEqual(lines[2], (15, 'ANA\tJorge, Jorge!', 'Ana'))
+        self.assertEqual(postings['jorge']['Ana'],
+            [3, [get_line_ordinal(2, 15), get_line_ordinal(2, 33)]])
+        self.assertEqual(postings['ana']['Beatriz'],
+            [1, [get_line_ordinal(2, 51)]])
+        self.assertEqual(scenes, [])
+
+    def test_index_poem(self):
+        _, title, _, postings, scenes = index_builder.index_work((0, _POEM))
+        self.assertEqual(title, 'A Lover\'s Complaint')
+        self.assertEqual(postings['hill'],
+            {'': [1, [get_line_ordinal(0, 22)]]})
+        self.assertEqual(scenes, [])
+
+    def test_build_index(self):
+        index = index_builder.build_index([(0, _POEM), (1, _PLAY)], 1)
+        self.assertEqual(index.titles, {0: 'A Lover\'s Complaint', 1: 'Jorge'})
+        self.assertEqual(len(index.lines), 7)
+        self.assertEqual(index.get_word_count('jorge'), 5)
+        self.assertEqual(sorted(index.words['jorge']['Jorge'].keys()),
+            ['Ana', 'Epilog'])
+
+    def test_records(self):
+        index = index_builder.build_index([(0, _POEM)], 1)
+        records = [json.loads(record) for record in
+            index_builder.get_records(index)]
+        self.assertEqual(records[0], {'line': [0, 0, '\tA LOVER\'S COMPLAINT']})
+        self.assertIn({'word': 'hill', 'count': 1,
+            'works': [['A Lover\'s Complaint', 1,
+                [['', 1, [get_line_ordinal(0, 22)]]]]]}, records)
+
+    def test_is_index_file(self):
+        self.assertTrue(index_builder.is_index_file(
+            ['index-00000.jsonl', 'index-00001.jsonl']))
+        self.assertFalse(index_builder.is_index_file(['hamlet']))
+        self.assertFalse(index_builder.is_index_file([]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,290 @@
+"""Tests for the read-only binary index.
+
+Run this tests like this:
+nosetests tests/index_file_test.py
+"""
+
+import multiprocessing
+import os
+import unittest
+
+from auxiliary import analyzer
+from auxiliary import index_builder
+from auxiliary import index_file
+from index_fixture import IndexFileCase
+
+_HAMLET = '''\tHAMLET
+\tHAMLET
+
+BERNARDO\tWho's there?
+
+FRANCISCO\tNay, answer me: stand, and unfold yourself.
+\tStand, I say.
+
+BERNARDO\tLong live the king!
+'''
+
+_MACBETH = '''\tMACBETH
+\tMACBETH
+
+DUNCAN\tWhat bloody man is that? He can report,
+\tAs seemeth by his plight, of the revolt.
+
+MALCOLM\tThis is the sergeant. Stand!
+'''
+
+_OTHELLO = '''\tOTHELLO
+\tOTHELLO
+
+
+ACT I
+
+SCENE I\tVenice. A street.
+
+\t[Enter RODERIGO and IAGO]
+
+RODERIGO\tTush! never tell me; I take it much unkindly.
+\tThou told'st me thou didst hold him in thy hate.
+
+IAGO\tDespise me, if I do not.
+
+SCENE II\tAnother street.
+
+OTHELLO\tLet him do his spite.
+
+ACT II
+
+SCENE I\tA Sea-port in Cyprus.
+
+MONTANO\tWhat from the cape can you discern at sea?
+'''
+
+
+# Disable Too many public methods warning
+# pylint: disable=R0904
+class IndexFileTest(IndexFileCase):
+    """Tests for the read-only binary index."""
+
+    works = [(0, _HAMLET), (1, _MACBETH)]
+
+    def get_mentions(self, word, work_title=None, char_name=None):
+        """Get all the mentions of a word and its count."""
+        mentions, _, _, _, count = self.index.get_mention_page(word,
+            work_title, char_name)
+        return mentions, count
+
+    def test_get_mentions(self):
+        mentions, count = self.get_mentions('stand')
+        self.assertEqual(count, 3)
+        self.assertEqual(mentions, {
+            'Hamlet': {'Francisco': [
+                'FRANCISCO\tNay, answer me: stand, and unfold yourself.',
+                '\tStand, I say.']},
+            'Macbeth': {'Malcolm': ['MALCOLM\tThis is the sergeant. Stand!']}})
+
+    def test_get_mentions_by_work_and_character(self):
+        mentions, count = self.get_mentions('the', 'Macbeth')
+        self.assertEqual(count, 2)
+        self.assertEqual(sorted(mentions['Macbeth'].keys()),
+            ['Duncan', 'Malcolm'])
+        mentions, count = self.get_mentions('the', 'Macbeth', 'Malcolm')
+        self.assertEqual(count, 1)
+        self.assertEqual(mentions,
+            {'Macbeth': {'Malcolm': ['MALCOLM\tThis is the sergeant. Stand!']}})
+
+    def test_unknown_word(self):
+        self.assertEqual(self.get_mentions(u'zounds'), ({}, 0))
+        self.assertEqual(self.index.get_works('zounds'), [])
+
+    def test_get_works_and_characters(self):
+        self.assertEqual(self.index.get_works('the'), ['Hamlet', 'Macbeth'])
+        self.assertEqual(self.index.get_characters('the', 'Macbeth'),
+            ['Duncan', 'Malcolm'])
+
+    def test_get_counts(self):
+        self.assertEqual(self.index.get_counts('the'), (3, {
+            'Hamlet': (1, {'Bernardo': 1}),
+            'Macbeth': (2, {'Duncan': 1, 'Malcolm': 1})}))
+
+    def test_get_positions(self):
+        self.assertEqual(self.index.get_positions('stand'),
+            [(3, [4]), (4, [0]), (10, [5])])
+
+    def test_iter_offsets(self):
+        self.assertEqual(list(self.index.iter_offsets('stand')),
+            [(3, 1, [26]), (4, 1, [1]), (10, 1, [30])])
+        self.assertEqual(self.index.get_postings('stand'),
+            [(3, 1), (4, 1), (10, 1)])
+
+    def test_get_terms(self):
+        terms = self.index.get_terms()
+        self.assertEqual(terms, sorted(terms))
+        self.assertIn('stand', terms)
+        self.assertEqual(len(terms), len(set(terms)))
+
+    def test_trigrams(self):
+        self.assertEqual(index_file.get_trigrams('Stand!'),
+            set(['sta', 'tan', 'and', 'nd!']))
+        self.assertEqual(self.index.get_trigram_line_ids('sta'), [3, 4, 10])
+        self.assertEqual(self.index.get_trigram_frequency('sta'), 3)
+        self.assertEqual(self.index.get_trigram_line_ids('zzz'), [])
+        self.assertEqual(self.index.get_trigram_frequency('zzz'), 0)
+
+    def test_get_phrase_span_mentions(self):
+        mentions, spans, count = self.index.get_phrase_span_mentions(['the',
+            'king'])
+        self.assertEqual(count, 1)
+        self.assertEqual(mentions,
+            {'Hamlet': {'Bernardo': ['BERNARDO\tLong live the king!']}})
+        self.assertEqual(spans, {'Hamlet': {'Bernardo': [[(19, 27)]]}})
+        self.assertEqual(self.index.get_phrase_span_mentions(['king', 'the']),
+            ({}, {}, 0))
+
+    def test_get_phrase_span_mentions_by_work(self):
+        mentions, _, count = self.index.get_phrase_span_mentions(['stand',
+            'i'], 'Hamlet')
+        self.assertEqual(count, 1)
+        self.assertEqual(mentions,
+            {'Hamlet': {'Francisco': ['\tStand, I say.']}})
+        self.assertEqual(self.index.get_phrase_span_mentions(['stand', 'i'],
+            'Macbeth'), ({}, {}, 0))
+
+    def test_get_term_spans(self):
+        line_ids = self.index.get_line_ids('stand')
+        spans = self.index.get_term_spans(['stand', 'the'], line_ids)
+        self.assertEqual(sorted(spans), line_ids)
+        line = self.index.get_line(line_ids[-1])
+        self.assertEqual([line[start:end] for start, end in
+            spans[line_ids[-1]]], ['the', 'Stand'])
+        self.assertEqual(self.index.get_term_spans(['zounds'], line_ids), {})
+
+    def test_get_phrase_spans_across_punctuation(self):
+        mentions, spans, count = self.index.get_phrase_span_mentions(
+            ['stand', 'i'])
+        self.assertEqual(count, 1)
+        self.assertEqual(mentions,
+            {'Hamlet': {'Francisco': ['\tStand, I say.']}})
+        self.assertEqual(spans, {'Hamlet': {'Francisco': [[(1, 9)]]}})
+        self.assertEqual(self.index.get_phrase_span_mentions(['i', 'stand']),
+            ({}, {}, 0))
+
+    def test_get_line_span_mentions(self):
+        mentions, spans, count = self.index.get_line_span_mentions(
+            self.index.get_line_ids('stand'), ['stand', 'the'], 'Macbeth')
+        self.assertEqual(count, 1)
+        self.assertEqual(mentions, {'Macbeth': {'Malcolm': [
+            'MALCOLM\tThis is the sergeant. Stand!']}})
+        self.assertEqual(spans,
+            {'Macbeth': {'Malcolm': [[(16, 19), (30, 35)]]}})
+
+    def test_analyzer_is_kept(self):
+        path = os.path.join(self.directory, 'elisions.idx')
+        elisions = analyzer.Analyzer(elisions=True)
+        index_file.write_index_file(index_builder.build_index(
+            [(0, "\tHAMLET\n\nHAMLET\tO'er the hill.\n")], 1, elisions),
+            path)
+        index = index_file.IndexFile.open(path)
+        self.assertEqual(index.analyzer.get_config(), elisions.get_config())
+        self.assertEqual(index.get_postings("o'er"), [(1, 1)])
+        self.assertEqual(self.index.analyzer.get_config(),
+            analyzer.DEFAULT_CONFIG)
+
+    def test_works_encoded_in_parallel(self):
+        serial_path = os.path.join(self.directory, 'serial.idx')
+        parallel_path = os.path.join(self.directory, 'parallel.idx')
+        corpus = index_builder.build_index([(0, _HAMLET), (1, _MACBETH),
+            (2, _OTHELLO)], 1)
+        index_file.write_index_file(corpus, serial_path)
+        pool = multiprocessing.Pool(2)
+        try:
+            index_file.write_index_file(corpus, parallel_path, pool.map)
+        finally:
+            pool.close()
+            pool.join()
+        with open(serial_path, 'rb') as serial, \
+                open(parallel_path, 'rb') as parallel:
+            self.assertEqual(serial.read(), parallel.read())
+
+    def test_get_index_file_is_shared(self):
+        self.assertIs(index_file.get_index_file(self.path),
+            index_file.get_index_file(self.path))
+        self.assertIsNone(index_file.get_index_file(
+            os.path.join(self.directory, 'missing.idx')))
+
+    def test_invalid_file(self):
+        self.assertRaises(ValueError, index_file.IndexFile, 'NOTANIDX' +
+            '\0' * 64)
+
+
+# Disable Too many public methods warning
+# pylint: disable=R0904
+class CitationTest(IndexFileCase):
+    """Tests for the acts, scenes and line numbers of the index."""
+
+    works = [(0, _OTHELLO), (1, _HAMLET)]
+
+    def get_cited_mentions(self, word, work_title=None, char_name=None,
+                           act=None, scene=None):
+        """Get all the mentions of a word, their citations and its count."""
+        mentions, citations, _, _, count = self.index.get_mention_page(word,
+            work_title, char_name, act, scene)
+        return mentions, citations, count
+
+    def test_get_cited_mentions(self):
+        mentions, citations, count = self.get_cited_mentions('me')
+        self.assertEqual(count, 4)
+        self.assertEqual(mentions['Othello']['Roderigo'],
+            ["RODERIGO\tTush! never tell me; I take it much unkindly.",
+            "\tThou told'st me thou didst hold him in thy hate."])
+        self.assertEqual(citations['Othello'], {
+            'Roderigo': [('I', 'I', 1), ('I', 'I', 2)],
+            'Iago': [('I', 'I', 3)]})
+        self.assertEqual(citations['Hamlet'], {'Francisco': [('', '', 4)]})
+
+    def test_filter_by_act_and_scene(self):
+        _, citations, count = self.get_cited_mentions('what', act='II')
+        self.assertEqual(count, 1)
+        self.assertEqual(citations, {'Othello': {'Montano': [('II', 'I', 1)]}})
+        mentions, _, count = self.get_cited_mentions('him', 'Othello',
+            act='I', scene='II')
+        self.assertEqual(count, 1)
+        self.assertEqual(mentions, {'Othello': {'Othello': [
+            'OTHELLO\tLet him do his spite.']}})
+        self.assertEqual(self.get_cited_mentions('me', 'Othello',
+            'Iago', 'I', 'I')[2], 1)
+        self.assertEqual(self.get_cited_mentions('me', scene='II'),
+            ({}, {}, 0))
+
+    def test_line_ranges(self):
+        self.assertIsNone(self.index.get_line_ranges())
+        self.assertEqual(len(self.index.get_line_ranges(act='I')), 2)
+        self.assertEqual(self.index.get_line_ranges('Hamlet', act='I'), [])
+
+    def test_get_mention_page(self):
+        mentions, _, spans, line_counts, count = self.index.get_mention_page(
+            'me', page_size=1)
+        self.assertEqual(count, 4)
+        self.assertEqual(line_counts['Othello'], {'Roderigo': 2, 'Iago': 1})
+        self.assertEqual(mentions['Othello']['Roderigo'],
+            ["RODERIGO\tTush! never tell me; I take it much unkindly."])
+        self.assertEqual(spans['Othello']['Roderigo'], [[(26, 28)]])
+        mentions, citations, _, _, _ = self.index.get_mention_page('me',
+            'Othello', 'Roderigo', start=1, page_size=1)
+        self.assertEqual(mentions, {'Othello': {'Roderigo': [
+            "\tThou told'st me thou didst hold him in thy hate."]}})
+        self.assertEqual(citations, {'Othello': {'Roderigo': [
+            ('I', 'I', 2)]}})
+
+    def test_character_without_work_is_ignored(self):
+        self.assertEqual(
+            self.index.get_mention_page('me', None, 'Roderigo', page_size=1),
+            self.index.get_mention_page('me', page_size=1))
+
+    def test_stage_directions_are_not_numbered(self):
+        _, citations, _ = self.get_cited_mentions('enter')
+        self.assertEqual(citations, {'Othello': {'Stage Directions': [
+            ('I', 'I', 0)]}})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+"""The index file of a small corpus, shared by the tests that read one."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from auxiliary import index_builder
+from auxiliary import index_file
+
+HAMLET = '''\tHAMLET
+\tHAMLET
+
+HAMLET\tThe king is dead, long live the king!
+\tThe queen is dead.
+
+OPHELIA\tThe king and the queen.
+\tLove is not death.
+
+HAMLET\tLove, love, love.
+\tI did love you once, but you were not true to me then.
+
+OPHELIA\tIndeed, my lord, you made me believe so: love.
+\tAnd death.
+
+HAMLET\tThou art a scholar; speak to it, Horatio.
+
+HORATIO\tMost like: it harrows me with fear and wonder.
+
+HAMLET\tWhether 'tis nobler in the mind to suffer.
+\tWhither wilt thou lead me? Thee art I bound to follow.
+'''
+
+
+# Disable Too many public methods warning
+# pylint: disable=R0904
+class IndexFileCase(unittest.TestCase):
+    """Base of the tests that read the index file of a small corpus.
+
+    Attributes:
+        works: the tuples (file index, text) of the works of the corpus, by
+            default HAMLET alone.
+    """
+
+    works = [(0, HAMLET)]
+
+    def setUp(self):
+        """Write the index file of the corpus."""
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, index_file.INDEX_FILENAME)
+        index_file.write_index_file(index_builder.build_index(self.works, 1),
+            self.path)
+        self.index = index_file.IndexFile.open(self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
@@ -0,0 +1,57 @@
+"""Tests for the bounded in-process cache.
+
+Run this tests like this:
+nosetests tests/lru_cache_test.py
+"""
+
+import unittest
+
+from auxiliary.lru_cache import LRUCache
+
+
+# Disable Too many public methods warning
+# pylint: disable=R0904
+class LRUCacheTest(unittest.TestCase):
+    """Tests for the bounded in-process cache."""
+
+    def setUp(self):
+        self.cache = LRUCache(2)
+        self.cache.put('love', 1)
+        self.cache.put('death', 2)
+
+    def test_get(self):
+        self.assertEqual(self.cache.get('love'), 1)
+        self.assertIsNone(self.cache.get('sword'))
+        self.assertEqual(self.cache.get('sword', 0), 0)
+
+    def test_evicts_least_recently_used(self):
+        self.cache.get('love')
+        self.cache.put('sword', 3)
+        self.assertNotIn('death', self.cache)
+        self.assertIn('love', self.cache)
+        self.assertEqual(len(self.cache), 2)
+        self.assertEqual(self.cache.evictions, 1)
+
+    def test_put_existing_key_does_not_evict(self):
+        self.cache.put('love', 4)
+        self.assertEqual(self.cache.get('love'), 4)
+        self.assertEqual(self.cache.evictions, 0)
+
+    def test_stats(self):
+        self.cache.get('love')
+        self.cache.get('sword')
+        self.cache.put('sword', 3)
+        self.assertEqual(self.cache.get_stats(), {'size': 2, 'capacity': 2,
+            'hits': 1, 'misses': 1, 'evictions': 1, 'hit_rate': 0.5})
+
+    def test_clear(self):
+        self.cache.clear()
+        self.assertEqual(len(self.cache), 0)
+        self.assertEqual(self.cache.evictions, 0)
+
+    def test_invalid_capacity(self):
+        self.assertRaises(ValueError, LRUCache, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
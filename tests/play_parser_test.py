@@ -0,0 +1,135 @@
+"""Tests for the structural parser of plays.
+
+Run this tests like this:
+nosetests tests/play_parser_test.py
+"""
+
+import unittest
+
+from auxiliary import play_parser
+from auxiliary.preprocessing import get_characters_lines
+from auxiliary.preprocessing import get_epilog_len
+from auxiliary.preprocessing import get_lines
+
+_PLAY = '''\tJORGE
+
+
+\tDRAMATIS PERSONAE
+
+ANA\ta queen.
+
+\tJORGE
+
+
+ACT I
+
+SCENE I\tA palace.
+
+\t[Enter ANA and BEATRIZ,
+\twith others
+
+ANA\tJorge, Jorge!
+\t[Aside]
+\tSo long, Jorge.
+
+BEATRIZ\tGood night, Ana.
+
+\t[Exeunt]
+
+ACT I
+
+SCENE II\tA garden.
+
+ANA\tGood morrow.
+
+ACT II
+
+SCENE I\tThe palace.
+
+BEATRIZ\tFarewell.
+'''
+
+
+# Disable Too many public methods warning
+# pylint: disable=R0904
+class PlayParserTest(unittest.TestCase):
+    """Tests for the structural parser of plays."""
+
+    def setUp(self):
+        self.play = play_parser.parse_play(_PLAY)
+
+    def get_text(self, start, end):
+        return _PLAY[start:end]
+
+    def test_epilog(self):
+        self.assertEqual(self.play.title, 'JORGE')
+        self.assertEqual(self.play.body_offset, _PLAY.index('ACT I'))
+        self.assertEqual(get_epilog_len('\tA\n\tA x\n\tA \t\n\n B', 'A'), 14)
+        self.assertIsNone(get_epilog_len('\tA\n\tAB\n', 'A'))
+
+    def test_title(self):
+        self.assertEqual(play_parser.parse_play("\tLOVE'S LABOUR'S LOST  \n\n"
+            "\tLOVE'S LABOUR'S LOST\n\nKING\tHi.\n").title,
+            "LOVE'S LABOUR'S LOST")
+
+    def test_lines(self):
+        self.assertEqual(list(get_lines('\tHAMLET\n\nHAMLET\tHi!')),
+            [(0, '\tHAMLET'), (8, ''), (9, 'HAMLET\tHi!')])
+        self.assertEqual(list(get_lines('one\n')), [(0, 'one')])
+
+    def test_acts(self):
+        self.assertEqual([(name, self.get_text(start, end).split('\n')[0])
+            for start, end, name in self.play.acts],
+            [('I', 'ACT I'), ('II', 'ACT II')])
+        self.assertIn('SCENE II', self.get_text(*self.play.acts[0][:2]))
+
+    def test_scenes(self):
+        self.assertEqual([(act, name, self.get_text(start, end).split('\t')[1]
+            .split('\n')[0]) for start, end, act, name in self.play.scenes],
+            [('I', 'I', 'A palace.'), ('I', 'II', 'A garden.'),
+            ('II', 'I', 'The palace.')])
+
+    def test_speeches(self):
+        self.assertEqual([(character, self.get_text(start, end))
+            for start, end, character in self.play.speeches], [
+            ('ANA', 'ANA\tJorge, Jorge!\n\t[Aside]\n\tSo long, Jorge.'),
+            ('BEATRIZ', 'BEATRIZ\tGood night, Ana.'),
+            ('ANA', 'ANA\tGood morrow.'),
+            ('BEATRIZ', 'BEATRIZ\tFarewell.')])
+
+    def test_speech_offsets(self):
+        for start, _, character in self.play.speeches:
+            self.assertEqual(self.play.offset_to_char[start], character)
+        self.assertEqual(set(self.play.offset_to_char.values()),
+            set(['ANA', 'BEATRIZ', play_parser.STAGE_DIRECTIONS]))
+
+    def test_directions(self):
+        self.assertEqual([self.get_text(start, end)
+            for start, end in self.play.directions], [
+            '\t[Enter ANA and BEATRIZ,\n\twith others', '\t[Aside]',
+            '\t[Exeunt]'])
+
+    def test_characters_lines(self):
+        characters = [(line, character) for _, line, character in
+            get_characters_lines(_PLAY, self.play.offset_to_char)]
+        self.assertEqual(characters[0], ('\tJORGE', 'EPILOG'))
+        self.assertIn(('SCENE I\tA palace.', play_parser.STAGE_DIRECTIONS),
+            characters)
+        self.assertIn(('\twith others', play_parser.STAGE_DIRECTIONS),
+            characters)
+        self.assertIn(('\t[Aside]', play_parser.STAGE_DIRECTIONS), characters)
+        self.assertIn(('\tSo long, Jorge.', 'ANA'), characters)
+        self.assertIn(('\t[Exeunt]', play_parser.STAGE_DIRECTIONS),
+            characters)
+
+    def test_poem(self):
+        poem = play_parser.parse_play('\tA LOVER\'S COMPLAINT\n\nFROM off a '
+            'hill whose concave womb reworded\n')
+        self.assertEqual(poem.title, 'A LOVER\'S COMPLAINT')
+        self.assertIsNone(poem.body_offset)
+        self.assertEqual(poem.offset_to_char, {0: ''})
+        self.assertEqual(poem.speeches, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+"""Tests for the encoding of postings lists.
+
+Run this tests like this:
+nosetests tests/postings_test.py
+"""
+
+import unittest
+
+from auxiliary import postings
+from auxiliary.preprocessing import get_line_ordinal
+
+
+# Disable Too many public methods warning
+# pylint: disable=R0904
+class PostingsTest(unittest.TestCase):
+    """Tests for the encoding of postings lists."""
+
+    ordinals = [get_line_ordinal(0, 22), get_line_ordinal(0, 150),
+        get_line_ordinal(0, 151), get_line_ordinal(3, 0),
+        get_line_ordinal(41, 4000000)]
+
+    def test_encode_and_decode(self):
+        data = postings.encode_postings(self.ordinals)
+        self.assertEqual(postings.decode_postings(data), self.ordinals)
+
+    def test_small_differences_take_one_byte(self):
+        self.assertEqual(len(postings.encode_postings([1, 2, 129])), 3)
+        self.assertEqual(len(postings.encode_postings([1, 2, 130])), 4)
+
+    def test_empty_list(self):
+        self.assertEqual(postings.encode_postings([]), '')
+        self.assertEqual(postings.decode_postings(''), [])
+        self.assertEqual(postings.encode_chunks([]), [''])
+
+    def test_decoding_is_lazy(self):
+        ordinals = postings.iter_postings(
+            postings.encode_postings(self.ordinals))
+        self.assertEqual(next(ordinals), self.ordinals[0])
+        self.assertEqual(next(ordinals), self.ordinals[1])
+
+    def test_chunks(self):
+        chunks = postings.encode_chunks(self.ordinals, chunk_size=2)
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual(postings.decode_postings(chunks[1]),
+            self.ordinals[2:4])
+        self.assertEqual([ordinal for chunk in chunks
+            for ordinal in postings.decode_postings(chunk)], self.ordinals)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,7 @@
 import unittest
 
 from auxiliary import database_creation
+from mapreduce import context
 import os
 
 class CaseInstance(object):
@@ -417,26 +418,11 @@ DUNCAN	What bloody man is that? He can report,
 
 ]
 
-    def test_find_title(self):
-        for case_instance in self.case_instances:
-            title = database_creation.find_title(case_instance.text)
-            self.assertEquals(title, case_instance.title,
-                'Failed index ' + case_instance.title)
-
     def test_titlecase(self):
         for case_instance in self.case_instances:
             formatted_title = database_creation.titlecase(case_instance.title)
             self.assertEquals(formatted_title, case_instance.formatted_title)
 
-    def test_get_speaks_offsets(self):
-        for case_instance in self.case_instances:
-            speaks_offsets = database_creation.get_speaks_offsets(case_instance.
-                text[case_instance.body_index:],case_instance.body_index)
-            print speaks_offsets
-            print '**************************************'
-            print case_instance.speaks_offsets
-            self.assertEquals(speaks_offsets, case_instance.speaks_offsets)
-
     def test_get_character_in_epilog(self):
         for case_instance in self.case_instances:
             speaks_offsets_str = {str(key): value for key, value in case_instance.speaks_offsets.iteritems()}
@@ -488,6 +474,64 @@ DUNCAN	What bloody man is that? He can report,
             test_case.sorted_offsets, 1510)
         self.assertEquals('ALL', char)
 
+    def test_load_metadata(self):
+        data = ('0+{"title": "HAMLET", "pos_to_char": {"1221": "BERNARDO"}, '
+            '"sorted_offsets": [1221]}\n'
+            '3+{"title": "A LOVER\'S COMPLAINT", "pos_to_char": {"0": ""}, '
+            '"sorted_offsets": [0]}\n')
+        metadata = database_creation.load_metadata(data)
+        self.assertEquals(sorted(metadata.keys()), [0, 3])
+        self.assertEquals(metadata[0]['title'], 'HAMLET')
+        self.assertEquals(metadata[0]['sorted_offsets'], [1221])
+        self.assertEquals(database_creation.get_character(
+            metadata[0]['pos_to_char'], metadata[0]['sorted_offsets'], 1300),
+            'BERNARDO')
+
+    def _get_broadcast_cache(self, size=context.BROADCAST_CACHE_SIZE):
+        """Get an empty broadcast cache that counts the inputs it loads."""
+        cache = context._BroadcastCache(size)
+        cache.loads = []
+        def load(spec):
+            cache.loads.append(spec['value'])
+            return spec['value']
+        cache._load = load
+        return cache
+
+    def test_broadcast_is_loaded_once(self):
+        cache = self._get_broadcast_cache()
+        spec = context.broadcast_spec(value={'hamlet.txt': 0})
+        self.assertIn('version', spec)
+        self.assertEquals(cache.get('filename_to_ind', spec),
+            {'hamlet.txt': 0})
+        self.assertEquals(cache.get('filename_to_ind', spec),
+            {'hamlet.txt': 0})
+        self.assertEquals(cache.loads, [{'hamlet.txt': 0}])
+
+    def test_broadcast_version_is_kept_in_the_spec(self):
+        cache = self._get_broadcast_cache()
+        spec = {'value': [1, 2]}
+        cache.get('numbers', spec)
+        self.assertEquals(spec['version'],
+            context.broadcast_spec(value=[1, 2])['version'])
+
+    def test_broadcast_of_concurrent_jobs(self):
+        cache = self._get_broadcast_cache()
+        first = context.broadcast_spec(value='first job')
+        second = context.broadcast_spec(value='second job')
+        for _ in range(3):
+            self.assertEquals(cache.get('metadata', first), 'first job')
+            self.assertEquals(cache.get('metadata', second), 'second job')
+        self.assertEquals(cache.loads, ['first job', 'second job'])
+
+    def test_broadcast_cache_is_bounded(self):
+        cache = self._get_broadcast_cache(2)
+        specs = [context.broadcast_spec(value=number)
+            for number in range(3)]
+        for spec in specs + specs[2:]:
+            cache.get('numbers', spec)
+        cache.get('numbers', specs[0])
+        self.assertEquals(cache.loads, [0, 1, 2, 0])
+
 
 if __name__ == '__main__':
     unittest.main()
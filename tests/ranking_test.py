@@ -0,0 +1,51 @@
+"""Tests for the ranked search.
+
+Run this tests like this:
+nosetests tests/ranking_test.py
+"""
+
+import unittest
+
+from auxiliary import ranking
+from index_fixture import IndexFileCase
+
+
+# Disable Too many public methods warning
+# pylint: disable=R0904
+class RankingTest(IndexFileCase):
+    """Tests for the ranked search."""
+
+    def test_rarer_words_score_more(self):
+        self.assertTrue(ranking.get_idf(100, 1) > ranking.get_idf(100, 50))
+
+    def test_shorter_lines_score_more(self):
+        self.assertTrue(ranking.get_score(1.0, 1, 4, 10.0) >
+            ranking.get_score(1.0, 1, 20, 10.0))
+
+    def test_line_lengths(self):
+        self.assertEqual(self.index.get_line_length(6), 4)
+        self.assertEqual(self.index.get_line_count(), 14)
+
+    def test_top_lines(self):
+        lines = [line_id for _, line_id in
+            ranking.get_top_lines(self.index, ['love'])]
+        self.assertEqual(lines, [6, 5, 8, 7])
+
+    def test_top_is_bounded(self):
+        top = ranking.get_top_lines(self.index, ['love', 'death'], 2)
+        self.assertEqual([line_id for _, line_id in top], [5, 9])
+        self.assertTrue(top[0][0] > top[1][0])
+
+    def test_filters(self):
+        top = ranking.get_top_lines(self.index, ['love'], 10, 'Hamlet',
+            'Ophelia')
+        self.assertEqual([line_id for _, line_id in top], [5, 8])
+        self.assertEqual(ranking.get_top_lines(self.index, ['love'], 10,
+            'Macbeth'), [])
+
+    def test_unknown_words(self):
+        self.assertEqual(ranking.get_top_lines(self.index, ['zounds']), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+"""Tests for the regex searches over the text of the lines.
+
+Run this tests like this:
+nosetests tests/regex_search_test.py
+"""
+
+import unittest
+
+from auxiliary import regex_search
+from index_fixture import IndexFileCase
+
+
+# Disable Too many public methods warning
+# pylint: disable=R0904
+class PlanTest(unittest.TestCase):
+    """Tests for the compilation of regexes into trigram plans."""
+
+    def get_plan(self, regex):
+        return regex_search.compile_regex(regex)[1]
+
+    def test_literal(self):
+        self.assertEqual(self.get_plan('Love'),
+            ('and', (('term', 'lov'), ('term', 'ove'))))
+
+    def test_alternation(self):
+        self.assertEqual(self.get_plan(r'th(ee|ou)\s+art'),
+            ('and', (('or', (('and', (('term', 'hou'), ('term', 'tho'))),
+            ('and', (('term', 'hee'), ('term', 'the'))))), ('term', 'art'))))
+
+    def test_character_class(self):
+        self.assertEqual(self.get_plan('[Ll]ove'), self.get_plan('love'))
+
+    def test_optional_parts_are_ignored(self):
+        self.assertEqual(self.get_plan('kings?'), self.get_plan('king'))
+        self.assertEqual(self.get_plan('a(bc)*def'), self.get_plan('def'))
+
+    def test_no_literal_string(self):
+        self.assertEqual(self.get_plan(r'\w+ \w+'), regex_search.ALL)
+        self.assertEqual(self.get_plan('ab|cde'), regex_search.ALL)
+
+    def test_invalid_regex(self):
+        self.assertRaises(ValueError, regex_search.compile_regex, 'th(ee')
+
+
+# Disable Too many public methods warning
+# pylint: disable=R0904
+class SearchTest(IndexFileCase):
+    """Tests for the regex searches over an index file."""
+
+    def search(self, regex):
+        compiled, plan = regex_search.compile_regex(regex)
+        return [self.index.get_line(line_id) for line_id in
+            regex_search.search(compiled, plan, self.index)]
+
+    def test_search(self):
+        self.assertEqual(self.search(r'(?i)th(ee|ou)\s+art'), [
+            'HAMLET\tThou art a scholar; speak to it, Horatio.',
+            '\tWhither wilt thou lead me? Thee art I bound to follow.'])
+        self.assertEqual(self.search(r'th(ee|ou)\s+art'), [])
+
+    def test_search_single_letter(self):
+        self.assertEqual(self.search(r'\bWh.ther\b'), [
+            'HAMLET\tWhether \'tis nobler in the mind to suffer.',
+            '\tWhither wilt thou lead me? Thee art I bound to follow.'])
+
+    def test_candidates(self):
+        compiled, plan = regex_search.compile_regex('harrows?')
+        self.assertEqual(regex_search.get_candidate_line_ids(plan,
+            self.index), [11])
+        self.assertEqual(regex_search.search(compiled, plan, self.index,
+            [10, 11]), [11])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+"""Tests for the two-tier cache of search results.
+
+Run this tests like this:
+nosetests --with-gae --without-sandbox tests/result_cache_test.py
+"""
+
+import unittest
+
+from google.appengine.api import memcache
+from google.appengine.ext import testbed
+
+from auxiliary import result_cache
+
+
+# Disable Too many public methods warning
+# pylint: disable=R0904
+class ResultCacheTest(unittest.TestCase):
+    """Tests for the two-tier cache of search results."""
+
+    def setUp(self):
+        self.testbed = testbed.Testbed()
+        self.testbed.activate()
+        self.testbed.init_memcache_stub()
+        result_cache._local_generation = (None, 0)
+        self.generation_ttl = result_cache._GENERATION_TTL
+        self.cache = result_cache.ResultCache('test')
+
+    def tearDown(self):
+        result_cache._GENERATION_TTL = self.generation_ttl
+        self.testbed.deactivate()
+
+    def test_get_and_set(self):
+        self.assertIsNone(self.cache.get(('love', None)))
+        self.cache.set(('love', None), {'number_results': 3})
+        self.assertEqual(self.cache.get(('love', None)),
+            {'number_results': 3})
+
+    def test_shared_tier(self):
+        self.cache.set(('love', None), {'number_results': 3})
+        other = result_cache.ResultCache('test')
+        self.assertEqual(other.get(('love', None)), {'number_results': 3})
+        self.assertEqual(other.get(('love', None)), {'number_results': 3})
+        stats = other.get_stats()
+        self.assertEqual((stats['hits'], stats['shared_hits']), (1, 1))
+        self.assertEqual(stats['total_hit_rate'], 1.0)
+
+    def test_bump_generation_invalidates(self):
+        self.cache.set(('love', None), {'number_results': 3})
+        generation = result_cache.get_generation()
+        result_cache.bump_generation()
+        self.assertGreater(result_cache.get_generation(), generation)
+        self.assertIsNone(self.cache.get(('love', None)))
+
+    def test_large_result_is_only_local(self):
+        result = {'lines': 'x' * (memcache.MAX_VALUE_SIZE + 1)}
+        self.cache.set(('the', 100), result)
+        self.assertEqual(self.cache.get(('the', 100)), result)
+        other = result_cache.ResultCache('test')
+        self.assertIsNone(other.get(('the', 100)))
+
+    def test_generation_is_read_once_per_ttl(self):
+        self.cache.set(('love', None), {'number_results': 3})
+        memcache.incr(result_cache._GENERATION_KEY)
+        self.assertEqual(self.cache.get(('love', None)),
+            {'number_results': 3})
+        result_cache._GENERATION_TTL = 0
+        self.assertIsNone(self.cache.get(('love', None)))
+
+
+if __name__ == '__main__':
+    unittest.main()
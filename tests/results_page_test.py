@@ -0,0 +1,106 @@
+"""Tests for the searches of the results page over the datastore.
+
+Run this tests like this:
+nosetests --with-gae --without-sandbox tests/results_page_test.py
+"""
+
+import unittest
+
+from google.appengine.ext import testbed
+
+from auxiliary import boolean_query
+from controllers import results_page
+from index_fixture import IndexFileCase
+from models.character import Character
+from models.line import Line
+from models.word import Word
+from models.work import Work
+
+
+# Disable Too many public methods warning
+# pylint: disable=R0904
+class DatastoreMentionsTest(unittest.TestCase):
+    """Tests for the mentions of a word read from the datastore."""
+
+    def setUp(self):
+        self.testbed = testbed.Testbed()
+        self.testbed.activate()
+        self.testbed.init_datastore_v3_stub()
+        self.testbed.init_memcache_stub()
+
+        word = Word(id='death', name='death', count=3)
+        word.put()
+        lines = {
+            ('Hamlet', 'Ghost'): 'The death of thy father',
+            ('Hamlet', 'Claudius'): 'Our dear brother\'s death',
+            ('Macbeth', 'Ghost'): 'Death and nature do contend',
+        }
+        for title in ('Hamlet', 'Macbeth'):
+            Work(parent=word.key, id=title, title=title,
+                count=len([key for key in lines if key[0] == title])).put()
+        for (title, name), text in lines.iteritems():
+            character = Character(parent=Work(parent=word.key, id=title).key,
+                id=name, name=name, count=1)
+            character.mentions = [Line(line=text).put()]
+            character.put()
+
+    def tearDown(self):
+        self.testbed.deactivate()
+
+    def _get_mentions(self, work_title=None, char_name=None):
+        """Get the mentions of death, without their counts."""
+        return results_page._get_datastore_mentions_async('death',
+            work_title, char_name).get_result()[0]
+
+    def test_character_of_a_work(self):
+        mentions = self._get_mentions('Hamlet', 'Ghost')
+        self.assertEqual(mentions.keys(), ['Hamlet'])
+        self.assertEqual(mentions['Hamlet'].keys(), ['Ghost'])
+
+    def test_character_without_work_is_ignored(self):
+        self.assertEqual(self._get_mentions(None, 'Ghost'),
+            self._get_mentions())
+        self.assertEqual(sorted(self._get_mentions(None, 'Ghost')),
+            ['Hamlet', 'Macbeth'])
+
+    def test_unknown_word(self):
+        self.assertEqual(results_page._get_datastore_mentions_async(
+            'gorbellied', None, 'Ghost').get_result(), ({}, {}, 0))
+
+
+# Disable Too many public methods warning
+# pylint: disable=R0904
+class QueryMentionsTest(IndexFileCase):
+    """Tests for the pages of the lines of a boolean query."""
+
+    def setUp(self):
+        """Deploy the index file of the corpus."""
+        IndexFileCase.setUp(self)
+        self.get_index_file = results_page._get_index_file
+        results_page._get_index_file = lambda: self.index
+
+    def tearDown(self):
+        results_page._get_index_file = self.get_index_file
+        IndexFileCase.tearDown(self)
+
+    def _get_mentions(self, query, start=0, page_size=None):
+        """Get a page of the lines of a query."""
+        return results_page._get_query_mentions(
+            boolean_query.parse_query(query), start=start, page_size=page_size)
+
+    def test_pages(self):
+        self.assertEqual(self._get_mentions('queen OR death', 0, 2),
+            ({'Hamlet': {'Hamlet': ['\tThe <b>queen</b> is dead.'],
+            'Ophelia': ['OPHELIA\tThe king and the <b>queen</b>.']}}, 4))
+        self.assertEqual(self._get_mentions('queen OR death', 2, 2),
+            ({'Hamlet': {'Ophelia': ['\tLove is not <b>death</b>.',
+            '\tAnd <b>death</b>.']}}, 4))
+
+    def test_filters_come_before_pages(self):
+        self.assertEqual(results_page._get_query_mentions(
+            boolean_query.parse_query('love'), 'Hamlet', 'Ophelia', 0, 1),
+            ({'Hamlet': {'Ophelia': ['\t<b>Love</b> is not death.']}}, 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
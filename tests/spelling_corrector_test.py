@@ -3,6 +3,7 @@ import random
 
 from google.appengine.ext import testbed
 
+from auxiliary import result_cache
 from models.word import Word
 import auxiliary.spelling_corrector as spelling_corrector
 
@@ -21,6 +22,9 @@ class SpellingCorrectorTest(unittest.TestCase):
         self.testbed = testbed.Testbed()
         self.testbed.activate()
         self.testbed.init_datastore_v3_stub()
+        self.testbed.init_memcache_stub()
+        spelling_corrector._datastore_dictionary = (None, None)
+        result_cache._local_generation = (None, 0)
 
         self.borrower = Word(id="borrower", name="borrower", count=2)
         self.love = Word(id="love", name="love", count=12)
@@ -122,3 +126,39 @@ class SpellingCorrectorTest(unittest.TestCase):
     def test_if_the_word_is_found_no_show_suggestions(self):
         self.assertEqual(spelling_corrector.get_suggestion('love'), None)
 
+    def test_suggestions_from_the_dictionary(self):
+        spelling_corrector.build_dictionary()
+        result_cache.bump_generation()
+        self.assertEqual(spelling_corrector.get_dictionary().words,
+            ['borrower', 'love'])
+        Word(id="lie", name="lie", count=100).put()
+        self.assertEqual(spelling_corrector.get_suggestion('lve'), 'love')
+        self.assertEqual(spelling_corrector.get_suggestion('love'), None)
+        self.assertEqual(spelling_corrector.get_suggestions('borruwr'),
+            ['borrower'])
+        self.assertEqual(spelling_corrector.get_suggestions('lov'), ['love'])
+        self.assertEqual(spelling_corrector.get_suggestions('love'), [])
+
+    def test_suggestions_without_dictionary(self):
+        Word(id="lave", name="lave", count=1).put()
+        Word(id="lie", name="lie", count=100).put()
+        self.assertEqual(spelling_corrector.get_suggestions('lve'),
+            ['lie', 'love', 'lave'])
+        self.assertEqual(spelling_corrector.get_suggestions('lve', 2),
+            ['lie', 'love'])
+        self.assertEqual(spelling_corrector.get_suggestions('borruwr'), [])
+        self.assertEqual(spelling_corrector.get_suggestions('love'), [])
+
+    def test_generation_is_not_read_on_every_lookup(self):
+        spelling_corrector.build_dictionary()
+        generations = []
+        get_generation = result_cache.get_generation
+        result_cache.get_generation = lambda: generations.append(
+            get_generation()) or generations[-1]
+        try:
+            for _ in range(3):
+                self.assertEqual(spelling_corrector.get_suggestions('lve'),
+                    ['love'])
+        finally:
+            result_cache.get_generation = get_generation
+        self.assertEqual(len(generations), 1)
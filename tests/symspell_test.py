@@ -0,0 +1,114 @@
+"""Tests for the symmetric delete spelling dictionary.
+
+Run this tests like this:
+nosetests tests/symspell_test.py
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from auxiliary import symspell
+
+
+# Disable Too many public methods warning
+# pylint: disable=R0904
+class SymSpellTest(unittest.TestCase):
+    """Tests for the symmetric delete spelling dictionary."""
+
+    def setUp(self):
+        self.dictionary = symspell.SymSpell.build([('love', 12),
+            ('lave', 1), ('lie', 100), ('borrower', 2), ('dove', 3)])
+
+    def test_get_deletes(self):
+        self.assertEqual(symspell.get_deletes('lie', 1),
+            set(['lie', 'ie', 'le', 'li']))
+        self.assertEqual(len(symspell.get_deletes('love', 2)), 11)
+
+    def test_get_distance(self):
+        self.assertEqual(symspell.get_distance('love', 'love', 1), 0)
+        self.assertEqual(symspell.get_distance('love', 'lvoe', 1), 1)
+        self.assertEqual(symspell.get_distance('love', 'lve', 1), 1)
+        self.assertEqual(symspell.get_distance('love', 'glove', 1), 1)
+        self.assertEqual(symspell.get_distance('love', 'lie', 1), 2)
+        self.assertEqual(symspell.get_distance('love', 'lie', 2), 2)
+        self.assertEqual(symspell.get_distance('love', 'borrower', 1), 2)
+
+    def test_get_distance_two(self):
+        self.assertEqual(symspell.get_distance('publick', 'public', 2), 1)
+        self.assertEqual(symspell.get_distance('lvoe', 'live', 2), 2)
+        self.assertEqual(symspell.get_distance('borruwr', 'borrower', 2), 2)
+        self.assertEqual(symspell.get_distance('love', 'borrower', 2), 3)
+
+    def test_lookup(self):
+        self.assertEqual(self.dictionary.lookup('lve'),
+            [('lie', 1, 100), ('love', 1, 12), ('lave', 1, 1),
+            ('dove', 2, 3)])
+        self.assertEqual(self.dictionary.lookup('lve', 1),
+            [('lie', 1, 100), ('love', 1, 12), ('lave', 1, 1)])
+        self.assertEqual(self.dictionary.lookup('love'),
+            [('love', 0, 12), ('dove', 1, 3), ('lave', 1, 1),
+            ('lie', 2, 100)])
+
+    def test_get_top_suggestions(self):
+        self.assertEqual(self.dictionary.get_top_suggestions('lve', 2),
+            [('lie', 1, 100), ('love', 1, 12)])
+        self.assertEqual(self.dictionary.get_top_suggestions('borruwr', 3),
+            [('borrower', 2, 2)])
+        self.assertEqual(self.dictionary.get_top_suggestions('ove', 5, 1),
+            [('love', 1, 12), ('dove', 1, 3)])
+        self.assertEqual(self.dictionary.get_top_suggestions('xyz', 5), [])
+
+    def test_get_top_suggestions_penalty(self):
+        dictionary = symspell.SymSpell.build([('thee', 10), ('the', 5000),
+            ('then', 2), ('thine', 1)])
+        self.assertEqual(dictionary.get_top_suggestions('thw', 3),
+            [('the', 1, 5000), ('thee', 2, 10), ('then', 2, 2)])
+        # The is much more frequent, so it is ranked first although it is
+        # further.
+        self.assertEqual(dictionary.get_top_suggestions('thein', 2),
+            [('the', 2, 5000), ('then', 1, 2)])
+
+    def test_get_suggestion(self):
+        self.assertEqual(self.dictionary.get_suggestion('lve'), 'lie')
+        self.assertEqual(self.dictionary.get_suggestion('borruwer'),
+            'borrower')
+        self.assertIsNone(self.dictionary.get_suggestion('love'))
+        self.assertIsNone(self.dictionary.get_suggestion('jdsjhdgfjdkahgd'))
+
+    def test_counts(self):
+        self.assertIn('dove', self.dictionary)
+        self.assertNotIn('dov', self.dictionary)
+        self.assertEqual(self.dictionary.get_count('lie'), 100)
+        self.assertEqual(self.dictionary.get_count('dov'), 0)
+
+    def test_serialize(self):
+        dictionary = symspell.SymSpell.deserialize(
+            self.dictionary.serialize())
+        self.assertEqual(dictionary.words, self.dictionary.words)
+        self.assertEqual(dictionary.lookup('lve'),
+            self.dictionary.lookup('lve'))
+        self.assertRaises(ValueError, symspell.SymSpell.deserialize, 'words')
+
+    def test_empty(self):
+        dictionary = symspell.SymSpell.deserialize(
+            symspell.SymSpell.build([]).serialize())
+        self.assertEqual(dictionary.lookup('love'), [])
+
+    def test_dictionary_file(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, symspell.DICTIONARY_FILENAME)
+            symspell.write_dictionary_file(self.dictionary, path)
+            dictionary = symspell.get_dictionary_file(path)
+            self.assertIs(symspell.get_dictionary_file(path), dictionary)
+            self.assertEqual(dictionary.get_suggestion('lve'), 'lie')
+            self.assertIsNone(symspell.get_dictionary_file(
+                os.path.join(directory, 'missing.spell')))
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    unittest.main()
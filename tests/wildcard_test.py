@@ -0,0 +1,68 @@
+"""Tests for the wildcard searches.
+
+Run this tests like this:
+nosetests tests/wildcard_test.py
+"""
+
+import unittest
+
+from auxiliary import wildcard
+
+
+# Disable Too many public methods warning
+# pylint: disable=R0904
+class WildcardTest(unittest.TestCase):
+    """Tests for the expansion of wildcard patterns."""
+
+    def setUp(self):
+        self.index = wildcard.KGramIndex(sorted(['love', 'loved', 'lover',
+            'glove', 'darkness', 'kindness', 'ness', 'whether', 'whither',
+            'whatever', 'a', 'i']))
+
+    def test_get_kgrams(self):
+        self.assertEqual(wildcard.get_kgrams('$love$'),
+            ['$lo', 'lov', 'ove', 've$'])
+        self.assertEqual(wildcard.get_kgrams('$a$', 2), ['$a', 'a$'])
+        self.assertEqual(wildcard.get_kgrams('$a'), [])
+
+    def test_is_pattern(self):
+        self.assertTrue(wildcard.is_pattern('lov*'))
+        self.assertTrue(wildcard.is_pattern('wh?ther'))
+        self.assertFalse(wildcard.is_pattern('love'))
+
+    def test_prefix(self):
+        self.assertEqual(self.index.expand('lov*'),
+            ['love', 'loved', 'lover'])
+
+    def test_suffix(self):
+        self.assertEqual(self.index.expand('*ness'),
+            ['darkness', 'kindness', 'ness'])
+
+    def test_single_letter(self):
+        self.assertEqual(self.index.expand('wh?ther'),
+            ['whether', 'whither'])
+        self.assertEqual(self.index.expand('?'), ['a', 'i'])
+
+    def test_infix(self):
+        self.assertEqual(self.index.expand('*ov*'),
+            ['glove', 'love', 'loved', 'lover'])
+        self.assertEqual(self.index.expand('l*e'), ['love'])
+        self.assertEqual(self.index.expand('w*e*er'),
+            ['whatever', 'whether'])
+
+    def test_kgrams_in_other_order(self):
+        self.assertEqual(self.index.expand('*ve*lo*'), [])
+
+    def test_no_wildcards(self):
+        self.assertEqual(self.index.expand('love'), ['love'])
+        self.assertEqual(self.index.expand('lov'), [])
+
+    def test_limit(self):
+        self.assertEqual(self.index.expand('*', 3), ['a', 'darkness', 'glove'])
+
+    def test_unicode_pattern(self):
+        self.assertEqual(self.index.expand(u'lov?'), ['love'])
+
+
+if __name__ == '__main__':
+    unittest.main()